@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -44,6 +45,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'lossofproduction.instrumentation.RequestMetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -60,15 +62,31 @@ CORS_ALLOWED_ORIGINS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'lossofproduction.authentication.JWTAuthentication',
         'rest_framework.authentication.TokenAuthentication',
-        'rest_framework.authentication.SessionAuthentication',
+        'lossofproduction.authentication.SessionAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     )
 }
 
+# Token pairs carry a role claim that the permission classes trust while
+# the role version matches (see lossofproduction/roles.py).
+SIMPLE_JWT = {
+    'TOKEN_OBTAIN_SERIALIZER': 'lossofproduction.authentication.TokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'lossofproduction.authentication.TokenRefreshSerializer',
+}
+
+# Seconds an authenticated user row is reused from the cache. Saving or
+# deleting the user drops it at once.
+LOP_USER_CACHE_TIMEOUT = 60
+
+# Deletion tombstones for the incremental sync endpoint are kept this long
+# (prune them with manage.py prune_sync_tombstones); older sync tokens get
+# 410 Gone and the client starts a full sync.
+LOP_SYNC_TOMBSTONE_RETENTION_DAYS = 30
+
 ROOT_URLCONF = 'conf.urls'
 
 TEMPLATES = [
@@ -112,6 +130,74 @@ DATABASES = {
     }
 }
 
+# Local SQLite database for seeding and benchmarks: LOP_DATABASE=sqlite
+# (optionally LOP_SQLITE_PATH=/path/to/file.sqlite3).
+if os.environ.get('LOP_DATABASE') == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('LOP_SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+        }
+    }
+
+# Read replica for GET traffic on the loss event and lookup endpoints (see
+# lossofproduction/routing.py): LOP_REPLICA_HOST for an MSSQL replica of
+# the default database, or LOP_SQLITE_REPLICA_PATH for a second local
+# SQLite file. Tests mirror the MSSQL replica onto the default database; the
+# SQLite one gets a test database of its own, so the routing tests can tell
+# which database answered.
+if os.environ.get('LOP_REPLICA_HOST'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'HOST': os.environ['LOP_REPLICA_HOST'],
+        'TEST': {'MIRROR': 'default'},
+    }
+elif os.environ.get('LOP_SQLITE_REPLICA_PATH'):
+    DATABASES['replica'] = {'ENGINE': 'django.db.backends.sqlite3', 'NAME': os.environ['LOP_SQLITE_REPLICA_PATH']}
+
+DATABASE_ROUTERS = ['lossofproduction.routing.ReplicaRouter']
+
+LOP_READ_REPLICA = 'replica' if 'replica' in DATABASES else None
+# Reads stay on the primary this long after a write (upper bound of the
+# replication lag), and this long after the replica failed.
+LOP_REPLICA_STICKY_SECONDS = 10
+LOP_REPLICA_RETRY_SECONDS = 30
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Version counters for the role, user and lookup caches, ETags, replica
+# pinning and the timeline cache live here, so every worker must share the
+# backend: LOP_REDIS_URL (e.g. redis://cache:6379/1) selects Redis.
+# Without it the cache is process-local, which is only correct with a
+# single worker process; the lossofproduction.W001 check warns about it.
+
+if os.environ.get('LOP_REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['LOP_REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Request instrumentation: Server-Timing headers, /metrics histograms and
+# a warning on the 'lossofproduction.slow_queries' logger for any query
+# slower than LOP_SLOW_QUERY_MS. Server-Timing goes to every client only
+# while LOP_SERVER_TIMING is on, otherwise to staff users. /metrics is
+# open to staff users, to scrapers sending "Authorization: Bearer
+# <LOP_METRICS_TOKEN>" and to LOP_METRICS_ALLOWED_IPS; leave that empty
+# behind a reverse proxy, where every request comes from the proxy.
+
+LOP_SERVER_TIMING = DEBUG
+LOP_SLOW_QUERY_MS = 500
+LOP_METRICS_TOKEN = os.environ.get('LOP_METRICS_TOKEN')
+LOP_METRICS_ALLOWED_IPS = []
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -12,6 +12,8 @@ from lossofproduction.views import (
     LossOfProductionViewSet,
     current_user,
 )
+from lossofproduction.instrumentation import metrics_view
+from lossofproduction import async_views
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 
 schema_view = get_schema_view(
@@ -42,6 +44,14 @@ urlpatterns = [
     path("admin/", admin.site.urls),
     path("api/", include(router.urls)),
     path("api/auth/me/", current_user, name="current_user"),
+    path("metrics/", metrics_view, name="metrics"),
+    # Async read endpoints, for deployments served over ASGI (conf/asgi.py)
+    path("api/async/departments/", async_views.DepartmentListView.as_view(), name="async-department-list"),
+    path("api/async/affected-areas/", async_views.AffectedAreaListView.as_view(), name="async-affectedarea-list"),
+    path("api/async/causes/", async_views.CauseListView.as_view(), name="async-cause-list"),
+    path("api/async/reporting-limit-areas/", async_views.ReportingLimitAreaListView.as_view(), name="async-rla-list"),
+    path("api/async/lossofproduction/", async_views.LossOfProductionListView.as_view(), name="async-lop-list"),
+    path("api/async/lossofproduction/<int:pk>/", async_views.LossOfProductionDetailView.as_view(), name="async-lop-detail"),
     # JWT auth endpoints
     path("api/auth/token/", TokenObtainPairView.as_view(), name="token_obtain_pair"),
     path("api/auth/token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
@@ -1,7 +1,14 @@
+from django import forms
 from django.contrib import admin
+from django.contrib.admin.widgets import AutocompleteSelect
 from django.contrib.auth.models import Permission
 from django.contrib.contenttypes.models import ContentType
+from django.db.models import Q
+from django.utils.translation import gettext_lazy as _
 from .models import *
+from .pagination import EstimatedCountPaginator
+from .roles import get_user_roles
+from .search import search_loss_events
 
 
 class PermissionControlMixin:
@@ -14,7 +21,7 @@ class PermissionControlMixin:
         if request.user.is_superuser:
             return True
 
-        user_groups = set(request.user.groups.values_list('name', flat=True))
+        user_groups = get_user_roles(request.user)
 
         # All three groups should see these modules in admin
         if {'Admin', 'Editor', 'Reader'} & user_groups:
@@ -27,7 +34,7 @@ class PermissionControlMixin:
         if request.user.is_superuser:
             return True
 
-        user_groups = set(request.user.groups.values_list('name', flat=True))
+        user_groups = get_user_roles(request.user)
 
         # All groups have view permission
         if {'Admin', 'Editor', 'Reader'} & user_groups:
@@ -40,7 +47,7 @@ class PermissionControlMixin:
         if request.user.is_superuser:
             return True
 
-        user_groups = set(request.user.groups.values_list('name', flat=True))
+        user_groups = get_user_roles(request.user)
 
         # Check if this is a lookup model or LossOfProduction
         model_name = self.model._meta.model_name
@@ -59,7 +66,7 @@ class PermissionControlMixin:
         if request.user.is_superuser:
             return True
 
-        user_groups = set(request.user.groups.values_list('name', flat=True))
+        user_groups = get_user_roles(request.user)
 
         # Check if this is a lookup model or LossOfProduction
         model_name = self.model._meta.model_name
@@ -78,7 +85,7 @@ class PermissionControlMixin:
         if request.user.is_superuser:
             return True
 
-        user_groups = set(request.user.groups.values_list('name', flat=True))
+        user_groups = get_user_roles(request.user)
 
         # Check if this is a lookup model or LossOfProduction
         model_name = self.model._meta.model_name
@@ -93,6 +100,63 @@ class PermissionControlMixin:
         return super().has_delete_permission(request, obj)
 
 
+class AutocompleteFilter(admin.FieldListFilter):
+    """
+    Foreign key filter rendered as an autocomplete select, backed by the
+    related admin's search_fields. Unlike RelatedFieldListFilter it never
+    loads the whole lookup table, only the selected row.
+    """
+    template = 'admin/lossofproduction/autocomplete_filter.html'
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        self.lookup_kwarg = f'{field_path}__{field.target_field.name}__exact'
+        self.lookup_val = params.get(self.lookup_kwarg)
+        super().__init__(field, request, params, model, model_admin, field_path)
+        self.formfield = field.formfield(
+            required=False,
+            widget=AutocompleteSelect(field, model_admin.admin_site),
+        )
+        self.filter_url = '?'
+
+    def expected_parameters(self):
+        return [self.lookup_kwarg]
+
+    def choices(self, changelist):
+        self.filter_url = changelist.get_query_string(remove=[self.lookup_kwarg])
+        yield {
+            'selected': not self.lookup_val,
+            'query_string': self.filter_url,
+            'display': _('All'),
+        }
+
+    def widget(self):
+        value = self.lookup_val[-1] if self.lookup_val else None
+        return self.formfield.widget.render(
+            self.lookup_kwarg,
+            value,
+            attrs={'id': f'filter_{self.field_path}', 'data-filter-url': self.filter_url},
+        )
+
+
+class LargeTableAdminMixin:
+    """
+    Changelist settings for tables with millions of rows: estimated counts,
+    no facet counts and autocomplete foreign key filters.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    show_facets = admin.ShowFacets.NEVER
+
+    @property
+    def media(self):
+        field = self.model._meta.get_field(self.autocomplete_fields[0])
+        return (
+            super().media
+            + AutocompleteSelect(field, self.admin_site).media
+            + forms.Media(js=['admin/lossofproduction/autocomplete_filter.js'])
+        )
+
+
 @admin.register(Department)
 class DepartmentAdmin(PermissionControlMixin, admin.ModelAdmin):
     list_display = ('name',)
@@ -120,18 +184,37 @@ class ReportingLimitAreaAdmin(PermissionControlMixin, admin.ModelAdmin):
 
 
 @admin.register(LossOfProduction)
-class LossOfProductionAdmin(PermissionControlMixin, admin.ModelAdmin):
+class LossOfProductionAdmin(LargeTableAdminMixin, PermissionControlMixin, admin.ModelAdmin):
     list_display = ('id', 'issue_date', 'department', 'affected_area', 'event_type', 'status', 'date_solved',)
-    list_filter = ('department', 'affected_area', 'event_type', 'status', 'cause',)
+    list_select_related = ('department', 'affected_area',)
+    list_filter = (
+        ('department', AutocompleteFilter),
+        ('affected_area', AutocompleteFilter),
+        'event_type',
+        'status',
+        ('cause', AutocompleteFilter),
+    )
+    date_hierarchy = 'issue_date'
     search_fields = ('id', 'equipment_or_process_step', 'description', 'reporting_limit',)
     autocomplete_fields = ('department', 'affected_area', 'cause', 'reporting_limit_area',)
 
+    def get_search_results(self, request, queryset, search_term):
+        """Search through the full-text index instead of LIKE scans over search_fields"""
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+
+        matches = search_loss_events(queryset, search_term).values('pk')
+        if search_term.isdigit():
+            return queryset.filter(Q(pk=int(search_term)) | Q(pk__in=matches)), False
+        return queryset.filter(pk__in=matches), False
+
     def get_readonly_fields(self, request, obj=None):
         """Make fields readonly for Reader group"""
         if request.user.is_superuser:
             return ()
 
-        user_groups = set(request.user.groups.values_list('name', flat=True))
+        user_groups = get_user_roles(request.user)
 
         # Reader group gets readonly fields
         if 'Reader' in user_groups and not ({'Admin', 'Editor'} & user_groups):
@@ -0,0 +1,128 @@
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek
+
+from .models import LossOfProduction, LossOfProductionDailyRollup
+
+
+# Grouping dimension -> (key column, label column). Lookup names come from a
+# join inside the aggregate query; choice labels are mapped in Python.
+DIMENSIONS = {
+    'department': ('department_id', 'department__name'),
+    'affected_area': ('affected_area_id', 'affected_area__name'),
+    'cause': ('cause_id', 'cause__name'),
+    'reporting_limit_area': ('reporting_limit_area_id', 'reporting_limit_area__name'),
+    'event_type': ('event_type', None),
+    'status': ('status', None),
+}
+
+PERIODS = {
+    'day': TruncDay,
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+
+CHOICE_LABELS = {
+    'event_type': dict(LossOfProduction.EventType.choices),
+    'status': dict(LossOfProduction.Status.choices),
+}
+
+ONGOING = Q(status=LossOfProduction.Status.ONGOING)
+
+
+def _measures(queryset):
+    # The daily rollup holds pre-counted rows, so it is summed instead of counted.
+    if queryset.model is LossOfProductionDailyRollup:
+        return {'event_count': Sum('count'), 'ongoing_count': Sum('count', filter=ONGOING, default=0)}
+    return {'event_count': Count('id'), 'ongoing_count': Count('id', filter=ONGOING)}
+
+
+def _date_field(queryset):
+    return 'day' if queryset.model is LossOfProductionDailyRollup else 'issue_date'
+
+
+def _aggregate(queryset, columns, **extra):
+    return (
+        queryset
+        .order_by()
+        .annotate(**extra)
+        .values(*columns)
+        .annotate(**_measures(queryset))
+    )
+
+
+def grouped_counts(queryset, dimensions, period=None):
+    """
+    Event and ongoing counts grouped by ``dimensions`` and, optionally, by an
+    issue_date bucket. Runs as a single GROUP BY query over either loss
+    events or the daily rollup.
+    """
+    columns = []
+    for name in dimensions:
+        columns.extend(column for column in DIMENSIONS[name] if column)
+    extra = {}
+    if period:
+        extra['period'] = PERIODS[period](_date_field(queryset))
+        columns.append('period')
+
+    groups = []
+    for row in _aggregate(queryset, columns, **extra).order_by('-event_count', *columns):
+        group = {}
+        for name in dimensions:
+            key, label = DIMENSIONS[name]
+            if label:
+                group[f'{name}_id'] = row[key]
+                group[name] = row[label]
+            else:
+                group[name] = row[key]
+                group[f'{name}_display'] = CHOICE_LABELS[name].get(row[key], row[key])
+        if period:
+            group['period'] = row['period'].isoformat() if row['period'] else None
+        group['count'] = row['event_count']
+        group['ongoing'] = row['ongoing_count']
+        groups.append(group)
+    return groups
+
+
+def cause_pareto(queryset):
+    """
+    Causes ranked by event count with their share and cumulative share of
+    the total, i.e. the data behind a Pareto chart.
+    """
+    rows = list(_aggregate(queryset, ['cause_id', 'cause__name']).order_by('-event_count', 'cause__name'))
+    total = sum(row['event_count'] for row in rows)
+    pareto = []
+    cumulative = 0
+    for row in rows:
+        cumulative += row['event_count']
+        pareto.append({
+            'cause_id': row['cause_id'],
+            'cause': row['cause__name'],
+            'count': row['event_count'],
+            'ongoing': row['ongoing_count'],
+            'share': round(row['event_count'] / total, 4),
+            'cumulative_share': round(cumulative / total, 4),
+        })
+    return pareto
+
+
+def rollup_dimensions_supported(dimensions):
+    """Whether every grouping dimension is a column of the daily rollup."""
+    return 'reporting_limit_area' not in dimensions
+
+
+def loss_statistics(queryset, dimensions, period=None):
+    """
+    Grouped counts, totals and the cause Pareto. Two GROUP BY queries: one
+    for the requested groups (which also give the totals) and one per cause.
+    """
+    groups = grouped_counts(queryset, dimensions, period)
+    pareto = cause_pareto(queryset)
+    return {
+        'group_by': list(dimensions),
+        'period': period,
+        'source': 'rollup' if queryset.model is LossOfProductionDailyRollup else 'events',
+        'total': sum(group['count'] for group in groups),
+        'ongoing': sum(group['ongoing'] for group in groups),
+        'groups': groups,
+        'pareto': pareto,
+    }
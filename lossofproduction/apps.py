@@ -1,79 +1,6 @@
 from django.apps import AppConfig
-from django.db.models.signals import post_migrate
-
-
-def create_groups(sender, **kwargs):
-    from django.contrib.auth.models import Group, Permission
-    from django.contrib.contenttypes.models import ContentType
-    from .models import (
-        Department,
-        AffectedArea,
-        Cause,
-        ReportingLimitArea,
-        LossOfProduction,
-    )
-
-    # Define models for different permission levels
-    all_models = [Department, AffectedArea, Cause, ReportingLimitArea, LossOfProduction]
-    lookup_models = [Department, AffectedArea, Cause, ReportingLimitArea]
-
-    # Clear existing group permissions to ensure clean state
-    Group.objects.filter(name__in=['Admin', 'Editor', 'Reader']).delete()
-
-    # ADMIN GROUP - Full permissions on all models
-    admin_group, _ = Group.objects.get_or_create(name="Admin")
-    for model in all_models:
-        ct = ContentType.objects.get_for_model(model)
-        # Add all permissions (add, change, delete, view)
-        for action in ["add", "change", "delete", "view"]:
-            try:
-                perm = Permission.objects.get(
-                    content_type=ct,
-                    codename=f"{action}_{model._meta.model_name}"
-                )
-                admin_group.permissions.add(perm)
-            except Permission.DoesNotExist:
-                pass
-
-    # EDITOR GROUP - Full permissions on LossOfProduction, view only on others
-    editor_group, _ = Group.objects.get_or_create(name="Editor")
-
-    # Full permissions on LossOfProduction
-    ct = ContentType.objects.get_for_model(LossOfProduction)
-    for action in ["add", "change", "delete", "view"]:
-        try:
-            perm = Permission.objects.get(
-                content_type=ct,
-                codename=f"{action}_lossofproduction"
-            )
-            editor_group.permissions.add(perm)
-        except Permission.DoesNotExist:
-            pass
-
-    # View only permissions on lookup models
-    for model in lookup_models:
-        ct = ContentType.objects.get_for_model(model)
-        try:
-            perm = Permission.objects.get(
-                content_type=ct,
-                codename=f"view_{model._meta.model_name}"
-            )
-            editor_group.permissions.add(perm)
-        except Permission.DoesNotExist:
-            pass
-
-    # READER GROUP - View only permissions on all models
-    reader_group, _ = Group.objects.get_or_create(name="Reader")
-    for model in all_models:
-        ct = ContentType.objects.get_for_model(model)
-        try:
-            perm = Permission.objects.get(
-                content_type=ct,
-                codename=f"view_{model._meta.model_name}"
-            )
-            reader_group.permissions.add(perm)
-        except Permission.DoesNotExist:
-            pass
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_delete, post_migrate, post_save, pre_save
 
 
 class LossofproductionConfig(AppConfig):
@@ -81,4 +8,47 @@ class LossofproductionConfig(AppConfig):
     name = "lossofproduction"
 
     def ready(self):
-        post_migrate.connect(create_groups, sender=self)
\ No newline at end of file
+        from django.contrib.auth.models import Group, User
+        from . import authentication, conditional, instrumentation, lookups, roles, rollups, search, sync
+        from .models import LossOfProduction
+        from . import checks  # noqa: F401  (registers the system checks)
+
+        post_migrate.connect(roles.sync_roles_after_migrate, sender=self)
+        post_migrate.connect(search.setup_search_index, sender=self)
+
+        # Keep the cached role resolver in step with group membership and permissions
+        post_save.connect(roles.user_changed, sender=User)
+        post_delete.connect(roles.user_changed, sender=User)
+        post_save.connect(roles.group_changed, sender=Group)
+        post_delete.connect(roles.group_changed, sender=Group)
+        m2m_changed.connect(roles.memberships_changed, sender=User.groups.through)
+        m2m_changed.connect(roles.memberships_changed, sender=User.user_permissions.through)
+        m2m_changed.connect(roles.memberships_changed, sender=Group.permissions.through)
+
+        # Drop the cached user row used by JWT authentication
+        post_save.connect(authentication.user_changed, sender=User)
+        post_delete.connect(authentication.user_changed, sender=User)
+
+        # Invalidate the in-memory lookup tables when a lookup row changes
+        for model in lookups.LOOKUP_MODELS:
+            post_save.connect(lookups.lookup_changed, sender=model)
+            post_delete.connect(lookups.lookup_changed, sender=model)
+
+        # Table version stamp for conditional GETs on loss events
+        post_save.connect(conditional.loss_events_changed, sender=LossOfProduction)
+        post_delete.connect(conditional.loss_events_changed, sender=LossOfProduction)
+
+        # Tombstones for the incremental sync endpoint, and re-sync of the
+        # events showing a renamed lookup
+        post_delete.connect(sync.record_deletion, sender=LossOfProduction)
+        for model in sync.LOOKUP_LABEL_FIELDS:
+            pre_save.connect(sync.capture_old_label, sender=model)
+            post_save.connect(sync.lookup_saved, sender=model)
+
+        # Delta maintenance of the daily rollup
+        pre_save.connect(rollups.capture_old_key, sender=LossOfProduction)
+        post_save.connect(rollups.loss_event_saved, sender=LossOfProduction)
+        post_delete.connect(rollups.loss_event_deleted, sender=LossOfProduction)
+
+        # Per-request query counts and timings (see RequestMetricsMiddleware)
+        connection_created.connect(instrumentation.install_query_wrapper)
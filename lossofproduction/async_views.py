@@ -0,0 +1,163 @@
+from abc import ABC, abstractmethod
+
+from asgiref.sync import sync_to_async
+from django.http import Http404, HttpResponse
+from django.views import View
+from rest_framework.response import Response
+
+from .authentication import aauthenticate
+from .instrumentation import current_metrics
+from .lookups import aget_table
+from .models import LossOfProduction
+from .roles import aresolve_user
+from .routing import reading_from
+from .serializers import LOOKUP_FIELDS, LOSS_FIELD_COLUMNS, loss_values, serialize_loss_rows
+from .views import (
+    DepartmentViewSet,
+    AffectedAreaViewSet,
+    CauseViewSet,
+    ReportingLimitAreaViewSet,
+    LossOfProductionViewSet,
+)
+
+
+class AsyncReadView(View, ABC):
+    """
+    Async GET endpoint that reuses a DRF viewset for everything except I/O.
+
+    The viewset supplies authenticators, permission classes, filters,
+    pagination, conditional GET validators and renderers, exactly as on the
+    synchronous route. Everything that needs the database or the cache is
+    awaited first (authentication, the caller's roles, the version stamps,
+    the read database, the object's modification time); after that the
+    viewset's own synchronous checks answer from memory, so the request
+    never leaves the event loop on the common path.
+
+    Subclasses set ``viewset_class`` and ``action`` and implement handle().
+    """
+    viewset_class = None
+    action = None
+
+    async def get(self, request, *args, **kwargs):
+        viewset = self.viewset_class()
+        viewset.action_map = {'get': self.action}
+        viewset.action = self.action
+        viewset.detail = self.action == 'retrieve'
+        viewset.args, viewset.kwargs = args, kwargs
+        viewset.format_kwarg = None
+        viewset.headers = viewset.default_response_headers
+
+        drf_request = viewset.initialize_request(request, *args, **kwargs)
+        viewset.request = drf_request
+        try:
+            metrics = current_metrics()
+            if metrics is not None:
+                with metrics.phase('auth'):
+                    await aauthenticate(drf_request)
+            else:
+                await aauthenticate(drf_request)
+            await aresolve_user(drf_request.user)
+            viewset.prefetched_versions = await viewset.aget_versions()
+            viewset.prefetched_read_database = await viewset.aget_read_database(drf_request)
+            with reading_from(viewset.prefetched_read_database):
+                if viewset.detail:
+                    viewset.prefetched_object_modified = await viewset.aget_object_modified()
+                viewset.initial(drf_request, *args, **kwargs)
+                response = await self.handle(viewset, drf_request)
+        except Exception as exc:
+            response = viewset.handle_exception(exc)
+
+        response = viewset.finalize_response(drf_request, response, *args, **kwargs)
+        return self.render(response)
+
+    @abstractmethod
+    async def handle(self, viewset, request):
+        """
+        Response for the authenticated and permitted ``request``, built with
+        ``viewset``. Awaits its own queries and lookup tables; raised
+        exceptions are handled by the viewset as on the synchronous route.
+        """
+
+    def render(self, response):
+        # Render here so the handler does not hop to a thread to render a
+        # TemplateResponse; the result is a plain HttpResponse.
+        if not isinstance(response, Response):
+            return response
+        response.render()
+        plain = HttpResponse(response.rendered_content, status=response.status_code)
+        for header, value in response.items():
+            plain[header] = value
+        return plain
+
+
+async def aload_lookups(rows):
+    """
+    Await the lookup tables for loss event ``rows``, including lookup rows
+    inserted since a table was cached, so serializing them never queries.
+    """
+    for name, model in LOOKUP_FIELDS.items():
+        table = await aget_table(model)
+        column = LOSS_FIELD_COLUMNS[name]
+        await table.aload_missing({row[column] for row in rows if column in row})
+
+
+class LossOfProductionListView(AsyncReadView):
+    viewset_class = LossOfProductionViewSet
+    action = 'list'
+
+    async def handle(self, viewset, request):
+        rows = viewset.get_list_rows(viewset.filter_queryset(viewset.get_queryset()))
+
+        paginator = viewset.paginator
+        if paginator is not None:
+            page = await paginator.apaginate_queryset(rows, request, view=viewset)
+            if page is not None:
+                await aload_lookups(page)
+                return paginator.get_paginated_response(viewset.serialize_rows(page))
+        rows = [row async for row in rows]
+        await aload_lookups(rows)
+        return Response(viewset.serialize_rows(rows))
+
+
+class LossOfProductionDetailView(AsyncReadView):
+    viewset_class = LossOfProductionViewSet
+    action = 'retrieve'
+
+    async def handle(self, viewset, request):
+        queryset = viewset.filter_queryset(viewset.get_queryset())
+        try:
+            row = await queryset.values(*loss_values(viewset.sparse_fields)).aget(pk=viewset.kwargs['pk'])
+        except (LossOfProduction.DoesNotExist, TypeError, ValueError):
+            raise Http404(f'No {LossOfProduction._meta.object_name} matches the given query.')
+        await aload_lookups([row])
+        # The permission classes do not look at the object itself.
+        viewset.check_object_permissions(request, row)
+        return Response(serialize_loss_rows([row], viewset.sparse_fields)[0])
+
+
+class LookupListView(AsyncReadView):
+    """Unpaginated lookup list, served from the in-memory lookup table."""
+    action = 'list'
+
+    async def handle(self, viewset, request):
+        table = await aget_table(viewset.queryset.model)
+        if viewset.paginator is not None and viewset.paginator.get_page_size(request):
+            # Paged lookup lists are rare; use the synchronous path.
+            return await sync_to_async(viewset.list)(request)
+        return Response(viewset.get_serializer(table.instances(), many=True).data)
+
+
+class DepartmentListView(LookupListView):
+    viewset_class = DepartmentViewSet
+
+
+class AffectedAreaListView(LookupListView):
+    viewset_class = AffectedAreaViewSet
+
+
+class CauseListView(LookupListView):
+    viewset_class = CauseViewSet
+
+
+class ReportingLimitAreaListView(LookupListView):
+    viewset_class = ReportingLimitAreaViewSet
@@ -0,0 +1,214 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import router, transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import SessionAuthentication as BaseSessionAuthentication
+from rest_framework_simplejwt.authentication import JWTAuthentication as BaseJWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.serializers import (
+    TokenObtainPairSerializer as BaseTokenObtainPairSerializer,
+    TokenRefreshSerializer as BaseTokenRefreshSerializer,
+)
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .roles import ROLE_CLAIM, atrust_token_claim, token_claim, trust_token_claim
+
+
+def _user_timeout():
+    return getattr(settings, 'LOP_USER_CACHE_TIMEOUT', 60)
+
+
+def _user_key(user_id):
+    return f'lop:user-fields:{user_id}'
+
+
+# The only user fields kept in the cache: what authentication and the
+# permission checks read. The password hash and personal details stay in
+# the database.
+CACHED_USER_FIELDS = ('username', 'is_active', 'is_staff', 'is_superuser')
+
+
+def _user_fields(model):
+    # In model field order, which from_db() expects the values in.
+    wanted = {model._meta.pk.attname, *CACHED_USER_FIELDS}
+    return tuple(field.attname for field in model._meta.concrete_fields if field.attname in wanted)
+
+
+def _user_from_cache(values):
+    """
+    User instance with only the cached fields loaded. Any other field is
+    deferred and read from the database on access, and save() writes only
+    the loaded fields, so the partial instance cannot overwrite the rest.
+    """
+    model = get_user_model()
+    return model.from_db(router.db_for_read(model), _user_fields(model), values)
+
+
+def _user_query(user_id):
+    model = get_user_model()
+    return model.objects.filter(**{api_settings.USER_ID_FIELD: user_id}).values_list(*_user_fields(model))
+
+
+def get_cached_user(user_id):
+    """
+    User whose USER_ID_FIELD is ``user_id``, from the cache when possible.
+    Raises the user model's DoesNotExist like a plain get().
+    """
+    key = _user_key(user_id)
+    values = cache.get(key)
+    if values is None:
+        values = _user_query(user_id).get()
+        cache.set(key, values, _user_timeout())
+    return _user_from_cache(values)
+
+
+async def aget_cached_user(user_id):
+    """Async get_cached_user()."""
+    key = _user_key(user_id)
+    values = await cache.aget(key)
+    if values is None:
+        values = await _user_query(user_id).aget()
+        await cache.aset(key, values, _user_timeout())
+    return _user_from_cache(values)
+
+
+def user_changed(sender, instance, **kwargs):
+    """post_save/post_delete on User: drop the cached copy once the change commits."""
+    key = _user_key(getattr(instance, api_settings.USER_ID_FIELD))
+    # Before commit, a concurrent request could cache the old row again.
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+class JWTAuthentication(BaseJWTAuthentication):
+    """
+    simplejwt authentication that loads the user through the short-lived
+    user cache and trusts the role claim of current tokens, so an
+    authenticated request needs no auth-related queries. Also provides
+    ``aauthenticate`` for async views.
+    """
+
+    def authenticate(self, request):
+        user_auth = super().authenticate(request)
+        if user_auth is not None:
+            trust_token_claim(*user_auth)
+        return user_auth
+
+    async def aauthenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        # Token validation is pure computation; only the user lookup awaits.
+        validated_token = self.get_validated_token(raw_token)
+        user = await self.aget_user(validated_token)
+        await atrust_token_claim(user, validated_token)
+        return user, validated_token
+
+    def _user_id(self, validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+    def _check_user(self, user, validated_token):
+        # Same checks as simplejwt's get_user().
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+        return user
+
+    def get_user(self, validated_token):
+        try:
+            user = get_cached_user(self._user_id(validated_token))
+        except self.user_model.DoesNotExist as e:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found") from e
+        return self._check_user(user, validated_token)
+
+    async def aget_user(self, validated_token):
+        """Async get_user(), with the same checks."""
+        try:
+            user = await aget_cached_user(self._user_id(validated_token))
+        except self.user_model.DoesNotExist as e:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found") from e
+        return self._check_user(user, validated_token)
+
+
+class TokenObtainPairSerializer(BaseTokenObtainPairSerializer):
+    """Issues token pairs carrying the role claim (see roles.token_claim)."""
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        claim = token_claim(user)
+        if claim is not None:
+            token[ROLE_CLAIM] = claim
+        return token
+
+
+class TokenRefreshSerializer(BaseTokenRefreshSerializer):
+    """
+    Refreshes with an up-to-date role claim; otherwise the access token
+    would inherit the claim of the refresh token, which goes stale with
+    the first role change.
+    """
+
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        access = AccessToken(data['access'], verify=False)
+        try:
+            user = get_cached_user(access[api_settings.USER_ID_CLAIM])
+        except (KeyError, get_user_model().DoesNotExist):
+            return data
+        claim = token_claim(user)
+        if claim is None:
+            access.payload.pop(ROLE_CLAIM, None)
+        else:
+            access[ROLE_CLAIM] = claim
+        data['access'] = str(access)
+        return data
+
+
+class SessionAuthentication(BaseSessionAuthentication):
+    """DRF session authentication with an ``aauthenticate`` for async views."""
+
+    async def aauthenticate(self, request):
+        auser = getattr(request._request, 'auser', None)
+        if auser is None:
+            return None
+        user = await auser()
+        if not user or not user.is_active:
+            return None
+        self.enforce_csrf(request)
+        return (user, None)
+
+
+async def aauthenticate(request):
+    """
+    Async counterpart of Request._authenticate(): tries each authenticator
+    of the DRF ``request`` in turn and sets ``request.user``/``request.auth``.
+    Authenticators without ``aauthenticate`` run in a worker thread.
+    """
+    for authenticator in request.authenticators:
+        try:
+            if hasattr(authenticator, 'aauthenticate'):
+                user_auth = await authenticator.aauthenticate(request)
+            else:
+                user_auth = await sync_to_async(authenticator.authenticate)(request)
+        except exceptions.APIException:
+            request._not_authenticated()
+            raise
+        if user_auth is not None:
+            request._authenticator = authenticator
+            request.user, request.auth = user_auth
+            return
+    request._not_authenticated()
@@ -0,0 +1,172 @@
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from .models import (
+    Department,
+    AffectedArea,
+    Cause,
+    ReportingLimitArea,
+    LossOfProduction,
+)
+from .conditional import loss_events_changed
+from .lookups import get_table
+from . import rollups
+from .serializers import LossOfProductionBulkItemSerializer
+
+
+BULK_MAX_ITEMS = 500
+BULK_BATCH_SIZE = 100
+
+# Foreign key field -> lookup model, resolved from the in-memory lookup tables.
+FOREIGN_KEYS = {
+    'department': Department,
+    'affected_area': AffectedArea,
+    'cause': Cause,
+    'reporting_limit_area': ReportingLimitArea,
+}
+
+DOES_NOT_EXIST = 'Invalid pk "{pk_value}" - object does not exist.'
+
+
+def _check_payload(data):
+    if not isinstance(data, list):
+        raise ValidationError({'non_field_errors': ['Expected a list of items.']})
+    if not data:
+        raise ValidationError({'non_field_errors': ['This list may not be empty.']})
+    if len(data) > BULK_MAX_ITEMS:
+        raise ValidationError({'non_field_errors': [f'Ensure this list has no more than {BULK_MAX_ITEMS} items.']})
+
+
+def _resolve_lookups(validated):
+    """
+    Map every referenced FK id to its lookup instance from the in-memory
+    lookup tables. Ids added after a table was cached are fetched with one
+    query per table; ids still missing after that do not exist.
+    """
+    resolved = {}
+    for field, model in FOREIGN_KEYS.items():
+        table = get_table(model)
+        ids = {attrs[field] for attrs in validated if attrs and field in attrs}
+        table.load_missing(ids)
+        resolved[field] = {pk: table.get(pk) for pk in ids if pk in table}
+    return resolved
+
+
+def _apply(instance, attrs, resolved, errors):
+    """Copy validated attrs onto ``instance``, swapping FK ids for instances."""
+    for field, value in attrs.items():
+        if field in FOREIGN_KEYS:
+            related = resolved[field].get(value)
+            if related is None:
+                errors[field] = [DOES_NOT_EXIST.format(pk_value=value)]
+                continue
+            value = related
+        setattr(instance, field, value)
+
+    # Same rule as LossOfProduction.clean(), checked against in-memory instances.
+    if not errors and instance.reporting_limit_area.department_id != instance.department_id:
+        errors['reporting_limit_area'] = [
+            f'The selected reporting_limit_area ({instance.reporting_limit_area}) does not belong '
+            f'to the selected department ({instance.department}).'
+        ]
+
+
+def _validate_items(data, partial=False):
+    validated, errors = [], []
+    for item in data:
+        serializer = LossOfProductionBulkItemSerializer(data=item, partial=partial)
+        if serializer.is_valid():
+            validated.append(serializer.validated_data)
+            errors.append({})
+        else:
+            validated.append(None)
+            errors.append(dict(serializer.errors))
+    return validated, errors
+
+
+def bulk_create(data):
+    """
+    Validate and insert a list of loss events in one transaction.
+
+    Raises ValidationError with a list of per-item errors (``{}`` for valid
+    items) if any item is invalid; nothing is written in that case.
+    """
+    _check_payload(data)
+    validated, errors = _validate_items(data)
+    resolved = _resolve_lookups(validated)
+
+    instances = []
+    for attrs, item_errors in zip(validated, errors):
+        instance = LossOfProduction()
+        if attrs is not None:
+            _apply(instance, attrs, resolved, item_errors)
+        instances.append(instance)
+
+    if any(errors):
+        raise ValidationError(errors)
+
+    # bulk_create() bypasses save(), so derived columns are filled in here.
+    for instance in instances:
+        instance.refresh_derived_fields()
+
+    with transaction.atomic():
+        created = LossOfProduction.objects.bulk_create(instances, batch_size=BULK_BATCH_SIZE)
+        # bulk_create() sends no post_save signals.
+        rollups.record_created(created)
+        loss_events_changed()
+        return created
+
+
+def bulk_update(data):
+    """
+    Validate and apply partial updates to a list of loss events, each item
+    identified by its ``id``, in one transaction.
+    """
+    _check_payload(data)
+    validated, errors = _validate_items(data, partial=True)
+
+    ids = []
+    for item, item_errors in zip(data, errors):
+        pk = item.get('id') if isinstance(item, dict) else None
+        if not isinstance(pk, int) or isinstance(pk, bool):
+            item_errors['id'] = ['This field is required.' if pk is None else 'A valid integer is required.']
+        ids.append(pk)
+
+    with transaction.atomic():
+        existing = (
+            LossOfProduction.objects
+            .select_for_update()
+            .select_related('department', 'affected_area', 'cause', 'reporting_limit_area__department')
+            .in_bulk({pk for pk in ids if isinstance(pk, int)})
+        )
+        resolved = _resolve_lookups(validated)
+
+        instances, old_keys, fields = [], [], set()
+        for pk, attrs, item_errors in zip(ids, validated, errors):
+            instance = existing.get(pk) if 'id' not in item_errors else None
+            if instance is None:
+                item_errors.setdefault('id', [DOES_NOT_EXIST.format(pk_value=pk)])
+                continue
+            old_keys.append(rollups.rollup_key(instance))
+            if attrs is not None:
+                _apply(instance, attrs, resolved, item_errors)
+                fields.update(attrs)
+            instances.append(instance)
+
+        if any(errors):
+            raise ValidationError(errors)
+        if len(set(ids)) != len(ids):
+            raise ValidationError({'non_field_errors': ['Each id may only appear once.']})
+
+        if fields:
+            # bulk_update() bypasses save(): no auto_now, derived columns or post_save signals.
+            now = timezone.now()
+            for instance in instances:
+                instance.updated_at = now
+                instance.refresh_derived_fields()
+            fields.update(('updated_at', *LossOfProduction.DERIVED_FIELDS))
+            LossOfProduction.objects.bulk_update(instances, sorted(fields), batch_size=BULK_BATCH_SIZE)
+            rollups.record_changed(old_keys, instances)
+            loss_events_changed()
+        return instances
@@ -0,0 +1,80 @@
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+
+def _key(name):
+    return f'lop:version:{name}'
+
+
+def _modified_key(name):
+    return f'lop:modified:{name}'
+
+
+def _seed():
+    # Counters (re)start from the clock so a counter that was evicted never
+    # goes back to a value that older cache entries may still be keyed on.
+    return time.time_ns() // 1_000_000
+
+
+def get_version(name):
+    """
+    Current value of the version counter ``name``. Counters live in the
+    cache backend so every worker sharing that backend sees the same value.
+    """
+    version = cache.get(_key(name))
+    if version is None:
+        cache.add(_key(name), _seed(), timeout=None)
+        version = cache.get(_key(name))
+    return version
+
+
+async def aget_version(name):
+    """Async get_version(), for views running on the event loop."""
+    version = await cache.aget(_key(name))
+    if version is None:
+        await cache.aadd(_key(name), _seed(), timeout=None)
+        version = await cache.aget(_key(name))
+    return version
+
+
+def get_modified(name):
+    """Unix time of the last bump of ``name``, or None if not known."""
+    return cache.get(_modified_key(name))
+
+
+async def aget_modified(name):
+    """Async get_modified()."""
+    return await cache.aget(_modified_key(name))
+
+
+async def aget_versions(names):
+    """
+    ``(aget_version(name), aget_modified(name))`` for every name in ``names``,
+    read with one cache round trip on the common path.
+    """
+    keys = [key for name in names for key in (_key(name), _modified_key(name))]
+    values = await cache.aget_many(keys) if keys else {}
+    versions = {}
+    for name in names:
+        version = values.get(_key(name))
+        if version is None:
+            version = await aget_version(name)
+        versions[name] = (version, values.get(_modified_key(name)))
+    return versions
+
+
+def bump_version(name):
+    """Increment ``name``, invalidating every cache entry keyed on it."""
+    cache.set(_modified_key(name), time.time(), timeout=None)
+    try:
+        return cache.incr(_key(name))
+    except ValueError:
+        cache.add(_key(name), _seed(), timeout=None)
+        return cache.get(_key(name))
+
+
+def bump_version_on_commit(name):
+    """Bump ``name`` once the current transaction commits (immediately if none)."""
+    transaction.on_commit(lambda: bump_version(name))
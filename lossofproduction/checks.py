@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS
+from django.core.checks import Tags, Warning, register
+
+
+# Backends whose contents are private to one process.
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    """
+    The version counters in caching.py must be shared by every worker,
+    otherwise a change seen by one worker never invalidates the lookup
+    tables, role caches and ETags of the others.
+    """
+    backend = settings.CACHES.get(DEFAULT_CACHE_ALIAS, {}).get('BACKEND')
+    if backend not in PROCESS_LOCAL_CACHES:
+        return []
+    return [Warning(
+        f'The default cache ({backend}) is local to each process, so cache '
+        'invalidations do not reach other worker processes.',
+        hint='Set LOP_REDIS_URL, or run a single worker process.',
+        obj='CACHES',
+        id='lossofproduction.W001',
+    )]
@@ -0,0 +1,117 @@
+import hashlib
+
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+from .caching import aget_versions, bump_version_on_commit, get_modified, get_version
+
+
+# Version counter bumped by every write to LossOfProduction.
+LOSS_EVENTS_VERSION = 'lossofproduction'
+
+
+def loss_events_changed(sender=None, **kwargs):
+    """post_save/post_delete on LossOfProduction; also called by the bulk paths."""
+    bump_version_on_commit(LOSS_EVENTS_VERSION)
+
+
+class _NotModified(Exception):
+    def __init__(self, response):
+        self.response = response
+
+
+class ConditionalGetMixin:
+    """
+    Answer conditional GETs on list and retrieve with ``304 Not Modified``.
+
+    Validators are derived from table version stamps kept in the cache (and,
+    for single objects, a one-column lookup of the row's modification time),
+    so a matching If-None-Match / If-Modified-Since is answered after the
+    permission checks but before the main query or any serialization.
+    """
+    conditional_actions = ('list', 'retrieve')
+
+    # Version counters (see caching.py) that the representation depends on.
+    version_names = ()
+
+    def get_object_modified(self):
+        """Modification time of the object being retrieved, if tracked."""
+        return None
+
+    async def aget_object_modified(self):
+        """
+        Async get_object_modified(). Async views store its result in
+        ``prefetched_object_modified`` so get_validators() need not query.
+        """
+        return None
+
+    async def aget_versions(self):
+        """
+        Version stamps of ``version_names``, read with one cache round trip.
+        Async views store the result in ``prefetched_versions`` so
+        get_validators() need not block on the cache.
+        """
+        return await aget_versions(self.version_names)
+
+    def get_validators(self, request):
+        if hasattr(self, 'prefetched_versions'):
+            stamps = [self.prefetched_versions[name] for name in self.version_names]
+        else:
+            stamps = [(get_version(name), get_modified(name)) for name in self.version_names]
+        versions = [str(version) for version, _ in stamps]
+        modified = [modified for _, modified in stamps]
+        if self.action == 'retrieve':
+            if hasattr(self, 'prefetched_object_modified'):
+                object_modified = self.prefetched_object_modified
+            else:
+                object_modified = self.get_object_modified()
+            if object_modified is not None:
+                versions.append(object_modified.isoformat())
+                modified.append(object_modified.timestamp())
+
+        # Keyed on the view rather than the request path, so the synchronous
+        # and the /api/async/ route of a resource share their ETags.
+        fingerprint = ':'.join([
+            *versions,
+            type(self).__name__,
+            self.action,
+            str(self.kwargs.get(self.lookup_url_kwarg or self.lookup_field, '')),
+            request.META.get('QUERY_STRING', ''),
+            request.accepted_renderer.format or '',
+        ])
+        etag = quote_etag(hashlib.md5(fingerprint.encode('utf-8')).hexdigest())
+        known = [value for value in modified if value is not None]
+        # Last-Modified is only sound if every input has a known modification time.
+        last_modified = int(max(known)) if known and len(known) == len(modified) else None
+        return etag, last_modified
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.check_conditional(request)
+
+    def check_conditional(self, request):
+        """Compute the validators and raise to answer 304 if the request's match."""
+        self._conditional_validators = None
+        if request.method in ('GET', 'HEAD') and self.action in self.conditional_actions:
+            self._conditional_validators = self.get_validators(request)
+            etag, last_modified = self._conditional_validators
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is not None:
+                raise _NotModified(response)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, _NotModified):
+            return exc.response
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        validators = getattr(self, '_conditional_validators', None)
+        if validators and response.status_code in (200, 304):
+            etag, last_modified = validators
+            response.headers['ETag'] = etag
+            if last_modified is not None:
+                response.headers['Last-Modified'] = http_date(last_modified)
+            # Let clients cache, but make them revalidate every time.
+            patch_cache_control(response, private=True, no_cache=True)
+        return response
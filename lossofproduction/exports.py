@@ -0,0 +1,136 @@
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import BaseRenderer
+
+from .models import LossOfProduction
+
+
+EXPORT_CHUNK_SIZE = 2000
+
+# Columns in the same order and with the same keys as LossOfProductionSerializer.
+EXPORT_COLUMNS = [
+    'id',
+    'issue_date',
+    'department',
+    'affected_area',
+    'equipment_or_process_step',
+    'description',
+    'cause',
+    'event_type',
+    'status',
+    'date_solved',
+    'reporting_limit_area',
+    'reporting_limit',
+]
+
+_VALUES = (
+    'id',
+    'issue_date',
+    'department__name',
+    'affected_area__name',
+    'equipment_or_process_step',
+    'description',
+    'cause__name',
+    'event_type',
+    'status',
+    'date_solved',
+    'reporting_limit_area__name',
+    'reporting_limit_area__department__name',
+    'reporting_limit',
+)
+
+_EVENT_TYPE_LABELS = dict(LossOfProduction.EventType.choices)
+_STATUS_LABELS = dict(LossOfProduction.Status.choices)
+
+
+def export_rows(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yield one tuple per event in EXPORT_COLUMNS order. Lookup names are
+    fetched through joins and rows are streamed from the cursor, so memory
+    use does not grow with the size of the export.
+    """
+    for (pk, issue_date, department, affected_area, equipment, description, cause,
+         event_type, status, date_solved, rla, rla_department, reporting_limit) in (
+        queryset.values_list(*_VALUES).iterator(chunk_size=chunk_size)
+    ):
+        yield (
+            pk,
+            issue_date,
+            department,
+            affected_area,
+            equipment,
+            description,
+            cause,
+            _EVENT_TYPE_LABELS.get(event_type, event_type),
+            _STATUS_LABELS.get(status, status),
+            date_solved,
+            f'{rla} ({rla_department})',
+            reporting_limit,
+        )
+
+
+class _Echo:
+    """File-like object whose write() hands the line back to csv.writer's caller."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_COLUMNS)
+    for row in rows:
+        yield writer.writerow(
+            ['' if value is None else value for value in row]
+        )
+
+
+def stream_ndjson(rows):
+    encoder = DjangoJSONEncoder()
+    for row in rows:
+        yield encoder.encode(dict(zip(EXPORT_COLUMNS, row))) + '\n'
+
+
+class _ExportRenderer(BaseRenderer):
+    """
+    Only used for content negotiation; successful exports bypass rendering
+    with a StreamingHttpResponse and the view switches error responses to
+    JSONRenderer.
+    """
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return json.dumps(data, cls=DjangoJSONEncoder).encode(self.charset)
+
+
+class CSVExportRenderer(_ExportRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class NDJSONExportRenderer(_ExportRenderer):
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+
+EXPORT_RENDERERS = [CSVExportRenderer, NDJSONExportRenderer]
+
+_STREAMS = {
+    CSVExportRenderer.format: stream_csv,
+    NDJSONExportRenderer.format: stream_ndjson,
+}
+
+
+def streaming_export(queryset, renderer, filename='lossofproduction'):
+    """Stream ``queryset`` in the format of the negotiated export renderer."""
+    response = StreamingHttpResponse(
+        _STREAMS[renderer.format](export_rows(queryset)),
+        content_type=f'{renderer.media_type}; charset={renderer.charset}',
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{renderer.format}"'
+    return response
@@ -0,0 +1,168 @@
+from django.utils.dateparse import parse_date
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend, OrderingFilter
+
+from .models import LossOfProduction, equipment_key
+from .search import search_loss_events
+
+
+def _split(value):
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+class LossOfProductionFilterBackend(BaseFilterBackend):
+    """
+    Server-side filters for the loss-event endpoint.
+
+    Foreign keys and choice fields accept a comma separated list of values,
+    e.g. ``?department=1,4&status=ONGOING``. ``?equipment=`` matches the
+    normalized equipment key, so spelling variants of the same equipment
+    match. Every filter maps onto a plain column predicate so the composite
+    indexes on LossOfProduction can serve it.
+    """
+    fk_params = ('department', 'affected_area', 'cause', 'reporting_limit_area')
+    choice_params = {
+        'event_type': LossOfProduction.EventType.values,
+        'status': LossOfProduction.Status.values,
+    }
+    date_params = {
+        'issue_date_after': 'issue_date__gte',
+        'issue_date_before': 'issue_date__lte',
+    }
+    boolean_params = {
+        'date_solved__isnull': 'date_solved__isnull',
+    }
+    equipment_param = 'equipment'
+
+    def filter_queryset(self, request, queryset, view):
+        return queryset.filter(**self.get_filter_kwargs(request.query_params))
+
+    def get_filter_kwargs(self, params):
+        kwargs = {}
+        errors = {}
+
+        for name in self.fk_params:
+            if name not in params:
+                continue
+            try:
+                ids = [int(value) for value in _split(params[name])]
+            except ValueError:
+                errors[name] = 'Expected a comma separated list of ids.'
+                continue
+            if ids:
+                kwargs[f'{name}_id__in'] = ids
+
+        for name, choices in self.choice_params.items():
+            if name not in params:
+                continue
+            values = _split(params[name])
+            invalid = [value for value in values if value not in choices]
+            if invalid:
+                errors[name] = f'Invalid choice(s): {", ".join(invalid)}.'
+            elif values:
+                kwargs[f'{name}__in'] = values
+
+        for name, lookup in self.date_params.items():
+            if not params.get(name):
+                continue
+            try:
+                value = parse_date(params[name])
+            except ValueError:
+                value = None
+            if value is None:
+                errors[name] = 'Expected a date in YYYY-MM-DD format.'
+            else:
+                kwargs[lookup] = value
+
+        for name, lookup in self.boolean_params.items():
+            if name not in params:
+                continue
+            value = params[name].lower()
+            if value in ('true', '1'):
+                kwargs[lookup] = True
+            elif value in ('false', '0'):
+                kwargs[lookup] = False
+            else:
+                errors[name] = 'Expected true or false.'
+
+        key = equipment_key(params.get(self.equipment_param))
+        if key:
+            kwargs['equipment_key'] = key
+
+        if errors:
+            raise ValidationError(errors)
+        return kwargs
+
+    def get_schema_operation_parameters(self, view):
+        parameters = []
+        for name in self.fk_params:
+            parameters.append(self._parameter(name, f'Comma separated {name} ids.', 'string'))
+        for name, choices in self.choice_params.items():
+            parameters.append(self._parameter(name, f'Comma separated values of: {", ".join(choices)}.', 'string'))
+        for name in self.date_params:
+            parameters.append(self._parameter(name, 'Inclusive issue_date bound (YYYY-MM-DD).', 'string', 'date'))
+        for name in self.boolean_params:
+            parameters.append(self._parameter(name, 'Filter on whether date_solved is empty.', 'boolean'))
+        parameters.append(self._parameter(
+            self.equipment_param, 'Equipment or process step, matched case- and punctuation-insensitively.', 'string'
+        ))
+        return parameters
+
+    @staticmethod
+    def _parameter(name, description, type_, format_=None):
+        schema = {'type': type_}
+        if format_:
+            schema['format'] = format_
+        return {
+            'name': name,
+            'required': False,
+            'in': 'query',
+            'description': description,
+            'schema': schema,
+        }
+
+
+
+class LossOfProductionSearchFilter(BaseFilterBackend):
+    """Full-text search with ``?q=``; see search.py for the index backends."""
+    search_param = 'q'
+
+    def get_search_query(self, request):
+        return request.query_params.get(self.search_param, '').strip()
+
+    def filter_queryset(self, request, queryset, view):
+        query = self.get_search_query(request)
+        if not query:
+            return queryset
+        return search_loss_events(queryset, query)
+
+    def get_schema_operation_parameters(self, view):
+        return [{
+            'name': self.search_param,
+            'required': False,
+            'in': 'query',
+            'description': 'Full-text search over equipment/process step, description and reporting limit.',
+            'schema': {'type': 'string'},
+        }]
+
+
+class LossOfProductionOrderingFilter(OrderingFilter):
+    """
+    OrderingFilter that ranks search results best-first unless ``?ordering=``
+    is given, and answers 400 for fields outside the view's ordering_fields
+    instead of silently ignoring them.
+    """
+
+    def get_ordering(self, request, queryset, view):
+        params = request.query_params.get(self.ordering_param)
+        if not params and LossOfProductionSearchFilter().get_search_query(request):
+            return ['-search_rank']
+        if params:
+            valid = {name for name, _ in self.get_valid_fields(queryset, view, {'request': request})}
+            invalid = [
+                field for field in (param.strip() for param in params.split(','))
+                if field and field.lstrip('-') not in valid
+            ]
+            if invalid:
+                raise ValidationError({self.ordering_param: f'Invalid ordering field(s): {", ".join(invalid)}.'})
+        return super().get_ordering(request, queryset, view)
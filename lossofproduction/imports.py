@@ -0,0 +1,292 @@
+import csv
+import datetime
+import os
+
+from django.db import transaction
+from django.utils.dateparse import parse_date
+
+from .models import (
+    Department,
+    AffectedArea,
+    Cause,
+    ReportingLimitArea,
+    LossOfProduction,
+)
+from .conditional import loss_events_changed
+from .lookups import get_table, lookup_changed
+from . import rollups
+
+
+# Column -> lookup model; the file holds lookup names, not ids.
+LOOKUP_COLUMNS = {
+    'department': Department,
+    'affected_area': AffectedArea,
+    'cause': Cause,
+    'reporting_limit_area': ReportingLimitArea,
+}
+
+REQUIRED_COLUMNS = (
+    'issue_date',
+    'department',
+    'affected_area',
+    'equipment_or_process_step',
+    'cause',
+    'reporting_limit_area',
+)
+
+OPTIONAL_COLUMNS = ('description', 'event_type', 'status', 'date_solved', 'reporting_limit')
+
+IMPORT_CHUNK_SIZE = 1000
+
+
+def _key(name):
+    return ' '.join(str(name).split()).casefold()
+
+
+def _column(header):
+    return '_'.join(str(header or '').strip().lower().replace('-', ' ').split())
+
+
+def _choices(choices):
+    # Accept both the stored value and the label, case-insensitively.
+    mapping = {}
+    for value, label in choices:
+        mapping[_key(value)] = value
+        mapping[_key(label)] = value
+    return mapping
+
+
+EVENT_TYPES = _choices(LossOfProduction.EventType.choices)
+STATUSES = _choices(LossOfProduction.Status.choices)
+
+
+def _record(header, values):
+    values = list(values)[:len(header)]
+    return dict(zip(header, values + [None] * (len(header) - len(values))))
+
+
+def read_csv(path, encoding='utf-8-sig', delimiter=','):
+    """Yield each data row of a CSV file as a dict keyed by normalised header."""
+    with open(path, newline='', encoding=encoding) as handle:
+        reader = csv.reader(handle, delimiter=delimiter)
+        header = [_column(name) for name in next(reader, [])]
+        for values in reader:
+            if any(value.strip() for value in values):
+                yield _record(header, values)
+
+
+def read_xlsx(path, sheet=None):
+    """Yield each data row of a worksheet, streamed in openpyxl's read-only mode."""
+    try:
+        import openpyxl
+    except ImportError:
+        raise ImportError('Reading .xlsx files requires openpyxl (pip install openpyxl).')
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        if sheet and sheet not in workbook.sheetnames:
+            raise ValueError(f'Worksheet "{sheet}" does not exist.')
+        worksheet = workbook[sheet] if sheet else workbook.active
+        rows = worksheet.iter_rows(values_only=True)
+        header = [_column(name) for name in next(rows, ())]
+        for values in rows:
+            if any(value not in (None, '') for value in values):
+                yield _record(header, values)
+    finally:
+        workbook.close()
+
+
+def read_rows(path, file_format=None, **options):
+    file_format = file_format or os.path.splitext(path)[1].lstrip('.').lower()
+    if file_format == 'xlsx':
+        return read_xlsx(path, sheet=options.get('sheet'))
+    if file_format in ('csv', 'txt'):
+        return read_csv(path, encoding=options.get('encoding', 'utf-8-sig'), delimiter=options.get('delimiter', ','))
+    raise ValueError(f'Unsupported file format "{file_format}"; expected csv or xlsx.')
+
+
+class LossImporter:
+    """
+    Turns rows read from a file into LossOfProduction instances and inserts
+    them chunk by chunk. Lookup names are resolved through dictionaries
+    built once from the in-memory lookup tables; with ``create_missing``,
+    unknown names are created in bulk once per chunk. Rows that fail
+    validation are handed back with their errors instead of being written.
+    """
+
+    def __init__(self, create_missing=False, date_format=None, chunk_size=IMPORT_CHUNK_SIZE):
+        self.create_missing = create_missing
+        self.date_format = date_format
+        self.chunk_size = chunk_size
+        self.max_lengths = {
+            field.name: field.max_length
+            for field in LossOfProduction._meta.concrete_fields
+            if field.max_length
+        }
+        # Lookup name key -> id; reporting limit areas also map to their department.
+        self.ids = {}
+        for column, model in LOOKUP_COLUMNS.items():
+            rows = get_table(model).rows
+            self.ids[column] = {_key(row['name']): row['id'] for row in rows}
+        self.rla_departments = {row['id']: row['department_id'] for row in get_table(ReportingLimitArea).rows}
+        self.created_lookups = {column: 0 for column in LOOKUP_COLUMNS}
+
+    # -- parsing ---------------------------------------------------------
+
+    def _date(self, value, column, errors, required):
+        if isinstance(value, datetime.datetime):
+            return value.date()
+        if isinstance(value, datetime.date):
+            return value
+        value = str(value).strip() if value is not None else ''
+        if not value:
+            if required:
+                errors[column] = 'This field is required.'
+            return None
+        try:
+            if self.date_format:
+                return datetime.datetime.strptime(value, self.date_format).date()
+            parsed = parse_date(value)
+        except ValueError:
+            parsed = None
+        if parsed is None:
+            errors[column] = f'Invalid date "{value}".'
+        return parsed
+
+    def parse(self, row):
+        """
+        Validated field values of one file row, with lookup names in place
+        of ids, and a dict of errors per column.
+        """
+        values, errors = {}, {}
+        for column in REQUIRED_COLUMNS + OPTIONAL_COLUMNS:
+            if column in ('issue_date', 'date_solved'):
+                values[column] = self._date(row.get(column), column, errors, column == 'issue_date')
+                continue
+            value = row.get(column)
+            value = '' if value is None else str(value).strip()
+            if not value and column in REQUIRED_COLUMNS:
+                errors[column] = 'This field is required.'
+            elif column in self.max_lengths and len(value) > self.max_lengths[column]:
+                errors[column] = f'Ensure this field has no more than {self.max_lengths[column]} characters.'
+            values[column] = value
+
+        for column, choices, default in (
+            ('event_type', EVENT_TYPES, LossOfProduction.EventType.UNPLANNED),
+            ('status', STATUSES, LossOfProduction.Status.NO_SELECTION),
+        ):
+            if not values[column]:
+                values[column] = default
+            elif _key(values[column]) in choices:
+                values[column] = choices[_key(values[column])]
+            else:
+                errors[column] = f'"{values[column]}" is not a valid choice.'
+        return values, errors
+
+    # -- lookups ---------------------------------------------------------
+
+    def _create_lookups(self, parsed):
+        """Bulk-create every lookup name in ``parsed`` that does not exist yet."""
+        for column in ('department', 'affected_area', 'cause'):
+            model = LOOKUP_COLUMNS[column]
+            names = {}
+            for values, errors in parsed:
+                if not errors and _key(values[column]) not in self.ids[column]:
+                    names.setdefault(_key(values[column]), values[column])
+            if names:
+                self._insert_lookups(column, [model(name=name) for name in names.values()])
+
+        departments = self.ids['department']
+        areas = {}
+        for values, errors in parsed:
+            key = _key(values['reporting_limit_area'])
+            if not errors and key not in self.ids['reporting_limit_area']:
+                # A new area belongs to the department of the first row naming it.
+                areas.setdefault(key, ReportingLimitArea(
+                    name=values['reporting_limit_area'],
+                    department_id=departments[_key(values['department'])],
+                ))
+        if areas:
+            self._insert_lookups('reporting_limit_area', list(areas.values()))
+
+    def _insert_lookups(self, column, instances):
+        model = LOOKUP_COLUMNS[column]
+        model.objects.bulk_create(instances, ignore_conflicts=True)
+        # Read the ids back: ignore_conflicts does not return them, and a
+        # concurrent writer may have created some of the names first.
+        rows = model.objects.filter(name__in=[instance.name for instance in instances])
+        for row in rows.values('id', 'name', *(['department_id'] if model is ReportingLimitArea else [])):
+            self.ids[column][_key(row['name'])] = row['id']
+            if model is ReportingLimitArea:
+                self.rla_departments[row['id']] = row['department_id']
+        self.created_lookups[column] += len(instances)
+        # bulk_create() sends no post_save signals.
+        lookup_changed(model)
+
+    def _resolve(self, values, errors):
+        """Replace lookup names with ids and apply the LossOfProduction.clean() rule."""
+        for column in LOOKUP_COLUMNS:
+            pk = self.ids[column].get(_key(values[column]))
+            if pk is None:
+                errors[column] = f'Unknown {column.replace("_", " ")} "{values[column]}".'
+            values[f'{column}_id'] = pk
+        if not errors and self.rla_departments[values['reporting_limit_area_id']] != values['department_id']:
+            errors['reporting_limit_area'] = (
+                f'The selected reporting_limit_area ({values["reporting_limit_area"]}) does not belong '
+                f'to the selected department ({values["department"]}).'
+            )
+
+    # -- import ----------------------------------------------------------
+
+    def _build(self, values):
+        instance = LossOfProduction(
+            issue_date=values['issue_date'],
+            department_id=values['department_id'],
+            affected_area_id=values['affected_area_id'],
+            equipment_or_process_step=values['equipment_or_process_step'],
+            description=values['description'],
+            cause_id=values['cause_id'],
+            event_type=values['event_type'],
+            status=values['status'],
+            date_solved=values['date_solved'],
+            reporting_limit_area_id=values['reporting_limit_area_id'],
+            reporting_limit=values['reporting_limit'],
+        )
+        instance.refresh_derived_fields()
+        return instance
+
+    def import_chunk(self, rows):
+        """
+        Validate and insert one chunk of file rows in a single transaction.
+        Returns the number of inserted events and a list of
+        ``(index in chunk, row, errors)`` for the rejected ones.
+        """
+        parsed = [self.parse(row) for row in rows]
+        with transaction.atomic():
+            if self.create_missing:
+                self._create_lookups(parsed)
+
+            instances, rejected = [], []
+            for index, (row, (values, errors)) in enumerate(zip(rows, parsed)):
+                if not errors:
+                    self._resolve(values, errors)
+                if errors:
+                    rejected.append((index, row, errors))
+                else:
+                    instances.append(self._build(values))
+
+            if instances:
+                created = LossOfProduction.objects.bulk_create(instances, batch_size=self.chunk_size)
+                # bulk_create() sends no post_save signals.
+                rollups.record_created(created)
+                loss_events_changed()
+        return len(instances), rejected
+
+    def chunks(self, rows):
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= self.chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
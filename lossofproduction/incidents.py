@@ -0,0 +1,173 @@
+from collections import deque
+from itertools import groupby
+
+from django.db.models import Count
+from django.utils import timezone
+
+from .analytics import CHOICE_LABELS, DIMENSIONS
+from .models import LossOfProduction
+from .pagination import KeysetCursorPagination
+
+
+RESOLUTION_DIMENSIONS = ('department', 'affected_area', 'cause', 'event_type')
+PERCENTILES = (50, 90, 95)
+
+RECURRENCE_DEFAULT_WINDOW_DAYS = 30
+RECURRENCE_DEFAULT_MIN_EVENTS = 3
+RECURRENCE_CHUNK_SIZE = 2000
+
+
+class OpenIncidentPagination(KeysetCursorPagination):
+    """Oldest open incident first; served by the filtered ONGOING index."""
+    ordering = ('issue_date', 'id')
+
+
+def open_incidents(queryset):
+    return queryset.filter(status=LossOfProduction.Status.ONGOING)
+
+
+def add_age(rows, data):
+    """Add ``age_days`` (days open as of today) to serialized open incidents."""
+    today = timezone.localdate()
+    for row, item in zip(rows, data):
+        item['age_days'] = (today - row['issue_date']).days
+    return data
+
+
+def _percentile(histogram, count, percent):
+    """
+    Continuous percentile (as PERCENTILE_CONT) of the sorted ``histogram``
+    of (value, frequency) pairs without expanding it.
+    """
+    position = (count - 1) * percent / 100
+    lower_index, fraction = int(position), position - int(position)
+    lower = upper = None
+    seen = 0
+    for value, frequency in histogram:
+        seen += frequency
+        if lower is None and seen > lower_index:
+            lower = value
+        if seen > lower_index + 1 or (fraction == 0 and lower is not None):
+            upper = value
+            break
+    if upper is None:
+        upper = histogram[-1][0]
+    return round(lower + (upper - lower) * fraction, 2)
+
+
+def resolution_statistics(queryset, dimensions):
+    """
+    Mean time to resolve, min/max and percentiles of ``resolution_days`` per
+    group. The database returns the per-group histogram of resolution days
+    from one GROUP BY query; the figures are derived from those counts, so
+    no event rows are transferred.
+    """
+    columns = []
+    for name in dimensions:
+        columns.extend(column for column in DIMENSIONS[name] if column)
+
+    rows = (
+        queryset
+        .filter(resolution_days__isnull=False)
+        .order_by()
+        .values(*columns, 'resolution_days')
+        .annotate(events=Count('id'))
+        .order_by(*columns, 'resolution_days')
+    )
+
+    groups = []
+    for _, group_rows in groupby(rows, key=lambda row: tuple(row[column] for column in columns)):
+        group_rows = list(group_rows)
+        histogram = [(row['resolution_days'], row['events']) for row in group_rows]
+        count = sum(frequency for _, frequency in histogram)
+
+        group = {}
+        first = group_rows[0]
+        for name in dimensions:
+            key, label = DIMENSIONS[name]
+            if label:
+                group[f'{name}_id'] = first[key]
+                group[name] = first[label]
+            else:
+                group[name] = first[key]
+                group[f'{name}_display'] = CHOICE_LABELS[name].get(first[key], first[key])
+        group['resolved'] = count
+        group['mean_days'] = round(sum(value * frequency for value, frequency in histogram) / count, 2)
+        group['min_days'] = histogram[0][0]
+        group['max_days'] = histogram[-1][0]
+        for percent in PERCENTILES:
+            group[f'p{percent}_days'] = _percentile(histogram, count, percent)
+        groups.append(group)
+
+    groups.sort(key=lambda group: group['mean_days'], reverse=True)
+    return groups
+
+
+def _recurrences(rows, window_days, min_events):
+    """
+    One pass over the event ``rows`` of one equipment in date order, keeping
+    the events of the last ``window_days`` days in a deque. Returns the
+    number of events, the most recent spelling, the peak window and the
+    episodes: maximal runs of events that belong to some window with at
+    least ``min_events`` events.
+    """
+    window = deque()
+    peak = None
+    episodes = []
+    for index, (_, issue_date, pk, equipment) in enumerate(rows):
+        window.append((index, issue_date, pk))
+        while (issue_date - window[0][1]).days >= window_days:
+            window.popleft()
+        if peak is None or len(window) > peak[0]:
+            peak = (len(window), window[0][1], issue_date)
+        if len(window) < min_events:
+            continue
+        episode = episodes[-1] if episodes else None
+        if episode is not None and window[0][0] <= episode['last_index']:
+            episode['ids'].extend(pk for i, _, pk in window if i > episode['last_index'])
+            episode['end'] = issue_date
+        else:
+            episode = {'start': window[0][1], 'end': issue_date, 'ids': [pk for _, _, pk in window]}
+            episodes.append(episode)
+        episode['last_index'] = index
+    return index + 1, equipment, peak, episodes
+
+
+def recurring_failures(queryset, window_days, min_events):
+    """
+    Equipment with at least ``min_events`` losses within ``window_days``
+    days. Events are streamed ordered by the normalized equipment key and
+    issue date (the lop_equipment_date_idx order) and each equipment is
+    scanned once with a sliding window, so memory holds one window at a
+    time plus the flagged events.
+    """
+    rows = (
+        queryset
+        .exclude(equipment_key='')
+        .order_by('equipment_key', 'issue_date', 'id')
+        .values_list('equipment_key', 'issue_date', 'id', 'equipment_or_process_step')
+        .iterator(chunk_size=RECURRENCE_CHUNK_SIZE)
+    )
+
+    result = []
+    for key, equipment_rows in groupby(rows, key=lambda row: row[0]):
+        count, equipment, peak, episodes = _recurrences(equipment_rows, window_days, min_events)
+        if not episodes:
+            continue
+        result.append({
+            'equipment_key': key,
+            'equipment': equipment,
+            'events': count,
+            'peak': {'count': peak[0], 'start': peak[1].isoformat(), 'end': peak[2].isoformat()},
+            'episodes': [
+                {
+                    'start': episode['start'].isoformat(),
+                    'end': episode['end'].isoformat(),
+                    'events': len(episode['ids']),
+                    'ids': episode['ids'],
+                }
+                for episode in episodes
+            ],
+        })
+    result.sort(key=lambda item: (-item['peak']['count'], -item['events'], item['equipment_key']))
+    return result
@@ -0,0 +1,329 @@
+import hmac
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse
+from django.utils.functional import SimpleLazyObject, empty
+
+
+logger = logging.getLogger('lossofproduction.slow_queries')
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+# Metrics of the request being handled. A context variable rather than a
+# thread-local, so queries run through sync_to_async are attributed too.
+_current = ContextVar('lop_request_metrics', default=None)
+
+
+def _slow_query_seconds():
+    return getattr(settings, 'LOP_SLOW_QUERY_MS', 500) / 1000
+
+
+def _is_staff(request):
+    """
+    Whether the already authenticated user of ``request`` is staff. A user
+    that nothing has resolved yet is not loaded just to answer this.
+    """
+    user = getattr(request, 'user', None)
+    if isinstance(user, SimpleLazyObject) and user._wrapped is empty:
+        return False
+    return bool(user is not None and user.is_staff)
+
+
+class RequestMetrics:
+    """Timings collected while one request is handled, in seconds."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.phases = {}
+        self._view_started = None
+
+    def add(self, phase, seconds):
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def view_started(self):
+        self._view_started = (time.perf_counter(), self.db_time)
+
+    def view_finished(self):
+        # Time spent in the view handler outside the database, which for
+        # these API views is building the serializer output.
+        if self._view_started is None:
+            return
+        started, db_time = self._view_started
+        self._view_started = None
+        self.add('serialize', max(time.perf_counter() - started - (self.db_time - db_time), 0.0))
+
+
+def current_metrics():
+    return _current.get()
+
+
+def query_wrapper(execute, sql, params, many, context):
+    """Execute wrapper counting and timing every query of the current request."""
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = time.perf_counter() - start
+        metrics = _current.get()
+        if metrics is not None:
+            metrics.queries += 1
+            metrics.db_time += duration
+        if duration >= _slow_query_seconds():
+            SLOW_QUERIES.inc()
+            logger.warning(
+                'Slow query (%.1f ms) on %s: %s',
+                duration * 1000,
+                context['connection'].alias,
+                sql if len(sql) <= 2000 else sql[:2000] + '...',
+            )
+
+
+def install_query_wrapper(sender, connection, **kwargs):
+    """connection_created handler."""
+    if query_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(query_wrapper)
+
+
+class Histogram:
+    """Prometheus-style cumulative histogram, labelled by view and method."""
+
+    def __init__(self, name, documentation, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+            counts = series[0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = sorted((labels, list(counts), total, count) for labels, (counts, total, count) in self._series.items())
+        for (view, method), counts, total, count in series:
+            labels = f'view="{_escape(view)}",method="{_escape(method)}"'
+            for bound, bucket_count in zip(self.buckets, counts):
+                lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {bucket_count}')
+            lines.append(f'{self.name}_bucket{{{labels},le="+Inf"}} {count}')
+            lines.append(f'{self.name}_sum{{{labels}}} {total}')
+            lines.append(f'{self.name}_count{{{labels}}} {count}')
+        return lines
+
+
+class Counter:
+    def __init__(self, name, documentation):
+        self.name = name
+        self.documentation = documentation
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self):
+        with self._lock:
+            self.value += 1
+
+    def expose(self):
+        return [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter', f'{self.name} {self.value}']
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+REQUEST_DURATION = Histogram('lop_request_duration_seconds', 'Total time to handle a request.', DURATION_BUCKETS)
+DB_DURATION = Histogram('lop_request_db_duration_seconds', 'Time spent in database queries per request.', DURATION_BUCKETS)
+SERIALIZE_DURATION = Histogram(
+    'lop_request_serialize_duration_seconds', 'Time spent building and rendering the response body.', DURATION_BUCKETS
+)
+AUTH_DURATION = Histogram('lop_request_auth_duration_seconds', 'Time spent authenticating the request.', DURATION_BUCKETS)
+PERMISSION_DURATION = Histogram(
+    'lop_request_permission_duration_seconds', 'Time spent in permission and throttle checks.', DURATION_BUCKETS
+)
+QUERY_COUNT = Histogram('lop_request_queries', 'Database queries per request.', QUERY_BUCKETS)
+SLOW_QUERIES = Counter('lop_slow_queries_total', 'Queries slower than LOP_SLOW_QUERY_MS.')
+
+# Server-Timing metric name -> (phase, histogram).
+PHASES = (
+    ('auth', 'auth', AUTH_DURATION),
+    ('perm', 'permissions', PERMISSION_DURATION),
+    ('ser', 'serialize', SERIALIZE_DURATION),
+)
+
+
+class RequestMetricsMiddleware:
+    """
+    Measures every request: query count and time (through query_wrapper),
+    authentication, permission and serialization time (through
+    TimedAPIViewMixin and response rendering) and total time. Adds them
+    as a ``Server-Timing`` header and records them in the histograms
+    served by ``metrics_view``. Should be the first middleware so the
+    total covers the whole stack.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.record(request, response, metrics)
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.record(request, response, metrics)
+
+    def record(self, request, response, metrics):
+        total = time.perf_counter() - metrics.started
+
+        match = request.resolver_match
+        labels = (match.view_name if match else 'unresolved', request.method)
+        REQUEST_DURATION.observe(labels, total)
+        DB_DURATION.observe(labels, metrics.db_time)
+        QUERY_COUNT.observe(labels, metrics.queries)
+        for _, phase, histogram in PHASES:
+            if phase in metrics.phases:
+                histogram.observe(labels, metrics.phases[phase])
+
+        # Query counts and DB time are internals: everyone sees them only
+        # when LOP_SERVER_TIMING is on (DEBUG by default), otherwise staff.
+        if getattr(settings, 'LOP_SERVER_TIMING', settings.DEBUG) or _is_staff(request):
+            timings = [f'db;dur={metrics.db_time * 1000:.2f};desc="{metrics.queries} queries"']
+            timings += [
+                f'{name};dur={metrics.phases[phase] * 1000:.2f}'
+                for name, phase, _ in PHASES
+                if phase in metrics.phases
+            ]
+            timings.append(f'total;dur={total * 1000:.2f}')
+            response.headers['Server-Timing'] = ', '.join(timings)
+        return response
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered after the view returns; time the render.
+        metrics = _current.get()
+        if metrics is not None:
+            started = time.perf_counter()
+
+            def rendered(response):
+                metrics.add('serialize', time.perf_counter() - started)
+
+            response.add_post_render_callback(rendered)
+        return response
+
+
+class TimedAPIViewMixin:
+    """Records authentication, permission and view handler time on DRF views."""
+
+    def perform_authentication(self, request):
+        metrics = _current.get()
+        if metrics is None:
+            return super().perform_authentication(request)
+        with metrics.phase('auth'):
+            super().perform_authentication(request)
+
+    def check_permissions(self, request):
+        metrics = _current.get()
+        if metrics is None:
+            return super().check_permissions(request)
+        with metrics.phase('permissions'):
+            super().check_permissions(request)
+
+    def check_object_permissions(self, request, obj):
+        metrics = _current.get()
+        if metrics is None:
+            return super().check_object_permissions(request, obj)
+        with metrics.phase('permissions'):
+            super().check_object_permissions(request, obj)
+
+    def check_throttles(self, request):
+        metrics = _current.get()
+        if metrics is None:
+            return super().check_throttles(request)
+        with metrics.phase('permissions'):
+            super().check_throttles(request)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        metrics = _current.get()
+        if metrics is not None:
+            metrics.view_started()
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        metrics = _current.get()
+        if metrics is not None:
+            metrics.view_finished()
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+def _metrics_token_matches(request):
+    token = getattr(settings, 'LOP_METRICS_TOKEN', None)
+    if not token:
+        return False
+    scheme, _, credentials = request.headers.get('Authorization', '').partition(' ')
+    return scheme.lower() == 'bearer' and hmac.compare_digest(credentials.strip().encode(), token.encode())
+
+
+def metrics_view(request):
+    """
+    Prometheus text exposition of the request histograms of this process.
+    Open to scrapers sending ``Authorization: Bearer <LOP_METRICS_TOKEN>``,
+    to staff users and to LOP_METRICS_ALLOWED_IPS (none by default: behind
+    a reverse proxy every request comes from the proxy's address).
+    """
+    allowed = getattr(settings, 'LOP_METRICS_ALLOWED_IPS', ())
+    user = getattr(request, 'user', None)
+    if not (
+        _metrics_token_matches(request)
+        or (user is not None and user.is_staff)
+        or request.META.get('REMOTE_ADDR') in allowed
+    ):
+        raise PermissionDenied
+    lines = []
+    for metric in (
+        REQUEST_DURATION, DB_DURATION, SERIALIZE_DURATION, AUTH_DURATION, PERMISSION_DURATION, QUERY_COUNT,
+        SLOW_QUERIES,
+    ):
+        lines.extend(metric.expose())
+    return HttpResponse('\n'.join(lines) + '\n', content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,147 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+from .caching import aget_version, bump_version_on_commit, get_version
+from .models import (
+    Department,
+    AffectedArea,
+    Cause,
+    ReportingLimitArea,
+)
+
+
+LOOKUP_MODELS = (Department, AffectedArea, Cause, ReportingLimitArea)
+
+# Process-local copy of each table, reused while its shared version is unchanged.
+_tables = {}
+
+
+def _timeout():
+    return getattr(settings, 'LOP_LOOKUP_CACHE_TIMEOUT', 24 * 60 * 60)
+
+
+def version_name(model):
+    return f'lookup:{model._meta.label_lower}'
+
+
+class LookupTable:
+    """
+    In-memory snapshot of one lookup table. Rows are plain dicts; model
+    instances are built on demand so callers never share mutable objects.
+    """
+
+    def __init__(self, model, version, rows):
+        self.model = model
+        self.version = version
+        self.rows = rows
+        self.by_id = {row['id']: row for row in rows}
+
+    def __contains__(self, pk):
+        return pk in self.by_id
+
+    def get(self, pk):
+        row = self.by_id.get(pk)
+        return self._build(row) if row is not None else None
+
+    def instances(self):
+        return [self._build(row) for row in self.rows]
+
+    def load_missing(self, ids):
+        """
+        Add the rows of any of ``ids`` that were inserted after the snapshot
+        was taken, with one query for all of them. The table version bump
+        for the insert replaces the snapshot shortly after; until then
+        callers never fall back to a query per row.
+        """
+        missing = {pk for pk in ids if pk is not None and pk not in self.by_id}
+        if missing:
+            for row in _rows_queryset(self.model).filter(pk__in=missing):
+                self.by_id[row['id']] = row
+
+    async def aload_missing(self, ids):
+        """Async load_missing()."""
+        missing = {pk for pk in ids if pk is not None and pk not in self.by_id}
+        if missing:
+            async for row in _rows_queryset(self.model).filter(pk__in=missing):
+                self.by_id[row['id']] = row
+
+    def label(self, pk):
+        """Display label of ``pk``, identical to str() of the instance."""
+        row = self.by_id.get(pk)
+        if row is None:
+            return None
+        if self.model is ReportingLimitArea:
+            return f'{row["name"]} ({row["department__name"]})'
+        return row['name']
+
+    def _build(self, row):
+        if self.model is ReportingLimitArea:
+            instance = ReportingLimitArea(id=row['id'], name=row['name'])
+            instance.department = _saved(Department(id=row['department_id'], name=row['department__name']))
+        else:
+            instance = self.model(id=row['id'], name=row['name'])
+        return _saved(instance)
+
+
+def _saved(instance):
+    instance._state.adding = False
+    instance._state.db = DEFAULT_DB_ALIAS
+    return instance
+
+
+def _rows_queryset(model):
+    if model is ReportingLimitArea:
+        return model.objects.values('id', 'name', 'department_id', 'department__name')
+    return model.objects.values('id', 'name')
+
+
+def _load_rows(model):
+    return list(_rows_queryset(model))
+
+
+def get_table(model):
+    """
+    Current LookupTable for ``model``. Costs one cache read for the version
+    counter; the rows come from process memory, then the shared cache, and
+    only hit the database after the table has changed.
+    """
+    version = get_version(version_name(model))
+    table = _tables.get(model)
+    if table is not None and table.version == version:
+        return table
+
+    key = f'lop:lookup:{model._meta.label_lower}:{version}'
+    rows = cache.get(key)
+    if rows is None:
+        rows = _load_rows(model)
+        cache.set(key, rows, _timeout())
+    table = _tables[model] = LookupTable(model, version, rows)
+    return table
+
+
+async def aget_table(model):
+    """
+    Async get_table(). After it returns, get_table() for the same model is
+    answered from process memory until the table changes again.
+    """
+    version = await aget_version(version_name(model))
+    table = _tables.get(model)
+    if table is not None and table.version == version:
+        return table
+
+    key = f'lop:lookup:{model._meta.label_lower}:{version}'
+    rows = await cache.aget(key)
+    if rows is None:
+        rows = [row async for row in _rows_queryset(model)]
+        await cache.aset(key, rows, _timeout())
+    table = _tables[model] = LookupTable(model, version, rows)
+    return table
+
+
+def lookup_changed(sender, **kwargs):
+    """post_save/post_delete on a lookup model."""
+    bump_version_on_commit(version_name(sender))
+    if sender is Department:
+        # Reporting limit areas carry their department's name.
+        bump_version_on_commit(version_name(ReportingLimitArea))
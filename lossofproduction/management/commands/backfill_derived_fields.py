@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from lossofproduction.models import LossOfProduction
+
+
+class Command(BaseCommand):
+    help = 'Recompute the stored derived columns of every loss event, in primary-key chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=2000,
+            help='Number of events read and updated per transaction',
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = max(options['chunk_size'], 1)
+        fields = LossOfProduction.DERIVED_FIELDS
+        # Derived columns are not part of the API representation, so
+        # updated_at is left alone and clients do not see a change.
+        last_pk, total, changed = 0, 0, 0
+        while True:
+            with transaction.atomic():
+                instances = list(
+                    LossOfProduction.objects
+                    .filter(pk__gt=last_pk)
+                    .order_by('pk')
+                    .select_for_update()[:chunk_size]
+                )
+                if not instances:
+                    break
+                stale = []
+                for instance in instances:
+                    before = [getattr(instance, name) for name in fields]
+                    instance.refresh_derived_fields()
+                    if [getattr(instance, name) for name in fields] != before:
+                        stale.append(instance)
+                if stale:
+                    LossOfProduction.objects.bulk_update(stale, fields, batch_size=500)
+            last_pk = instances[-1].pk
+            total += len(instances)
+            changed += len(stale)
+            self.stdout.write(f'{total} events checked, {changed} updated')
+        self.stdout.write(self.style.SUCCESS(f'Backfilled {", ".join(fields)}: {changed} of {total} events updated'))
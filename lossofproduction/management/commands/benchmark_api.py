@@ -0,0 +1,157 @@
+import json
+import platform
+import statistics
+import time
+import tracemalloc
+
+import django
+from django.contrib.auth.models import Group, User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from lossofproduction.models import LossOfProduction
+
+
+BENCHMARK_USERNAME = 'lop-benchmark'
+
+
+def _percentile(values, percent):
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * percent / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure latency percentiles, queries per request and peak memory of the API '
+        'endpoints in conf/urls.py, and write a JSON report'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50, help='Timed requests per endpoint')
+        parser.add_argument('--warmup', type=int, default=5, help='Untimed requests per endpoint before timing')
+        parser.add_argument('--group', default='Editor', help='Role group of the benchmark user')
+        parser.add_argument('--output', help='Write the JSON report to this file instead of stdout')
+
+    def _endpoints(self):
+        event = LossOfProduction.objects.order_by('-issue_date', '-id').first()
+        if event is None:
+            raise CommandError('No loss events to benchmark; run seed_losses first.')
+        payload = {
+            'issue_date': timezone.localdate().isoformat(),
+            'department': event.department_id,
+            'affected_area': event.affected_area_id,
+            'equipment_or_process_step': 'Benchmark pump',
+            'description': 'Benchmark event',
+            'cause': event.cause_id,
+            'event_type': LossOfProduction.EventType.UNPLANNED,
+            'status': LossOfProduction.Status.ONGOING,
+            'reporting_limit_area': event.reporting_limit_area_id,
+        }
+        return [
+            ('loss_list', 'get', reverse('lop-list'), None),
+            ('loss_detail', 'get', reverse('lop-detail', args=[event.pk]), None),
+            ('loss_create', 'post', reverse('lop-list'), payload),
+            ('departments', 'get', reverse('department-list'), None),
+            ('affected_areas', 'get', reverse('affectedarea-list'), None),
+            ('causes', 'get', reverse('cause-list'), None),
+            ('reporting_limit_areas', 'get', reverse('rla-list'), None),
+            ('current_user', 'get', reverse('current_user'), None),
+        ]
+
+    def _measure(self, client, method, path, payload, warmup, count):
+        def call():
+            if payload is None:
+                return getattr(client, method)(path)
+            return getattr(client, method)(path, data=json.dumps(payload), content_type='application/json')
+
+        for _ in range(warmup):
+            call()
+
+        timings, queries = [], []
+        for _ in range(count):
+            with CaptureQueriesContext(connection) as captured:
+                start = time.perf_counter()
+                response = call()
+                timings.append((time.perf_counter() - start) * 1000)
+            queries.append(len(captured.captured_queries))
+
+        # Separate pass: tracemalloc slows every allocation down, so it must
+        # not run while latency is being timed.
+        tracemalloc.start()
+        try:
+            call()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        return {
+            'method': method.upper(),
+            'path': path,
+            'status': response.status_code,
+            'requests': count,
+            'p50_ms': round(_percentile(timings, 50), 3),
+            'p95_ms': round(_percentile(timings, 95), 3),
+            'p99_ms': round(_percentile(timings, 99), 3),
+            'mean_ms': round(statistics.fmean(timings), 3),
+            'queries_per_request': round(statistics.fmean(queries), 2),
+            'max_queries': max(queries),
+            'peak_memory_kb': round(peak / 1024, 1),
+        }
+
+    def handle(self, *args, **options):
+        count, warmup = max(options['requests'], 1), max(options['warmup'], 0)
+        try:
+            group = Group.objects.get(name=options['group'])
+        except Group.DoesNotExist:
+            raise CommandError(f'Group "{options["group"]}" does not exist; run migrate or create_groups first.')
+
+        endpoints = self._endpoints()
+        user, _ = User.objects.get_or_create(username=BENCHMARK_USERNAME)
+        user.groups.set([group])
+        client = Client()
+        client.force_login(user)
+
+        results = {}
+        try:
+            with override_settings(ALLOWED_HOSTS=['testserver']):
+                for name, method, path, payload in endpoints:
+                    if method == 'get':
+                        results[name] = self._measure(client, method, path, payload, warmup, count)
+                    else:
+                        # Writes are rolled back so repeated runs see the same data.
+                        with transaction.atomic():
+                            results[name] = self._measure(client, method, path, payload, warmup, count)
+                            transaction.set_rollback(True)
+                    result = results[name]
+                    self.stderr.write(
+                        f'{name}: p50 {result["p50_ms"]} ms, p95 {result["p95_ms"]} ms, '
+                        f'{result["queries_per_request"]} queries, HTTP {result["status"]}'
+                    )
+        finally:
+            user.delete()
+
+        report = {
+            'generated_at': timezone.now().isoformat(),
+            'environment': {
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'loss_events': LossOfProduction.objects.count(),
+            },
+            'settings': {'requests': count, 'warmup': warmup, 'group': group.name},
+            'endpoints': results,
+        }
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as handle:
+                handle.write(output + '\n')
+            self.stderr.write(self.style.SUCCESS(f'Report written to {options["output"]}'))
+        else:
+            self.stdout.write(output)
@@ -0,0 +1,169 @@
+import asyncio
+import json
+import platform
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import django
+from django.contrib.auth.models import Group, User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from lossofproduction.models import LossOfProduction
+
+from .benchmark_api import _percentile
+
+
+BENCHMARK_USERNAME = 'lop-benchmark'
+
+
+def _shares(total, workers):
+    """Split ``total`` requests over ``workers`` as evenly as possible."""
+    return [total // workers + (1 if index < total % workers else 0) for index in range(workers)]
+
+
+def _summary(timings, elapsed, statuses):
+    return {
+        'requests': len(timings),
+        'throughput_rps': round(len(timings) / elapsed, 1),
+        'p50_ms': round(_percentile(timings, 50), 3),
+        'p95_ms': round(_percentile(timings, 95), 3),
+        'p99_ms': round(_percentile(timings, 99), 3),
+        'mean_ms': round(statistics.fmean(timings), 3),
+        'statuses': sorted(statuses),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare concurrent-request throughput of the synchronous (WSGI) API routes '
+        'with their async (ASGI) counterparts under /api/async/, and write a JSON report'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Timed requests per endpoint and path')
+        parser.add_argument('--concurrency', type=int, default=20, help='Requests in flight at once')
+        parser.add_argument('--group', default='Editor', help='Role group of the benchmark user')
+        parser.add_argument('--output', help='Write the JSON report to this file instead of stdout')
+
+    def _endpoints(self):
+        event = LossOfProduction.objects.order_by('-issue_date', '-id').first()
+        if event is None:
+            raise CommandError('No loss events to benchmark; run seed_losses first.')
+        return [
+            ('loss_list', reverse('lop-list'), reverse('async-lop-list')),
+            ('loss_detail', reverse('lop-detail', args=[event.pk]), reverse('async-lop-detail', args=[event.pk])),
+            ('departments', reverse('department-list'), reverse('async-department-list')),
+            ('affected_areas', reverse('affectedarea-list'), reverse('async-affectedarea-list')),
+            ('causes', reverse('cause-list'), reverse('async-cause-list')),
+            ('reporting_limit_areas', reverse('rla-list'), reverse('async-rla-list')),
+        ]
+
+    def _run_wsgi(self, path, headers, count, concurrency):
+        """``count`` requests from ``concurrency`` threads, as a threaded WSGI server would serve them."""
+        def worker(share):
+            client = Client(headers=headers)
+            timings, statuses = [], set()
+            try:
+                for _ in range(share):
+                    start = time.perf_counter()
+                    response = client.get(path)
+                    timings.append((time.perf_counter() - start) * 1000)
+                    statuses.add(response.status_code)
+            finally:
+                # Each worker thread opened its own connection.
+                connections.close_all()
+            return timings, statuses
+
+        Client(headers=headers).get(path)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(worker, _shares(count, concurrency)))
+        elapsed = time.perf_counter() - start
+        return _summary(
+            [timing for timings, _ in results for timing in timings],
+            elapsed,
+            set().union(*(statuses for _, statuses in results)),
+        )
+
+    async def _run_asgi(self, path, headers, count, concurrency):
+        """``count`` requests from ``concurrency`` tasks on one event loop."""
+        client = AsyncClient()
+
+        async def worker(share):
+            timings, statuses = [], set()
+            for _ in range(share):
+                start = time.perf_counter()
+                # Headers given to the AsyncClient constructor do not reach
+                # the ASGI scope, so they are passed per request.
+                response = await client.get(path, headers=headers)
+                timings.append((time.perf_counter() - start) * 1000)
+                statuses.add(response.status_code)
+            return timings, statuses
+
+        await client.get(path, headers=headers)
+        start = time.perf_counter()
+        results = await asyncio.gather(*(worker(share) for share in _shares(count, concurrency)))
+        elapsed = time.perf_counter() - start
+        return _summary(
+            [timing for timings, _ in results for timing in timings],
+            elapsed,
+            set().union(*(statuses for _, statuses in results)),
+        )
+
+    def handle(self, *args, **options):
+        count, concurrency = max(options['requests'], 1), max(options['concurrency'], 1)
+        try:
+            group = Group.objects.get(name=options['group'])
+        except Group.DoesNotExist:
+            raise CommandError(f'Group "{options["group"]}" does not exist; run migrate or create_groups first.')
+
+        endpoints = self._endpoints()
+        user, _ = User.objects.get_or_create(username=BENCHMARK_USERNAME)
+        user.groups.set([group])
+        # Bearer tokens rather than a session, so both paths run the JWT
+        # authenticator (synchronous on WSGI, aauthenticate on ASGI).
+        headers = {'Authorization': f'Bearer {AccessToken.for_user(user)}'}
+
+        results = {}
+        try:
+            with override_settings(ALLOWED_HOSTS=['testserver']):
+                for name, sync_path, async_path in endpoints:
+                    wsgi = self._run_wsgi(sync_path, headers, count, concurrency)
+                    asgi = asyncio.run(self._run_asgi(async_path, headers, count, concurrency))
+                    results[name] = {
+                        'wsgi': {'path': sync_path, **wsgi},
+                        'asgi': {'path': async_path, **asgi},
+                        'asgi_throughput_ratio': round(asgi['throughput_rps'] / wsgi['throughput_rps'], 2),
+                    }
+                    self.stderr.write(
+                        f'{name}: WSGI {wsgi["throughput_rps"]} req/s (p95 {wsgi["p95_ms"]} ms), '
+                        f'ASGI {asgi["throughput_rps"]} req/s (p95 {asgi["p95_ms"]} ms)'
+                    )
+        finally:
+            user.delete()
+
+        report = {
+            'generated_at': timezone.now().isoformat(),
+            'environment': {
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'loss_events': LossOfProduction.objects.count(),
+            },
+            'settings': {'requests': count, 'concurrency': concurrency, 'group': group.name},
+            'endpoints': results,
+        }
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as handle:
+                handle.write(output + '\n')
+            self.stderr.write(self.style.SUCCESS(f'Report written to {options["output"]}'))
+        else:
+            self.stdout.write(output)
@@ -0,0 +1,107 @@
+import gzip
+import json
+import time
+
+import msgpack
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from lossofproduction.models import LossOfProduction
+from lossofproduction.renderers import ColumnarJSONRenderer, MessagePackRenderer
+from lossofproduction.serializers import (
+    LossOfProductionSerializer,
+    LOSS_LIST_VALUES,
+    serialize_loss_columns,
+    serialize_loss_rows,
+)
+
+
+def _rows_from_columns(payload):
+    """Decode a columnar payload back into row objects, as a client would."""
+    columns, dictionaries = payload['columns'], payload['dictionaries']
+    decoded = {
+        name: [dictionaries[name][str(code)] for code in values] if name in dictionaries else values
+        for name, values in columns.items()
+    }
+    return [dict(zip(decoded, values)) for values in zip(*decoded.values())]
+
+
+def _best(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the ModelSerializer list path with the fast .values() read path, '
+        'and the row format with the columnar formats'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000, help='Number of events to serialize')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per path; the best run is reported')
+
+    def handle(self, *args, **options):
+        rows, repeat = options['rows'], options['repeat']
+        queryset = LossOfProduction.objects.order_by('-issue_date', '-id')[:rows]
+        renderer = JSONRenderer()
+
+        def model_path():
+            instances = list(queryset.select_related(
+                'department', 'affected_area', 'cause', 'reporting_limit_area__department'
+            ))
+            return renderer.render(LossOfProductionSerializer(instances, many=True).data)
+
+        def fast_path():
+            return renderer.render(serialize_loss_rows(queryset.values(*LOSS_LIST_VALUES)))
+
+        model_output, fast_output = model_path(), fast_path()
+        if model_output != fast_output:
+            raise CommandError('The fast read path does not match LossOfProductionSerializer output.')
+        count = len(json.loads(fast_output))
+        if not count:
+            raise CommandError('No loss events to serialize; seed some data first.')
+
+        results = {}
+        for name, path in (('model_serializer', model_path), ('fast_values', fast_path)):
+            results[name] = _best(path, repeat)
+            self.stdout.write(f'{name}: {results[name] * 1000:.1f} ms for {count} rows')
+
+        speedup = results['model_serializer'] / results['fast_values']
+        self.stdout.write(self.style.SUCCESS(f'Output identical ({len(fast_output)} bytes); speedup x{speedup:.1f}'))
+
+        columnar_renderer = ColumnarJSONRenderer()
+
+        def columnar_path():
+            return columnar_renderer.render(serialize_loss_columns(queryset.values(*LOSS_LIST_VALUES)))
+
+        columnar_output = columnar_path()
+        if _rows_from_columns(json.loads(columnar_output)) != json.loads(fast_output):
+            raise CommandError('The columnar payload does not decode to the row format.')
+
+        msgpack_renderer = MessagePackRenderer()
+
+        def msgpack_path():
+            return msgpack_renderer.render(serialize_loss_columns(queryset.values(*LOSS_LIST_VALUES)))
+
+        formats = [
+            ('rows_json', fast_output, fast_path, json.loads),
+            ('columnar_json', columnar_output, columnar_path, json.loads),
+            ('columnar_msgpack', msgpack_path(), msgpack_path, msgpack.unpackb),
+        ]
+
+        measured = [
+            (name, output, _best(path, repeat), _best(lambda: parse(output), repeat))
+            for name, output, path, parse in formats
+        ]
+        _, base_output, _, base_parse = measured[0]
+        for name, output, build, parse_time in measured:
+            self.stdout.write(
+                f'{name}: {len(output)} bytes (x{len(base_output) / len(output):.1f} smaller), '
+                f'{len(gzip.compress(output))} gzipped, build {build * 1000:.1f} ms, '
+                f'parse {parse_time * 1000:.2f} ms (x{base_parse / parse_time:.1f} faster)'
+            )
@@ -0,0 +1,101 @@
+import csv
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from lossofproduction.imports import IMPORT_CHUNK_SIZE, LossImporter, read_rows
+
+
+class Command(BaseCommand):
+    help = 'Import historical loss events from a CSV or XLSX file, in chunked bulk inserts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or XLSX file; the first row holds the column names')
+        parser.add_argument(
+            '--format',
+            choices=['csv', 'xlsx'],
+            help='File format (default: from the file extension)',
+        )
+        parser.add_argument('--sheet', help='XLSX worksheet to read (default: the active sheet)')
+        parser.add_argument('--encoding', default='utf-8-sig', help='CSV file encoding')
+        parser.add_argument('--delimiter', default=',', help='CSV field delimiter')
+        parser.add_argument(
+            '--date-format',
+            help='strptime format of date cells given as text (default: YYYY-MM-DD)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=IMPORT_CHUNK_SIZE,
+            help='Number of rows validated and inserted per transaction',
+        )
+        parser.add_argument(
+            '--create-missing',
+            action='store_true',
+            help='Create departments, areas, causes and reporting limit areas that do not exist yet',
+        )
+        parser.add_argument(
+            '--rejects',
+            help='CSV file for rejected rows and their errors (default: <path>.rejects.csv)',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        try:
+            rows = read_rows(
+                path,
+                options['format'],
+                sheet=options['sheet'],
+                encoding=options['encoding'],
+                delimiter=options['delimiter'],
+            )
+        except ValueError as error:
+            raise CommandError(str(error))
+
+        importer = LossImporter(
+            create_missing=options['create_missing'],
+            date_format=options['date_format'],
+            chunk_size=max(options['chunk_size'], 1),
+        )
+        rejects_path = options['rejects'] or f'{path}.rejects.csv'
+        rejects_file = rejects_writer = None
+
+        started = time.monotonic()
+        line, imported, rejected = 1, 0, 0
+        try:
+            for chunk in importer.chunks(rows):
+                count, failures = importer.import_chunk(chunk)
+                if failures:
+                    if rejects_writer is None:
+                        rejects_file = open(rejects_path, 'w', newline='', encoding='utf-8')
+                        rejects_writer = csv.writer(rejects_file)
+                        rejects_writer.writerow(['row', *chunk[0].keys(), 'errors'])
+                    for index, row, errors in failures:
+                        message = '; '.join(f'{column}: {error}' for column, error in errors.items())
+                        rejects_writer.writerow([line + index + 1, *row.values(), message])
+                line += len(chunk)
+                imported += count
+                rejected += len(failures)
+                elapsed = time.monotonic() - started
+                self.stdout.write(
+                    f'{imported + rejected} rows read, {imported} imported, {rejected} rejected '
+                    f'({(imported + rejected) / elapsed if elapsed else 0:.0f} rows/s)'
+                )
+        except (ImportError, OSError, ValueError) as error:
+            raise CommandError(str(error))
+        finally:
+            if rejects_file is not None:
+                rejects_file.close()
+
+        elapsed = time.monotonic() - started
+        created = ', '.join(
+            f'{count} {column.replace("_", " ")}' for column, count in importer.created_lookups.items() if count
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {imported} events in {elapsed:.1f}s '
+            f'({imported / elapsed if elapsed else 0:.0f} rows/s)'
+        ))
+        if created:
+            self.stdout.write(f'Created lookups: {created}')
+        if rejected:
+            self.stdout.write(self.style.WARNING(f'Rejected {rejected} rows; see {rejects_path}'))
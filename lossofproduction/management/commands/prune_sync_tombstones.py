@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from lossofproduction.models import LossOfProductionDeletion
+from lossofproduction.sync import tombstone_cutoff
+
+
+class Command(BaseCommand):
+    help = 'Delete sync tombstones older than LOP_SYNC_TOMBSTONE_RETENTION_DAYS, in primary-key chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=2000,
+            help='Number of tombstones deleted per transaction',
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = max(options['chunk_size'], 1)
+        # Sync tokens older than the cutoff are refused (410), so no client
+        # can still need these.
+        cutoff = tombstone_cutoff()
+        total = 0
+        while True:
+            with transaction.atomic():
+                ids = list(
+                    LossOfProductionDeletion.objects
+                    .filter(deleted_at__lt=cutoff)
+                    .order_by('id')
+                    .values_list('id', flat=True)[:chunk_size]
+                )
+                if not ids:
+                    break
+                LossOfProductionDeletion.objects.filter(id__in=ids).delete()
+            total += len(ids)
+            self.stdout.write(f'{total} tombstones deleted')
+        self.stdout.write(self.style.SUCCESS(f'Pruned {total} tombstones deleted before {cutoff:%Y-%m-%d %H:%M}'))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from lossofproduction import rollups
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the daily loss-event rollup from scratch, in issue_date chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days-per-chunk',
+            type=int,
+            default=31,
+            help='Number of issue days aggregated per transaction',
+        )
+
+    def handle(self, *args, **options):
+        total = rollups.rebuild(days_per_chunk=max(options['days_per_chunk'], 1), stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt daily rollup: {total} rows'))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from lossofproduction.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = 'Create the loss-event full-text index if missing and rebuild its contents'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database',
+            default=DEFAULT_DB_ALIAS,
+            help='Database alias whose index should be rebuilt',
+        )
+
+    def handle(self, *args, **options):
+        using = options['database']
+        backend = get_search_backend(using)
+        backend.setup(using)
+        backend.rebuild(using)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt search index with {type(backend).__name__}'))
@@ -0,0 +1,136 @@
+import random
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from lossofproduction import rollups
+from lossofproduction.conditional import loss_events_changed
+from lossofproduction.lookups import LOOKUP_MODELS, lookup_changed
+from lossofproduction.models import (
+    Department,
+    AffectedArea,
+    Cause,
+    ReportingLimitArea,
+    LossOfProduction,
+)
+
+
+EQUIPMENT = ('Pump', 'Compressor', 'Valve', 'Conveyor', 'Mixer', 'Heat exchanger', 'Filter press', 'Dryer')
+SYMPTOMS = ('leak', 'trip', 'vibration', 'overheating', 'blockage', 'sensor fault', 'power loss', 'seal failure')
+
+
+def _zipf_weights(count, exponent):
+    """Weights 1/rank**exponent: a few values take most of the events, as in real plants."""
+    return [1 / rank ** exponent for rank in range(1, count + 1)]
+
+
+class Command(BaseCommand):
+    help = 'Generate synthetic loss events with skewed department and cause distributions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=100_000, help='Number of events to create')
+        parser.add_argument('--days', type=int, default=5 * 365, help='Spread issue dates over this many past days')
+        parser.add_argument('--departments', type=int, default=8, help='Departments to ensure exist')
+        parser.add_argument('--areas', type=int, default=25, help='Affected areas to ensure exist')
+        parser.add_argument('--causes', type=int, default=40, help='Causes to ensure exist')
+        parser.add_argument('--rlas-per-department', type=int, default=4, help='Reporting limit areas per department')
+        parser.add_argument('--skew', type=float, default=1.1, help='Zipf exponent of the department/cause/area mix')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Events inserted per transaction')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed, for reproducible data sets')
+
+    def _ensure_lookups(self, options):
+        def names(prefix, count):
+            return [f'{prefix} {number:02d}' for number in range(1, count + 1)]
+
+        for model, prefix, count in (
+            (Department, 'Department', options['departments']),
+            (AffectedArea, 'Area', options['areas']),
+            (Cause, 'Cause', options['causes']),
+        ):
+            model.objects.bulk_create([model(name=name) for name in names(prefix, count)], ignore_conflicts=True)
+
+        departments = list(Department.objects.filter(name__in=names('Department', options['departments'])))
+        ReportingLimitArea.objects.bulk_create(
+            [
+                ReportingLimitArea(name=f'{department.name} RLA {number}', department=department)
+                for department in departments
+                for number in range(1, options['rlas_per_department'] + 1)
+            ],
+            ignore_conflicts=True,
+        )
+        # bulk_create() sends no post_save signals.
+        for model in LOOKUP_MODELS:
+            lookup_changed(model)
+
+        rlas = {}
+        for rla in ReportingLimitArea.objects.filter(department__in=departments).values('id', 'department_id'):
+            rlas.setdefault(rla['department_id'], []).append(rla['id'])
+        return (
+            [department.pk for department in departments],
+            list(AffectedArea.objects.filter(name__in=names('Area', options['areas'])).values_list('id', flat=True)),
+            list(Cause.objects.filter(name__in=names('Cause', options['causes'])).values_list('id', flat=True)),
+            rlas,
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        department_ids, area_ids, cause_ids, rlas = self._ensure_lookups(options)
+        skew = options['skew']
+        department_weights = _zipf_weights(len(department_ids), skew)
+        area_weights = _zipf_weights(len(area_ids), skew)
+        cause_weights = _zipf_weights(len(cause_ids), skew)
+        today = timezone.localdate()
+        days = max(options['days'], 1)
+        total, chunk_size = options['count'], max(options['chunk_size'], 1)
+
+        started = time.monotonic()
+        created = 0
+        while created < total:
+            size = min(chunk_size, total - created)
+            departments = rng.choices(department_ids, department_weights, k=size)
+            areas = rng.choices(area_ids, area_weights, k=size)
+            causes = rng.choices(cause_ids, cause_weights, k=size)
+
+            instances = []
+            for department, area, cause in zip(departments, areas, causes):
+                # Recent events are more frequent (growing plant) and more likely still open.
+                age = int(days * rng.random() ** 1.5)
+                issue_date = today - timedelta(days=age)
+                if rng.random() < 0.9 * (1 - 0.97 ** age):
+                    status = LossOfProduction.Status.FINISHED
+                    date_solved = issue_date + timedelta(days=min(int(rng.lognormvariate(1.0, 1.0)), age))
+                else:
+                    status = rng.choice((LossOfProduction.Status.ONGOING, LossOfProduction.Status.NO_SELECTION))
+                    date_solved = None
+                equipment = f'{rng.choice(EQUIPMENT)} {rng.choice("ABCDEFGH")}-{rng.randint(100, 140)}'
+                instance = LossOfProduction(
+                    issue_date=issue_date,
+                    department_id=department,
+                    affected_area_id=area,
+                    equipment_or_process_step=equipment,
+                    description=f'{rng.choice(SYMPTOMS).capitalize()} on {equipment}',
+                    cause_id=cause,
+                    event_type=(
+                        LossOfProduction.EventType.UNPLANNED if rng.random() < 0.7
+                        else LossOfProduction.EventType.PLANNED
+                    ),
+                    status=status,
+                    date_solved=date_solved,
+                    reporting_limit_area_id=rng.choice(rlas[department]),
+                )
+                instance.refresh_derived_fields()
+                instances.append(instance)
+
+            with transaction.atomic():
+                LossOfProduction.objects.bulk_create(instances, batch_size=1000)
+            created += size
+            elapsed = time.monotonic() - started
+            self.stdout.write(f'{created}/{total} events ({created / elapsed if elapsed else 0:.0f} rows/s)')
+
+        # One rebuild is far cheaper than per-chunk rollup deltas at this volume.
+        rollups.rebuild()
+        loss_events_changed()
+        self.stdout.write(self.style.SUCCESS(f'Seeded {created} events in {time.monotonic() - started:.1f}s'))
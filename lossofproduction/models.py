@@ -1,7 +1,24 @@
-from django.db import models
+import re
+import unicodedata
+
+from django.db import models, router, transaction
 from django.utils import timezone
 
 
+_NON_WORD = re.compile(r'[\W_]+', re.UNICODE)
+
+
+def equipment_key(value):
+    """
+    Normalized form of a free-text equipment or process step: Unicode
+    compatibility-folded, case-folded, with every run of punctuation and
+    whitespace reduced to one space, so 'Pump P-101' and 'pump  p 101'
+    share a key.
+    """
+    value = unicodedata.normalize('NFKC', value or '').casefold()
+    return _NON_WORD.sub(' ', value).strip()[:200]
+
+
 class Department(models.Model):
     name = models.CharField(max_length=120, unique=True)
 
@@ -65,11 +82,49 @@ class LossOfProduction(models.Model):
     date_solved = models.DateField(blank=True, null=True)
     reporting_limit_area = models.ForeignKey(ReportingLimitArea, on_delete=models.PROTECT, related_name='loss_events')
     reporting_limit = models.CharField(max_length=200, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Days from issue_date to date_solved, kept in sync by refresh_derived_fields().
+    resolution_days = models.IntegerField(blank=True, null=True, editable=False)
+    # equipment_key(equipment_or_process_step), kept in sync by refresh_derived_fields().
+    equipment_key = models.CharField(max_length=200, blank=True, default='', editable=False)
+
+    # Stored columns computed by refresh_derived_fields().
+    DERIVED_FIELDS = ('resolution_days', 'equipment_key')
 
     class Meta:
         ordering = ['-issue_date', '-id']
         verbose_name = 'Loss of Production'
         verbose_name_plural = 'Loss of Production'
+        indexes = [
+            # Backs the default ordering and the keyset pagination seek.
+            models.Index(fields=['-issue_date', '-id'], name='lop_issue_date_id_idx'),
+            # Equality filters followed by the default ordering column, so a
+            # filtered page is still a single range seek.
+            models.Index(fields=['department', '-issue_date'], name='lop_department_date_idx'),
+            models.Index(fields=['affected_area', '-issue_date'], name='lop_area_date_idx'),
+            models.Index(fields=['cause', '-issue_date'], name='lop_cause_date_idx'),
+            models.Index(fields=['reporting_limit_area', '-issue_date'], name='lop_rla_date_idx'),
+            models.Index(fields=['event_type', '-issue_date'], name='lop_event_type_date_idx'),
+            models.Index(fields=['status', '-issue_date'], name='lop_status_date_idx'),
+            models.Index(fields=['date_solved', 'id'], name='lop_date_solved_idx'),
+            # Conditional GETs and the incremental sync cursor.
+            models.Index(fields=['updated_at', 'id'], name='lop_updated_at_id_idx'),
+            # Open incidents, oldest first; filtered so it only holds ONGOING rows.
+            models.Index(
+                fields=['issue_date', 'id'],
+                condition=models.Q(status='ONGOING'),
+                name='lop_ongoing_age_idx',
+            ),
+            # Resolution-time statistics per department and cause.
+            models.Index(
+                fields=['department', 'cause', 'resolution_days'],
+                condition=models.Q(resolution_days__isnull=False),
+                name='lop_resolution_idx',
+            ),
+            # Events per equipment in date order: equality lookups on the key
+            # and the recurring-failure pass.
+            models.Index(fields=['equipment_key', 'issue_date', 'id'], name='lop_equipment_date_idx'),
+        ]
 
     def __str__(self):
         return f'Loss #{self.id} - {self.issue_date} - {self.department}'
@@ -87,4 +142,72 @@ class LossOfProduction(models.Model):
             from django.core.exceptions import ValidationError
             raise ValidationError(
                 {'reporting_limit_area': f'The selected reporting_limit_area ({self.reporting_limit_area}) does not belong to the selected department ({self.department}).'}
-            )
\ No newline at end of file
+            )
+
+    def refresh_derived_fields(self):
+        """
+        Recompute the stored columns derived from other fields. Called from
+        save(); bulk writes, which bypass save(), call it themselves.
+        """
+        if self.issue_date and self.date_solved:
+            self.resolution_days = (self.date_solved - self.issue_date).days
+        else:
+            self.resolution_days = None
+        self.equipment_key = equipment_key(self.equipment_or_process_step)
+
+    def save(self, *args, **kwargs):
+        self.refresh_derived_fields()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            # auto_now only stamps updated_at if it is saved too.
+            kwargs['update_fields'] = {*update_fields, *self.DERIVED_FIELDS, 'updated_at'}
+        # The pre_save/post_save handlers (rollup deltas, version stamps) run
+        # in the same transaction as the write, also outside atomic().
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using):
+            super().save(*args, **kwargs)
+
+
+class LossOfProductionDeletion(models.Model):
+    """
+    Tombstone written when a LossOfProduction row is deleted, so that
+    incremental sync clients can drop it from their local copy.
+    """
+    loss_id = models.IntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        ordering = ['id']
+        verbose_name = 'Loss of Production Deletion'
+        verbose_name_plural = 'Loss of Production Deletions'
+
+    def __str__(self):
+        return f'Loss #{self.loss_id} deleted {self.deleted_at}'
+
+
+class LossOfProductionDailyRollup(models.Model):
+    """
+    Number of loss events per issue day and dimension combination, kept up
+    to date with delta increments on every write (see rollups.py).
+    """
+    day = models.DateField()
+    department = models.ForeignKey(Department, on_delete=models.CASCADE, related_name='+')
+    affected_area = models.ForeignKey(AffectedArea, on_delete=models.CASCADE, related_name='+')
+    cause = models.ForeignKey(Cause, on_delete=models.CASCADE, related_name='+')
+    event_type = models.CharField(max_length=10, choices=LossOfProduction.EventType.choices)
+    status = models.CharField(max_length=12, choices=LossOfProduction.Status.choices)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ['-day']
+        verbose_name = 'Loss of Production Daily Rollup'
+        verbose_name_plural = 'Loss of Production Daily Rollups'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['day', 'department', 'affected_area', 'cause', 'event_type', 'status'],
+                name='lop_rollup_key_uniq',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.day} - {self.department} - {self.count}'
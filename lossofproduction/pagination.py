@@ -0,0 +1,239 @@
+import base64
+import json
+from datetime import date, datetime
+
+from django.core.exceptions import FieldDoesNotExist
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections
+from django.db.models import F, Q
+from django.utils.encoding import force_str
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetCursorPagination(CursorPagination):
+    """
+    Cursor pagination keyed on every ordering column, not just the first one.
+
+    DRF's CursorPagination positions on the first ordering field and skips
+    ties with an OFFSET, which on ``issue_date`` means re-reading every event
+    of the same day. The cursor here carries the full key (e.g. issue_date
+    and id), so every page is a single index range seek and no COUNT(*) is
+    ever issued.
+    """
+    ordering = ('-issue_date', '-id')
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self._page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+        return self._set_page(list(queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """paginate_queryset() for async views, reading the page with the async ORM."""
+        queryset = self._page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+        return self._set_page([row async for row in queryset])
+
+    def _page_queryset(self, queryset, request, view):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.model = queryset.model
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        reverse, position = self.cursor if self.cursor else (False, None)
+
+        queryset = queryset.order_by(*self._order_by(reverse))
+        if position is not None:
+            queryset = queryset.filter(self._beyond(position, reverse))
+
+        # Fetch one extra row to learn whether another page follows.
+        return queryset[:self.page_size + 1]
+
+    def _set_page(self, results):
+        reverse, position = self.cursor if self.cursor else (False, None)
+        self.page = results[:self.page_size]
+        has_more = len(results) > self.page_size
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+        return self.page
+
+    def get_ordering(self, request, queryset, view):
+        ordering = tuple(super().get_ordering(request, queryset, view))
+        # The primary key is always the final tiebreaker so the key is unique.
+        if not {'id', '-id', 'pk', '-pk'} & set(ordering):
+            descending = ordering[0].startswith('-') if ordering else True
+            ordering += ('-id' if descending else 'id',)
+        return ordering
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor((False, self._position(self.page[-1])))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor((True, self._position(self.page[0])))
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+            reverse, position = bool(payload['r']), payload['p']
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return reverse, position
+
+    def encode_cursor(self, cursor):
+        reverse, position = cursor
+        payload = json.dumps({'r': int(reverse), 'p': position}, separators=(',', ':'))
+        encoded = base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def _fields(self):
+        for item in self.ordering:
+            yield item.lstrip('-'), item.startswith('-')
+
+    def _is_nullable(self, path):
+        model = self.model
+        field = None
+        for part in path.split('__'):
+            try:
+                field = model._meta.get_field(part)
+            except FieldDoesNotExist:
+                return False
+            if field.null:
+                return True
+            model = field.related_model
+        return False
+
+    def _order_by(self, reverse):
+        """Order expressions for the page query; NULLs always sort last going forward."""
+        order = []
+        nulls = {'nulls_first': True} if reverse else {'nulls_last': True}
+        for name, descending in self._fields():
+            if not self._is_nullable(name):
+                order.append(f'-{name}' if descending != reverse else name)
+            elif descending != reverse:
+                order.append(F(name).desc(**nulls))
+            else:
+                order.append(F(name).asc(**nulls))
+        return order
+
+    def _beyond(self, position, reverse):
+        """
+        Lexicographic "strictly after the cursor" predicate over all key columns:
+        (a > x) OR (a = x AND b > y) OR ...
+        """
+        condition = Q(pk__in=[])
+        equal = Q()
+        for (name, descending), value in zip(self._fields(), position):
+            nullable = self._is_nullable(name)
+            lookup = f'{name}__lt' if descending != reverse else f'{name}__gt'
+            if value is None:
+                step = Q(**{f'{name}__isnull': False}) if reverse else Q(pk__in=[])
+                tie = Q(**{f'{name}__isnull': True})
+            else:
+                step = Q(**{lookup: value})
+                if nullable and not reverse:
+                    step |= Q(**{f'{name}__isnull': True})
+                tie = Q(**{name: value})
+            condition |= equal & step
+            equal &= tie
+        return condition
+
+    def _position(self, instance):
+        position = []
+        for name, _ in self._fields():
+            if isinstance(instance, dict):
+                # Rows from a .values() queryset must include the ordering columns.
+                value = instance[name]
+            else:
+                value = instance
+                for part in name.split('__'):
+                    value = getattr(value, part) if value is not None else None
+            if isinstance(value, (date, datetime)):
+                value = value.isoformat()
+            elif value is not None and not isinstance(value, (int, float)):
+                value = force_str(value)
+            position.append(value)
+        return position
+
+
+class OptInPageNumberPagination(PageNumberPagination):
+    """
+    Page-number pagination for the small lookup tables that only kicks in when
+    the client asks for it with ``?page_size=``; otherwise the full list is
+    returned as before.
+    """
+    page_size = None
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+
+def estimated_row_count(model, using='default'):
+    """
+    Row count of ``model``'s table from the database's own statistics,
+    without scanning it. None if the backend keeps no usable estimate.
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+    if connection.vendor == 'microsoft':
+        sql = 'SELECT SUM(p.rows) FROM sys.partitions p WHERE p.object_id = OBJECT_ID(%s) AND p.index_id IN (0, 1)'
+    elif connection.vendor == 'sqlite':
+        # Only present once ANALYZE has run. The first number of each stat is
+        # the row count of that index; partial indexes hold fewer rows.
+        sql = 'SELECT stat FROM sqlite_stat1 WHERE tbl = %s'
+    else:
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [table])
+            counts = [int(str(value).split()[0]) for value, in cursor.fetchall() if value is not None]
+    except DatabaseError:
+        return None
+    return max(counts) if counts else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Django Paginator that never issues an unbounded COUNT(*). Unfiltered
+    lists use the table statistics; filtered ones count at most
+    ``count_limit`` rows, so only that many are reachable by page number.
+    """
+    count_limit = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        query = queryset.query
+        if not query.where and not query.distinct and not query.combinator:
+            estimate = estimated_row_count(queryset.model, queryset.db)
+            # Small or never-analyzed tables are cheap to count exactly.
+            if estimate is not None and estimate > self.count_limit:
+                return estimate
+        return queryset.order_by()[:self.count_limit].count()
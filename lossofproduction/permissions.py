@@ -1,5 +1,7 @@
 from rest_framework.permissions import BasePermission, DjangoModelPermissions
 
+from .roles import get_user_permissions, get_user_roles
+
 
 class CustomDjangoModelPermissions(DjangoModelPermissions):
     """
@@ -27,7 +29,12 @@ class CustomDjangoModelPermissions(DjangoModelPermissions):
         if request.user.is_superuser:
             return True
 
-        return super().has_permission(request, view)
+        # Same check as DjangoModelPermissions, against the cached permission set
+        if getattr(view, '_ignore_model_permissions', False):
+            return True
+        queryset = self._queryset(view)
+        perms = self.get_required_permissions(request.method, queryset.model)
+        return get_user_permissions(request.user).issuperset(perms)
 
 
 class LookupModelPermissions(CustomDjangoModelPermissions):
@@ -42,8 +49,7 @@ class LookupModelPermissions(CustomDjangoModelPermissions):
         if not super().has_permission(request, view):
             return False
 
-        user = request.user
-        user_groups = set(user.groups.values_list('name', flat=True))
+        user_groups = get_user_roles(request.user)
 
         # Admin group has full access
         if 'Admin' in user_groups:
@@ -53,8 +59,8 @@ class LookupModelPermissions(CustomDjangoModelPermissions):
         if {'Editor', 'Reader'} & user_groups:
             return request.method in ['GET', 'HEAD', 'OPTIONS']
 
-        # Fallback to standard Django model permissions
-        return super().has_permission(request, view)
+        # Fallback to standard Django model permissions, already checked above
+        return True
 
 
 class LossOfProductionPermissions(CustomDjangoModelPermissions):
@@ -69,8 +75,7 @@ class LossOfProductionPermissions(CustomDjangoModelPermissions):
         if not super().has_permission(request, view):
             return False
 
-        user = request.user
-        user_groups = set(user.groups.values_list('name', flat=True))
+        user_groups = get_user_roles(request.user)
 
         # Admin and Editor groups have full access
         if {'Admin', 'Editor'} & user_groups:
@@ -80,5 +85,5 @@ class LossOfProductionPermissions(CustomDjangoModelPermissions):
         if 'Reader' in user_groups:
             return request.method in ['GET', 'HEAD', 'OPTIONS']
 
-        # Fallback to standard Django model permissions
-        return super().has_permission(request, view)
\ No newline at end of file
+        # Fallback to standard Django model permissions, already checked above
+        return True
\ No newline at end of file
@@ -0,0 +1,47 @@
+import datetime
+import decimal
+import uuid
+
+import msgpack
+from django.utils.encoding import force_str
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+
+class ColumnarJSONRenderer(JSONRenderer):
+    """
+    ``Accept: application/vnd.lop.columnar+json`` (or ``?format=columnar``).
+    Views that offer it send serialize_loss_columns() output instead of a
+    list of row objects; other payloads, such as errors, are plain JSON.
+    """
+    media_type = 'application/vnd.lop.columnar+json'
+    format = 'columnar'
+    columnar = True
+
+
+def _msgpack_default(obj):
+    if isinstance(obj, (datetime.datetime, datetime.date, datetime.time)):
+        return obj.isoformat()
+    if isinstance(obj, (decimal.Decimal, uuid.UUID)):
+        return str(obj)
+    # Lazy translation strings in error messages.
+    return force_str(obj)
+
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    Columnar payload as MessagePack: ``Accept:
+    application/vnd.lop.columnar+msgpack`` (or ``?format=msgpack``).
+    """
+    media_type = 'application/vnd.lop.columnar+msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+    columnar = True
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=_msgpack_default, use_bin_type=True)
+
+
+COLUMNAR_RENDERERS = [ColumnarJSONRenderer, MessagePackRenderer]
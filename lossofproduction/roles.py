@@ -0,0 +1,305 @@
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth.models import Group, Permission
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Q
+
+from .caching import aget_version, bump_version, bump_version_on_commit, get_version
+
+
+APP_LABEL = 'lossofproduction'
+LOOKUP_MODEL_NAMES = ('department', 'affectedarea', 'cause', 'reportinglimitarea')
+ALL_ACTIONS = ('add', 'change', 'delete', 'view')
+
+# Role -> model name -> actions granted. This is the complete permission
+# set of each role group: sync_roles() adds what is missing and removes
+# anything else.
+ROLE_MANIFEST = {
+    'Admin': {
+        'lossofproduction': ALL_ACTIONS,
+        **{model: ALL_ACTIONS for model in LOOKUP_MODEL_NAMES},
+    },
+    'Editor': {
+        'lossofproduction': ALL_ACTIONS,
+        **{model: ('view',) for model in LOOKUP_MODEL_NAMES},
+    },
+    'Reader': {
+        'lossofproduction': ('view',),
+        **{model: ('view',) for model in LOOKUP_MODEL_NAMES},
+    },
+}
+
+ROLE_NAMES = tuple(ROLE_MANIFEST)
+
+ROLES_VERSION = 'roles'
+
+_REQUEST_CACHE_ATTR = '_lop_role_cache'
+
+
+def _timeout():
+    return getattr(settings, 'LOP_ROLE_CACHE_TIMEOUT', 300)
+
+
+def _cache_key(user_id, version=None):
+    if version is None:
+        version = get_version(ROLES_VERSION)
+    return f'lop:roles:{version}:{user_id}'
+
+
+def _load(user):
+    return {
+        'groups': list(user.groups.values_list('name', flat=True)),
+        'permissions': sorted(user.get_all_permissions()),
+    }
+
+
+def _memoise(user, data):
+    resolved = {
+        'groups': data['groups'],
+        'group_set': frozenset(data['groups']),
+        'permissions': data['permissions'],
+        'permission_set': frozenset(data['permissions']),
+    }
+    setattr(user, _REQUEST_CACHE_ATTR, resolved)
+    return resolved
+
+
+def _resolve(user):
+    """
+    Group names and permissions of ``user``, memoised on the user object for
+    the rest of the request and in the cache backend across requests.
+    """
+    resolved = getattr(user, _REQUEST_CACHE_ATTR, None)
+    if resolved is not None:
+        return resolved
+
+    key = _cache_key(user.pk)
+    data = cache.get(key)
+    if data is None:
+        data = _load(user)
+        cache.set(key, data, _timeout())
+    return _memoise(user, data)
+
+
+async def aresolve_user(user):
+    """
+    Async _resolve(). Once awaited, the synchronous getters below answer
+    from the per-request memo, so permission classes can run on the event
+    loop without touching the database.
+    """
+    if not user or not user.is_authenticated:
+        return None
+    resolved = getattr(user, _REQUEST_CACHE_ATTR, None)
+    if resolved is not None:
+        return resolved
+
+    key = _cache_key(user.pk, await aget_version(ROLES_VERSION))
+    data = await cache.aget(key)
+    if data is None:
+        data = {
+            'groups': [name async for name in user.groups.values_list('name', flat=True)],
+            'permissions': sorted(await user.aget_all_permissions()),
+        }
+        await cache.aset(key, data, _timeout())
+    return _memoise(user, data)
+
+
+# Permissions that fit in the token role claim, one bit each. Users with
+# any other permission (superusers, staff) get no claim.
+TOKEN_PERMISSIONS = tuple(
+    f'{APP_LABEL}.{action}_{model}'
+    for model in ('lossofproduction', *LOOKUP_MODEL_NAMES)
+    for action in ALL_ACTIONS
+)
+_TOKEN_BITS = {permission: 1 << index for index, permission in enumerate(TOKEN_PERMISSIONS)}
+# Tokens signed for a different bit layout never match the claim version.
+_TOKEN_LAYOUT = hashlib.md5(','.join(TOKEN_PERMISSIONS).encode('ascii')).hexdigest()[:8]
+
+ROLE_CLAIM = 'roles'
+
+
+def _claim_version(version):
+    return f'{version}.{_TOKEN_LAYOUT}'
+
+
+def token_claim(user):
+    """
+    Compact role claim for the tokens of ``user``: the role version it was
+    issued at, the group names and a bitmask over TOKEN_PERMISSIONS. None if
+    the user's permissions cannot be expressed that way.
+    """
+    version = get_version(ROLES_VERSION)
+    resolved = _resolve(user)
+    if not resolved['permission_set'] <= _TOKEN_BITS.keys():
+        return None
+    return {
+        'v': _claim_version(version),
+        'g': resolved['groups'],
+        'p': sum(_TOKEN_BITS[permission] for permission in resolved['permission_set']),
+    }
+
+
+def _claim_data(claim):
+    return {
+        'groups': claim['g'],
+        'permissions': [permission for permission, bit in _TOKEN_BITS.items() if claim['p'] & bit],
+    }
+
+
+def trust_token_claim(user, token):
+    """
+    Memoise the roles carried by ``token`` on ``user`` if the claim was
+    issued at the current role version, so neither the cache entry nor the
+    database is read for them. Returns whether the claim was used.
+    """
+    claim = token.get(ROLE_CLAIM)
+    if not isinstance(claim, dict) or claim.get('v') != _claim_version(get_version(ROLES_VERSION)):
+        return False
+    _memoise(user, _claim_data(claim))
+    return True
+
+
+async def atrust_token_claim(user, token):
+    """Async trust_token_claim()."""
+    claim = token.get(ROLE_CLAIM)
+    if not isinstance(claim, dict) or claim.get('v') != _claim_version(await aget_version(ROLES_VERSION)):
+        return False
+    _memoise(user, _claim_data(claim))
+    return True
+
+
+def get_user_groups(user):
+    """Names of the groups ``user`` belongs to, in a stable list."""
+    if not user or not user.is_authenticated:
+        return []
+    return _resolve(user)['groups']
+
+
+def get_user_roles(user):
+    """Frozen set of group names of ``user`` (e.g. {'Editor'})."""
+    if not user or not user.is_authenticated:
+        return frozenset()
+    return _resolve(user)['group_set']
+
+
+def get_user_permissions(user):
+    """Frozen set of "app_label.codename" permissions, as user.get_all_permissions()."""
+    if not user or not user.is_authenticated:
+        return frozenset()
+    return _resolve(user)['permission_set']
+
+
+def invalidate_user(user_id):
+    cache.delete(_cache_key(user_id))
+
+
+def invalidate_all():
+    bump_version(ROLES_VERSION)
+
+
+def user_changed(sender, instance, **kwargs):
+    """post_save/post_delete on User: is_active affects the permission set."""
+    # After commit, so a concurrent request cannot cache the old state again.
+    user_id = instance.pk
+    transaction.on_commit(lambda: invalidate_user(user_id))
+
+
+def memberships_changed(sender, action, **kwargs):
+    """
+    m2m_changed on User.groups, User.user_permissions and Group.permissions.
+    Changes are rare, so every cached entry is dropped by bumping the version
+    once the change commits: a bump inside the transaction would let a
+    concurrent request cache the old memberships under the new version.
+    """
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_version_on_commit(ROLES_VERSION)
+
+
+def group_changed(sender, **kwargs):
+    """post_save/post_delete on Group: renames and deletes change role names."""
+    bump_version_on_commit(ROLES_VERSION)
+
+
+def manifest_codenames(manifest=ROLE_MANIFEST):
+    """Role -> set of permission codenames, from the manifest."""
+    return {
+        role: {f'{action}_{model}' for model, actions in grants.items() for action in actions}
+        for role, grants in manifest.items()
+    }
+
+
+def sync_roles(using=DEFAULT_DB_ALIAS, manifest=ROLE_MANIFEST, dry_run=False):
+    """
+    Bring the role groups in line with ``manifest`` in a fixed number of
+    queries: groups are created if missing but never deleted (so members
+    keep their roles), and only the difference between the granted and the
+    declared permissions is added or removed.
+
+    Returns ``(changes, missing)``: role -> {'created': bool, 'added': [...],
+    'removed': [...]} permissions, and the declared codenames that have no
+    Permission row yet.
+    """
+    wanted = manifest_codenames(manifest)
+    codenames = set().union(*wanted.values())
+    through = Group.permissions.through
+
+    with transaction.atomic(using=using):
+        permissions = dict(
+            Permission.objects.using(using)
+            .filter(content_type__app_label=APP_LABEL, codename__in=codenames)
+            .values_list('codename', 'id')
+        )
+        missing = sorted(codenames - set(permissions))
+
+        groups = dict(Group.objects.using(using).filter(name__in=wanted).values_list('name', 'id'))
+        created = [role for role in wanted if role not in groups]
+        if dry_run:
+            groups.update({role: None for role in wanted if role not in groups})
+        elif len(groups) < len(wanted):
+            Group.objects.using(using).bulk_create(
+                [Group(name=role) for role in wanted if role not in groups],
+                ignore_conflicts=True,
+            )
+            groups = dict(Group.objects.using(using).filter(name__in=wanted).values_list('name', 'id'))
+
+        granted = {}
+        rows = (
+            through.objects.using(using)
+            .filter(group_id__in=[pk for pk in groups.values() if pk is not None])
+            .values_list('group_id', 'permission_id', 'permission__content_type__app_label', 'permission__codename')
+        )
+        for group_id, permission_id, app_label, codename in rows:
+            granted.setdefault(group_id, {})[permission_id] = f'{app_label}.{codename}'
+
+        changes, to_add, to_remove = {}, [], Q()
+        for role, role_codenames in wanted.items():
+            group_id = groups[role]
+            current = granted.get(group_id, {})
+            declared = {permissions[codename] for codename in role_codenames if codename in permissions}
+            added = declared - set(current)
+            removed = set(current) - declared
+            changes[role] = {
+                'created': role in created,
+                'added': sorted(f'{APP_LABEL}.{codename}' for codename in role_codenames if permissions.get(codename) in added),
+                'removed': sorted(current[pk] for pk in removed),
+            }
+            to_add += [through(group_id=group_id, permission_id=pk) for pk in added]
+            if removed:
+                to_remove |= Q(group_id=group_id, permission_id__in=removed)
+
+        if not dry_run:
+            if to_add:
+                through.objects.using(using).bulk_create(to_add, ignore_conflicts=True)
+            if to_remove:
+                through.objects.using(using).filter(to_remove).delete()
+            if created or to_add or to_remove:
+                # Bulk writes send no post_save or m2m_changed signals.
+                transaction.on_commit(invalidate_all, using=using)
+    return changes, missing
+
+
+def sync_roles_after_migrate(sender, using=DEFAULT_DB_ALIAS, **kwargs):
+    """post_migrate handler."""
+    sync_roles(using=using)
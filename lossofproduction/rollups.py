@@ -0,0 +1,227 @@
+from collections import Counter
+from datetime import timedelta
+from functools import reduce
+from operator import or_
+
+from django.db import IntegrityError, connections, router, transaction
+from django.db.models import Count, F, Q
+
+from .models import LossOfProduction, LossOfProductionDailyRollup
+
+
+# LossOfProduction attribute -> rollup field, in key order.
+KEY_FIELDS = (
+    ('issue_date', 'day'),
+    ('department_id', 'department_id'),
+    ('affected_area_id', 'affected_area_id'),
+    ('cause_id', 'cause_id'),
+    ('event_type', 'event_type'),
+    ('status', 'status'),
+)
+
+# Filters from LossOfProductionFilterBackend that the rollup can answer.
+ROLLUP_FILTERS = {
+    'issue_date__gte': 'day__gte',
+    'issue_date__lte': 'day__lte',
+    'department_id__in': 'department_id__in',
+    'affected_area_id__in': 'affected_area_id__in',
+    'cause_id__in': 'cause_id__in',
+    'event_type__in': 'event_type__in',
+    'status__in': 'status__in',
+}
+
+
+# Rollup keys written per round trip by apply_deltas().
+APPLY_BATCH_SIZE = 500
+
+
+def rollup_key(instance):
+    return tuple(getattr(instance, attr) for attr, _ in KEY_FIELDS)
+
+
+def _row_key(row):
+    return tuple(getattr(row, field) for _, field in KEY_FIELDS)
+
+
+def _normalize(key):
+    """``key`` with the Python types the rollup rows are read back with (e.g. a date, not a string)."""
+    return tuple(
+        LossOfProductionDailyRollup._meta.get_field(field).to_python(value)
+        for (_, field), value in zip(KEY_FIELDS, key)
+    )
+
+
+def _lookup(key):
+    return {field: value for (_, field), value in zip(KEY_FIELDS, key)}
+
+
+def _rows(manager, keys):
+    """Rollup rows of ``keys`` by key, read with one query."""
+    condition = reduce(or_, (Q(**_lookup(key)) for key in keys))
+    return {_row_key(row): row for row in manager.filter(condition).only('id', *(field for _, field in KEY_FIELDS))}
+
+
+def _apply_chunk(manager, deltas):
+    rows = _rows(manager, deltas)
+    # Negative deltas never create rows: a key without a row has nothing to
+    # subtract from, and rebuild_rollups repairs such a drift.
+    new = [key for key, delta in deltas.items() if key not in rows and delta > 0]
+    if new:
+        # New rows start at zero and get their delta with the existing ones,
+        # so a row another writer created in the meantime is added to, not
+        # overwritten.
+        if connections[manager.db].features.supports_ignore_conflicts:
+            manager.bulk_create(
+                [LossOfProductionDailyRollup(count=0, **_lookup(key)) for key in new],
+                ignore_conflicts=True,
+            )
+        else:
+            for key in new:
+                try:
+                    with transaction.atomic(using=manager.db):
+                        manager.create(count=0, **_lookup(key))
+                except IntegrityError:
+                    pass
+        rows.update(_rows(manager, new))
+    for key, row in rows.items():
+        row.count = F('count') + deltas[key]
+    manager.bulk_update(rows.values(), ['count'])
+
+
+def apply_deltas(deltas):
+    """
+    Add ``deltas`` (rollup key -> change in event count) to the rollup rows,
+    creating rows for keys seen for the first time. Keys are written in
+    chunks of APPLY_BATCH_SIZE with a constant number of queries each.
+    Runs in one transaction that joins the writer's (LossOfProduction.save()
+    and the bulk paths open one), so events and rollup rows commit or roll
+    back together.
+    """
+    normalized = Counter()
+    for key, delta in deltas.items():
+        normalized[_normalize(key)] += delta
+    deltas = {key: delta for key, delta in normalized.items() if delta}
+    if not deltas:
+        return
+    manager = LossOfProductionDailyRollup.objects.db_manager(router.db_for_write(LossOfProductionDailyRollup))
+    keys = list(deltas)
+    with transaction.atomic(using=manager.db):
+        for start in range(0, len(keys), APPLY_BATCH_SIZE):
+            _apply_chunk(manager, {key: deltas[key] for key in keys[start:start + APPLY_BATCH_SIZE]})
+
+
+def record_created(instances):
+    apply_deltas(Counter(rollup_key(instance) for instance in instances))
+
+
+def record_changed(old_keys, instances):
+    """``old_keys`` are the rollup keys of ``instances`` before they were modified."""
+    deltas = Counter(rollup_key(instance) for instance in instances)
+    deltas.subtract(Counter(old_keys))
+    apply_deltas(deltas)
+
+
+# Names a partial save() may list in update_fields for the key attributes.
+_KEY_UPDATE_FIELDS = {
+    name
+    for field in LossOfProduction._meta.concrete_fields
+    if field.attname in {attr for attr, _ in KEY_FIELDS}
+    for name in (field.name, field.attname)
+}
+
+
+def capture_old_key(sender, instance, raw=False, update_fields=None, **kwargs):
+    """pre_save on LossOfProduction: remember the key the row currently counts under."""
+    instance._rollup_old_key = None
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    if update_fields is not None and _KEY_UPDATE_FIELDS.isdisjoint(update_fields):
+        # The save cannot move the row to another key: record no change.
+        instance._rollup_old_key = rollup_key(instance)
+        return
+    # save() runs in a transaction; the lock keeps a concurrent update from
+    # moving the row away from this key before the delta is applied.
+    old = (
+        LossOfProduction.objects
+        .select_for_update()
+        .filter(pk=instance.pk)
+        .values_list(*(attr for attr, _ in KEY_FIELDS))
+        .first()
+    )
+    instance._rollup_old_key = old
+
+
+def loss_event_saved(sender, instance, created, raw=False, **kwargs):
+    """post_save on LossOfProduction."""
+    if raw:
+        return
+    old_key = getattr(instance, '_rollup_old_key', None)
+    if created or old_key is None:
+        record_created([instance])
+    else:
+        record_changed([old_key], [instance])
+
+
+def loss_event_deleted(sender, instance, **kwargs):
+    """post_delete on LossOfProduction."""
+    apply_deltas(Counter({rollup_key(instance): -1}))
+
+
+def rollup_queryset(filter_kwargs):
+    """
+    Rollup rows matching the LossOfProductionFilterBackend ``filter_kwargs``,
+    or None when a filter cannot be answered from the rollup.
+    """
+    if not set(filter_kwargs) <= set(ROLLUP_FILTERS):
+        return None
+    # Rows whose events all moved to another key linger at zero until the next rebuild.
+    return LossOfProductionDailyRollup.objects.filter(
+        count__gt=0,
+        **{ROLLUP_FILTERS[name]: value for name, value in filter_kwargs.items()}
+    )
+
+
+def rebuild(days_per_chunk=31, stdout=None):
+    """
+    Recompute the rollup from LossOfProduction, one issue_date range per
+    transaction so that no single statement scans the whole event table.
+    """
+    bounds = LossOfProduction.objects.order_by().values_list('issue_date', flat=True)
+    first, last = bounds.order_by('issue_date').first(), bounds.order_by('-issue_date').first()
+
+    with transaction.atomic():
+        deleted = LossOfProductionDailyRollup.objects.all()
+        if first is not None:
+            deleted = deleted.exclude(day__range=(first, last))
+        deleted.delete()
+    if first is None:
+        return 0
+
+    total = 0
+    start = first
+    while start <= last:
+        end = min(start + timedelta(days=days_per_chunk - 1), last)
+        with transaction.atomic():
+            LossOfProductionDailyRollup.objects.filter(day__range=(start, end)).delete()
+            rows = list(
+                LossOfProduction.objects
+                .filter(issue_date__range=(start, end))
+                .order_by()
+                .values(*(attr for attr, _ in KEY_FIELDS))
+                .annotate(count=Count('id'))
+            )
+            LossOfProductionDailyRollup.objects.bulk_create(
+                [
+                    LossOfProductionDailyRollup(
+                        count=row['count'],
+                        **{field: row[attr] for attr, field in KEY_FIELDS},
+                    )
+                    for row in rows
+                ],
+                batch_size=500,
+            )
+        total += len(rows)
+        if stdout is not None:
+            stdout.write(f'{start} .. {end}: {len(rows)} rollup rows')
+        start = end + timedelta(days=1)
+    return total
@@ -0,0 +1,217 @@
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, InterfaceError, OperationalError, connections
+from rest_framework.permissions import SAFE_METHODS
+
+from .caching import aget_modified, get_modified
+
+
+logger = logging.getLogger('lossofproduction.routing')
+
+APP_LABEL = 'lossofproduction'
+
+# Alias reads of this app go to while a view allows it; None means the
+# primary. A context variable so async views and sync_to_async see it too.
+_read_database = ContextVar('lop_read_database', default=None)
+
+# Process-local replica health: alias -> monotonic time.
+_unavailable_until = {}
+_verified_at = {}
+
+
+def replica_alias():
+    """The configured read replica, or None if reads stay on the primary."""
+    alias = getattr(settings, 'LOP_READ_REPLICA', None)
+    return alias if alias and alias in settings.DATABASES else None
+
+
+def _sticky_seconds():
+    return getattr(settings, 'LOP_REPLICA_STICKY_SECONDS', 10)
+
+
+def _retry_seconds():
+    return getattr(settings, 'LOP_REPLICA_RETRY_SECONDS', 30)
+
+
+def _check_seconds():
+    return getattr(settings, 'LOP_REPLICA_CHECK_SECONDS', 15)
+
+
+def mark_unavailable(alias, exc=None):
+    """Send reads for ``alias`` to the primary for LOP_REPLICA_RETRY_SECONDS."""
+    _unavailable_until[alias] = time.monotonic() + _retry_seconds()
+    _verified_at.pop(alias, None)
+    logger.warning('Read replica %s unavailable, reading from the primary: %s', alias, exc)
+
+
+def _health(alias):
+    """True/False if the state of ``alias`` is known, None if it must be checked."""
+    now = time.monotonic()
+    if _unavailable_until.get(alias, 0) > now:
+        return False
+    if now - _verified_at.get(alias, float('-inf')) < _check_seconds():
+        return True
+    return None
+
+
+def replica_available(alias):
+    """
+    Whether ``alias`` accepts connections. Answered from memory between
+    checks; a failed check (or a failed query, see ReplicaReadMixin) keeps
+    reads on the primary until the retry interval has passed.
+    """
+    healthy = _health(alias)
+    if healthy is not None:
+        return healthy
+    try:
+        connections[alias].ensure_connection()
+    except DatabaseError as exc:
+        mark_unavailable(alias, exc)
+        return False
+    _verified_at[alias] = time.monotonic()
+    return True
+
+
+async def areplica_available(alias):
+    """Async replica_available(); only leaves the event loop for the check itself."""
+    healthy = _health(alias)
+    if healthy is not None:
+        return healthy
+    return await sync_to_async(replica_available)(alias)
+
+
+@contextmanager
+def reading_from(alias):
+    """Route this app's reads to ``alias`` (None: the primary) within the block."""
+    token = _read_database.set(alias)
+    try:
+        yield
+    finally:
+        _read_database.reset(token)
+
+
+def _pin_key(user_id):
+    return f'lop:primary-pin:{user_id}'
+
+
+def pin_to_primary(user):
+    """Keep ``user``'s reads on the primary for LOP_REPLICA_STICKY_SECONDS."""
+    if user is not None and user.is_authenticated:
+        cache.set(_pin_key(user.pk), True, _sticky_seconds())
+
+
+def _recent(modified):
+    # A version counter bumped within the window means the replica may not
+    # have the write yet, while ETags already carry the new version.
+    return modified is not None and time.time() - modified < _sticky_seconds()
+
+
+class ReplicaRouter:
+    """
+    Sends reads of this app's models to the alias chosen by the current
+    view (see ReplicaReadMixin) and every write to the primary. Outside
+    such views, e.g. in management commands and the admin, nothing changes.
+    """
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label == APP_LABEL:
+            return _read_database.get()
+        return None
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label == APP_LABEL:
+            # Also for instances that were loaded from the replica.
+            return DEFAULT_DB_ALIAS
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, replica_alias()}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+
+class ReplicaReadMixin:
+    """
+    Serves safe-method requests from LOP_READ_REPLICA, except
+
+    - for LOP_REPLICA_STICKY_SECONDS after the requesting user wrote
+      through one of these views (read-your-writes),
+    - for the same window after any version counter in ``version_names``
+      was bumped, so a lagging replica never answers under a new ETag,
+    - while the replica is unavailable; a read that fails on the replica
+      is repeated on the primary.
+
+    Must come after ConditionalGetMixin so the validators are computed on
+    the same database as the response.
+    """
+
+    def get_read_database(self, request):
+        alias = replica_alias()
+        if alias is None or request.method not in SAFE_METHODS:
+            return None
+        if request.user.is_authenticated and cache.get(_pin_key(request.user.pk)):
+            return None
+        if any(_recent(get_modified(name)) for name in self.version_names):
+            return None
+        return alias if replica_available(alias) else None
+
+    async def aget_read_database(self, request):
+        """Async get_read_database(). Async views store its result in ``prefetched_read_database``."""
+        alias = replica_alias()
+        if alias is None or request.method not in SAFE_METHODS:
+            return None
+        if request.user.is_authenticated and await cache.aget(_pin_key(request.user.pk)):
+            return None
+        if hasattr(self, 'prefetched_versions'):
+            modified = [modified for _, modified in self.prefetched_versions.values()]
+        else:
+            modified = [await aget_modified(name) for name in self.version_names]
+        if any(_recent(value) for value in modified):
+            return None
+        return alias if await areplica_available(alias) else None
+
+    def dispatch(self, request, *args, **kwargs):
+        with reading_from(None):
+            # Only the synchronous handlers can be repeated; async views
+            # (async_views.py) call handle_exception() from the event loop.
+            self._retry_reads_on_primary = True
+            return super().dispatch(request, *args, **kwargs)
+
+    def handle_exception(self, exc):
+        alias = _read_database.get()
+        if (alias is None or not getattr(self, '_retry_reads_on_primary', False)
+                or not isinstance(exc, (OperationalError, InterfaceError))):
+            return super().handle_exception(exc)
+        # The replica went away after authentication, permissions and
+        # throttling passed; repeat only the reads, on the primary.
+        mark_unavailable(alias, exc)
+        _read_database.set(None)
+        request = self.request
+        try:
+            if hasattr(self, 'check_conditional'):
+                self.check_conditional(request)
+            handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            return handler(request, *self.args, **self.kwargs)
+        except Exception as retry_exc:
+            return self.handle_exception(retry_exc)
+
+    def initial(self, request, *args, **kwargs):
+        # Authenticated and permitted at this point; choose before any
+        # subclass (ConditionalGetMixin) reads from the database.
+        super().initial(request, *args, **kwargs)
+        if hasattr(self, 'prefetched_read_database'):
+            _read_database.set(self.prefetched_read_database)
+        else:
+            _read_database.set(self.get_read_database(request))
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            pin_to_primary(getattr(request, 'user', None))
+        return super().finalize_response(request, response, *args, **kwargs)
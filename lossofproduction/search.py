@@ -0,0 +1,191 @@
+import re
+from abc import ABC, abstractmethod
+from functools import reduce
+from operator import and_, or_
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+from .models import LossOfProduction
+
+
+SEARCH_FIELDS = ('equipment_or_process_step', 'description', 'reporting_limit')
+
+_TERM = re.compile(r'\w+', re.UNICODE)
+
+
+def search_terms(query):
+    """Word tokens of a user query; anything else is dropped so it can't break the index query syntax."""
+    return _TERM.findall(query or '')[:16]
+
+
+class BaseSearchBackend(ABC):
+    """
+    Full-text search over loss events. ``search`` narrows a LossOfProduction
+    queryset to matching rows and annotates ``search_rank`` (higher is
+    better); ``setup`` creates the index structures for a database alias.
+    """
+    vendor = None
+
+    def setup(self, using):
+        pass
+
+    def rebuild(self, using):
+        pass
+
+    @abstractmethod
+    def search(self, queryset, query):
+        """Rows of ``queryset`` matching ``query``, annotated with ``search_rank``."""
+
+    @staticmethod
+    def no_matches(queryset):
+        return queryset.annotate(search_rank=Value(0.0, output_field=FloatField())).none()
+
+
+class LikeSearchBackend(BaseSearchBackend):
+    """Unindexed fallback: every term must appear in one of the fields."""
+
+    def search(self, queryset, query):
+        terms = search_terms(query)
+        if not terms:
+            return self.no_matches(queryset)
+        condition = reduce(and_, (
+            reduce(or_, (Q(**{f'{field}__icontains': term}) for field in SEARCH_FIELDS))
+            for term in terms
+        ))
+        return queryset.filter(condition).annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+
+class SQLiteFTS5SearchBackend(BaseSearchBackend):
+    """
+    SQLite FTS5 external-content index over the event table. Triggers keep
+    it in sync on insert, update and delete, including bulk writes.
+    """
+    vendor = 'sqlite'
+    index_table = 'lossofproduction_search'
+
+    def _statements(self):
+        table = LossOfProduction._meta.db_table
+        index = self.index_table
+        columns = ', '.join(SEARCH_FIELDS)
+        new_values = ', '.join(f'new.{field}' for field in SEARCH_FIELDS)
+        old_values = ', '.join(f'old.{field}' for field in SEARCH_FIELDS)
+        return [
+            f"CREATE VIRTUAL TABLE {index} USING fts5({columns}, content='{table}', "
+            f"content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+            f'CREATE TRIGGER {index}_ai AFTER INSERT ON {table} BEGIN '
+            f'INSERT INTO {index}(rowid, {columns}) VALUES (new.id, {new_values}); END',
+            f'CREATE TRIGGER {index}_ad AFTER DELETE ON {table} BEGIN '
+            f"INSERT INTO {index}({index}, rowid, {columns}) VALUES ('delete', old.id, {old_values}); END",
+            f'CREATE TRIGGER {index}_au AFTER UPDATE OF {columns} ON {table} BEGIN '
+            f"INSERT INTO {index}({index}, rowid, {columns}) VALUES ('delete', old.id, {old_values}); "
+            f'INSERT INTO {index}(rowid, {columns}) VALUES (new.id, {new_values}); END',
+        ]
+
+    def setup(self, using):
+        with connections[using].cursor() as cursor:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [self.index_table])
+            if cursor.fetchone():
+                return
+            for statement in self._statements():
+                cursor.execute(statement)
+        self.rebuild(using)
+
+    def rebuild(self, using):
+        with connections[using].cursor() as cursor:
+            cursor.execute(f"INSERT INTO {self.index_table}({self.index_table}) VALUES ('rebuild')")
+
+    def search(self, queryset, query):
+        terms = search_terms(query)
+        if not terms:
+            return self.no_matches(queryset)
+        match = ' AND '.join(f'"{term}"*' for term in terms)
+        table = LossOfProduction._meta.db_table
+        index = self.index_table
+        # FTS5 rank is bm25(), where lower is better.
+        rank = RawSQL(
+            f'SELECT -rank FROM {index} WHERE {index} MATCH %s AND rowid = {table}.id',
+            [match],
+            output_field=FloatField(),
+        )
+        matches = RawSQL(f'SELECT rowid FROM {index} WHERE {index} MATCH %s', [match])
+        return queryset.filter(id__in=matches).annotate(search_rank=rank)
+
+
+class SQLServerFullTextSearchBackend(BaseSearchBackend):
+    """
+    SQL Server full-text index with automatic change tracking, so the
+    server keeps it in sync on every write.
+    """
+    vendor = 'microsoft'
+    catalog = 'lossofproduction_catalog'
+
+    def setup(self, using):
+        table = LossOfProduction._meta.db_table
+        columns = ', '.join(SEARCH_FIELDS)
+        with connections[using].cursor() as cursor:
+            cursor.execute('SELECT SERVERPROPERTY(%s)', ['IsFullTextInstalled'])
+            if not cursor.fetchone()[0]:
+                return
+            cursor.execute('SELECT 1 FROM sys.fulltext_indexes WHERE object_id = OBJECT_ID(%s)', [table])
+            if cursor.fetchone():
+                return
+            cursor.execute('SELECT 1 FROM sys.fulltext_catalogs WHERE name = %s', [self.catalog])
+            if not cursor.fetchone():
+                cursor.execute(f'CREATE FULLTEXT CATALOG {self.catalog}')
+            cursor.execute(
+                'SELECT name FROM sys.indexes WHERE object_id = OBJECT_ID(%s) AND is_primary_key = 1', [table]
+            )
+            key_index = cursor.fetchone()[0]
+            cursor.execute(
+                f'CREATE FULLTEXT INDEX ON {table} ({columns}) KEY INDEX [{key_index}] '
+                f'ON {self.catalog} WITH CHANGE_TRACKING AUTO'
+            )
+
+    def rebuild(self, using):
+        with connections[using].cursor() as cursor:
+            cursor.execute(f'ALTER FULLTEXT CATALOG {self.catalog} REBUILD')
+
+    def search(self, queryset, query):
+        terms = search_terms(query)
+        if not terms:
+            return self.no_matches(queryset)
+        condition = ' AND '.join(f'"{term}*"' for term in terms)
+        table = LossOfProduction._meta.db_table
+        columns = ', '.join(SEARCH_FIELDS)
+        rank = RawSQL(
+            f'SELECT ft.[RANK] FROM CONTAINSTABLE({table}, ({columns}), %s) AS ft WHERE ft.[KEY] = {table}.id',
+            [condition],
+            output_field=FloatField(),
+        )
+        matches = RawSQL(f'SELECT ft.[KEY] FROM CONTAINSTABLE({table}, ({columns}), %s) AS ft', [condition])
+        return queryset.filter(id__in=matches).annotate(search_rank=rank)
+
+
+_BACKENDS = {
+    backend.vendor: backend
+    for backend in (SQLiteFTS5SearchBackend, SQLServerFullTextSearchBackend)
+}
+
+
+def get_search_backend(using='default'):
+    """
+    Search backend for a database alias: LOP_SEARCH_BACKEND if set, else the
+    full-text backend for the database vendor, else the LIKE fallback.
+    """
+    path = getattr(settings, 'LOP_SEARCH_BACKEND', None)
+    if path:
+        return import_string(path)()
+    return _BACKENDS.get(connections[using].vendor, LikeSearchBackend)()
+
+
+def search_loss_events(queryset, query):
+    return get_search_backend(queryset.db).search(queryset, query)
+
+
+def setup_search_index(sender, using='default', **kwargs):
+    """post_migrate handler: create the index structures once the table exists."""
+    get_search_backend(using).setup(using)
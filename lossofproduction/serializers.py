@@ -1,3 +1,4 @@
+from django.utils.functional import cached_property
 from rest_framework import serializers
 from .models import (
     Department,
@@ -6,6 +7,32 @@ from .models import (
     ReportingLimitArea,
     LossOfProduction,
 )
+from .lookups import get_table
+
+
+class CachedLookupRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    PrimaryKeyRelatedField that validates ids against the in-memory lookup
+    table instead of querying the database for every field of every write.
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            pk = int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        table = get_table(self.queryset.model)
+        if pk not in table:
+            # Created since the table was cached; its version bump may not
+            # have reached this process yet.
+            table.load_missing({pk})
+        instance = table.get(pk)
+        if instance is None:
+            self.fail('does_not_exist', pk_value=data)
+        return instance
+
 
 class DepartmentSerializer(serializers.ModelSerializer):
     class Meta:
@@ -23,7 +50,7 @@ class CauseSerializer(serializers.ModelSerializer):
         fields = ["id", "name"]
 
 class ReportingLimitAreaSerializer(serializers.ModelSerializer):
-    department = serializers.PrimaryKeyRelatedField(
+    department = CachedLookupRelatedField(
         queryset=Department.objects.all()
     )
 
@@ -37,14 +64,14 @@ class ReportingLimitAreaSerializer(serializers.ModelSerializer):
         return data
 
 class LossOfProductionSerializer(serializers.ModelSerializer):
-    department = serializers.PrimaryKeyRelatedField(
+    department = CachedLookupRelatedField(
         queryset=Department.objects.all()
     )
-    affected_area = serializers.PrimaryKeyRelatedField(
+    affected_area = CachedLookupRelatedField(
         queryset=AffectedArea.objects.all()
     )
-    cause = serializers.PrimaryKeyRelatedField(queryset=Cause.objects.all())
-    reporting_limit_area = serializers.PrimaryKeyRelatedField(
+    cause = CachedLookupRelatedField(queryset=Cause.objects.all())
+    reporting_limit_area = CachedLookupRelatedField(
         queryset=ReportingLimitArea.objects.all()
     )
 
@@ -65,16 +92,203 @@ class LossOfProductionSerializer(serializers.ModelSerializer):
             "reporting_limit",
         ]
 
+    def __init__(self, *args, fields=None, **kwargs):
+        # ``fields``: names to keep, e.g. from ?fields= / ?omit=; all by default.
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+    @cached_property
+    def lookup_tables(self):
+        # Fetched once per serializer, i.e. once per page rather than per row.
+        return {model: get_table(model) for model in (Department, AffectedArea, Cause, ReportingLimitArea)}
+
     def to_representation(self, instance):
         data = super().to_representation(instance)
-        data.update(
-            {
-                "department": instance.department.name,
-                "affected_area": instance.affected_area.name,
-                "cause": instance.cause.name,
-                "reporting_limit_area": f"{instance.reporting_limit_area.name} ({instance.reporting_limit_area.department.name})",
-                "event_type": instance.get_event_type_display(),
-                "status": instance.get_status_display(),
-            }
-        )
+        # Lookup names come from the in-memory lookup tables; the related
+        # instance is only loaded if a row is missing from its table.
+        # Only fields that were not dropped are touched, so columns left out
+        # with .only() are never loaded.
+        tables = self.lookup_tables
+        if "department" in data:
+            data["department"] = tables[Department].label(instance.department_id) or instance.department.name
+        if "affected_area" in data:
+            data["affected_area"] = tables[AffectedArea].label(instance.affected_area_id) or instance.affected_area.name
+        if "cause" in data:
+            data["cause"] = tables[Cause].label(instance.cause_id) or instance.cause.name
+        if "reporting_limit_area" in data:
+            data["reporting_limit_area"] = (
+                tables[ReportingLimitArea].label(instance.reporting_limit_area_id)
+                or str(instance.reporting_limit_area)
+            )
+        if "event_type" in data:
+            data["event_type"] = instance.get_event_type_display()
+        if "status" in data:
+            data["status"] = instance.get_status_display()
         return data
+
+
+class LossOfProductionBulkItemSerializer(LossOfProductionSerializer):
+    """
+    Validates a single item of a bulk write. Foreign keys are accepted as
+    plain ids here and resolved for the whole batch at once in bulk.py.
+    """
+    department = serializers.IntegerField()
+    affected_area = serializers.IntegerField()
+    cause = serializers.IntegerField()
+    reporting_limit_area = serializers.IntegerField()
+
+
+# Columns read by the fast list path; FK names are resolved from the lookup tables.
+LOSS_LIST_VALUES = (
+    'id',
+    'issue_date',
+    'department_id',
+    'affected_area_id',
+    'equipment_or_process_step',
+    'description',
+    'cause_id',
+    'event_type',
+    'status',
+    'date_solved',
+    'reporting_limit_area_id',
+    'reporting_limit',
+)
+
+# Output fields of LossOfProductionSerializer and the column each is read from.
+LOSS_FIELDS = tuple(LossOfProductionSerializer.Meta.fields)
+LOSS_FIELD_COLUMNS = dict(zip(LOSS_FIELDS, LOSS_LIST_VALUES))
+
+# Always read: the default ordering and open-incident ages need them.
+_REQUIRED_VALUES = ('id', 'issue_date')
+
+
+def loss_values(fields=None):
+    """Columns to read for the output ``fields`` (all by default)."""
+    if fields is None:
+        return LOSS_LIST_VALUES
+    columns = [LOSS_FIELD_COLUMNS[name] for name in fields]
+    return (*[column for column in _REQUIRED_VALUES if column not in columns], *columns)
+
+
+LOOKUP_FIELDS = {
+    'department': Department,
+    'affected_area': AffectedArea,
+    'cause': Cause,
+    'reporting_limit_area': ReportingLimitArea,
+}
+
+EVENT_TYPE_LABELS = dict(LossOfProduction.EventType.choices)
+STATUS_LABELS = dict(LossOfProduction.Status.choices)
+
+
+def _labeller(model, ids):
+    """pk -> display label for ``model``, covering every one of ``ids``."""
+    table = get_table(model)
+    # Rows added since the table was cached are loaded in one query.
+    table.load_missing(ids)
+    return table.label
+
+
+def _field_getters(fields, rows):
+    """(name, row -> value) for each of ``fields``, as serialize_loss_rows() formats them."""
+    getters = []
+    for name in fields:
+        if name in ('issue_date', 'date_solved'):
+            getters.append((name, lambda row, column=name: row[column].isoformat() if row[column] else None))
+        elif name in LOOKUP_FIELDS:
+            column = LOSS_FIELD_COLUMNS[name]
+            label = _labeller(LOOKUP_FIELDS[name], {row[column] for row in rows})
+            getters.append((name, lambda row, label=label, column=column: label(row[column])))
+        elif name in ('event_type', 'status'):
+            labels = EVENT_TYPE_LABELS if name == 'event_type' else STATUS_LABELS
+            getters.append((name, lambda row, labels=labels, column=name: labels.get(row[column], row[column])))
+        else:
+            getters.append((name, lambda row, column=name: row[column]))
+    return getters
+
+
+def serialize_loss_rows(rows, fields=None):
+    """
+    Read-only fast path equivalent to LossOfProductionSerializer(many=True).data
+    for dict rows from ``.values(*LOSS_LIST_VALUES)``. It skips model
+    instantiation and the per-field serializer machinery while producing the
+    same keys, key order and values. With ``fields``, only those keys are
+    produced and the rows only need the columns of loss_values(fields).
+    """
+    rows = list(rows)
+    if fields is not None:
+        getters = _field_getters(fields, rows)
+        return [{name: get(row) for name, get in getters} for row in rows]
+
+    department = _labeller(Department, {row['department_id'] for row in rows})
+    affected_area = _labeller(AffectedArea, {row['affected_area_id'] for row in rows})
+    cause = _labeller(Cause, {row['cause_id'] for row in rows})
+    reporting_limit_area = _labeller(ReportingLimitArea, {row['reporting_limit_area_id'] for row in rows})
+    event_types = EVENT_TYPE_LABELS
+    statuses = STATUS_LABELS
+
+    data = []
+    for row in rows:
+        date_solved = row['date_solved']
+        data.append({
+            'id': row['id'],
+            'issue_date': row['issue_date'].isoformat(),
+            'department': department(row['department_id']),
+            'affected_area': affected_area(row['affected_area_id']),
+            'equipment_or_process_step': row['equipment_or_process_step'],
+            'description': row['description'],
+            'cause': cause(row['cause_id']),
+            'event_type': event_types.get(row['event_type'], row['event_type']),
+            'status': statuses.get(row['status'], row['status']),
+            'date_solved': date_solved.isoformat() if date_solved else None,
+            'reporting_limit_area': reporting_limit_area(row['reporting_limit_area_id']),
+            'reporting_limit': row['reporting_limit'],
+        })
+    return data
+
+
+class _Dictionary:
+    """Assigns small integer codes to the distinct values of a column."""
+
+    def __init__(self, labels):
+        self.codes = {value: code for code, value in enumerate(labels)}
+        self.labels = {str(code): labels[value] for value, code in self.codes.items()}
+
+    def code(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            # Stored value that is no longer a choice; label it as itself.
+            code = self.codes[value] = len(self.codes)
+            self.labels[str(code)] = value
+        return code
+
+
+def serialize_loss_columns(rows, fields=None):
+    """
+    Columnar, dictionary-encoded form of serialize_loss_rows(rows, fields):
+    one array per column, with the lookup columns as their foreign key ids
+    and the choice columns as integer codes. ``dictionaries`` maps each
+    code, as a string key, to the label the row format would have repeated
+    on every row; only the lookup ids present in ``rows`` are included.
+    """
+    rows = list(rows)
+    columns, dictionaries = {}, {}
+    for name in LOSS_FIELDS if fields is None else fields:
+        column = LOSS_FIELD_COLUMNS[name]
+        if name in ('issue_date', 'date_solved'):
+            columns[name] = [row[column].isoformat() if row[column] else None for row in rows]
+        elif name in LOOKUP_FIELDS:
+            columns[name] = [row[column] for row in rows]
+            ids = sorted(set(columns[name]))
+            label = _labeller(LOOKUP_FIELDS[name], ids)
+            dictionaries[name] = {str(pk): label(pk) for pk in ids}
+        elif name in ('event_type', 'status'):
+            dictionary = _Dictionary(EVENT_TYPE_LABELS if name == 'event_type' else STATUS_LABELS)
+            columns[name] = [dictionary.code(row[column]) for row in rows]
+            dictionaries[name] = dictionary.labels
+        else:
+            columns[name] = [row[column] for row in rows]
+
+    return {'length': len(rows), 'columns': columns, 'dictionaries': dictionaries}
@@ -0,0 +1,17 @@
+'use strict';
+{
+    const $ = django.jQuery;
+
+    // Reload the changelist with the value picked in an AutocompleteFilter.
+    $(function() {
+        $('select[data-filter-url]').on('change', function() {
+            const base = this.dataset.filterUrl;
+            if (!this.value) {
+                window.location.search = base;
+                return;
+            }
+            const separator = base.length > 1 ? '&' : '';
+            window.location.search = base + separator + encodeURIComponent(this.name) + '=' + encodeURIComponent(this.value);
+        });
+    });
+}
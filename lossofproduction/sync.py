@@ -0,0 +1,156 @@
+import base64
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+
+from .conditional import loss_events_changed
+from .models import (
+    Department,
+    AffectedArea,
+    Cause,
+    ReportingLimitArea,
+    LossOfProduction,
+    LossOfProductionDeletion,
+)
+from .serializers import LOSS_LIST_VALUES, serialize_loss_rows
+
+
+SYNC_DEFAULT_LIMIT = 1000
+SYNC_MAX_LIMIT = 5000
+
+# Lookup model -> LossOfProduction field that shows its label.
+LOOKUP_LABEL_FIELDS = {
+    Department: 'department',
+    AffectedArea: 'affected_area',
+    Cause: 'cause',
+    ReportingLimitArea: 'reporting_limit_area',
+}
+
+
+class ResyncRequired(APIException):
+    """The token predates the kept deletion history; the client must start over."""
+    status_code = status.HTTP_410_GONE
+    default_detail = 'The sync token is older than the deletion history. Start a full sync without since.'
+    default_code = 'resync_required'
+
+
+def _safety_lag():
+    """
+    Changes younger than this are held back until the next sync. updated_at
+    is stamped before commit, so a slow transaction can commit a timestamp
+    older than rows already handed out; the lag gives it time to land.
+    """
+    return timedelta(seconds=getattr(settings, 'LOP_SYNC_SAFETY_LAG_SECONDS', 5))
+
+
+def tombstone_cutoff():
+    """Tombstones older than this may be pruned, and tokens older than it are refused."""
+    return timezone.now() - timedelta(days=getattr(settings, 'LOP_SYNC_TOMBSTONE_RETENTION_DAYS', 30))
+
+
+def encode_token(updated_at, pk, deletion_id, issued_at):
+    payload = {
+        'u': updated_at.isoformat() if updated_at else None,
+        'i': pk,
+        'd': deletion_id,
+        't': issued_at.isoformat(),
+    }
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode('utf-8')).decode('ascii')
+
+
+def decode_token(token):
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token.encode('ascii')).decode('utf-8'))
+        updated_at = parse_datetime(payload['u']) if payload['u'] else None
+        pk, deletion_id = payload['i'], payload['d']
+        issued_at = parse_datetime(payload['t'])
+    except (TypeError, ValueError, KeyError, UnicodeError):
+        raise ValidationError({'since': 'Invalid sync token.'})
+    if ((payload['u'] and updated_at is None) or issued_at is None
+            or not isinstance(pk, (int, type(None))) or not isinstance(deletion_id, int)):
+        raise ValidationError({'since': 'Invalid sync token.'})
+    return updated_at, pk, deletion_id, issued_at
+
+
+def changes_since(token=None, limit=SYNC_DEFAULT_LIMIT):
+    """
+    Events created or updated after ``token`` and ids deleted after it, in
+    commit-safe order, plus the token to pass next time. Without a token the
+    whole table is returned (in pages) and no tombstones are needed. Raises
+    ResyncRequired for tokens older than the tombstone retention, whose
+    deletions may already have been pruned.
+    """
+    horizon = timezone.now() - _safety_lag()
+    events = LossOfProduction.objects.filter(updated_at__lte=horizon)
+    deletions = LossOfProductionDeletion.objects.filter(deleted_at__lte=horizon)
+
+    if token:
+        updated_at, pk, deletion_id, issued_at = decode_token(token)
+        if issued_at < tombstone_cutoff():
+            raise ResyncRequired()
+        if updated_at is not None:
+            events = events.filter(Q(updated_at__gt=updated_at) | Q(updated_at=updated_at, id__gt=pk))
+        deleted = list(
+            deletions.filter(id__gt=deletion_id).order_by('id').values_list('id', 'loss_id')[:limit + 1]
+        )
+    else:
+        updated_at, pk = None, None
+        deletion_id = deletions.order_by('-id').values_list('id', flat=True).first() or 0
+        deleted = []
+
+    rows = list(events.order_by('updated_at', 'id').values(*LOSS_LIST_VALUES, 'updated_at')[:limit + 1])
+    has_more = len(rows) > limit or len(deleted) > limit
+    rows, deleted = rows[:limit], deleted[:limit]
+
+    if rows:
+        updated_at, pk = rows[-1]['updated_at'], rows[-1]['id']
+    if deleted:
+        deletion_id = deleted[-1][0]
+
+    return {
+        'changes': serialize_loss_rows(rows),
+        'deleted': [loss_id for _, loss_id in deleted],
+        'next_token': encode_token(updated_at, pk, deletion_id, horizon),
+        'has_more': has_more,
+    }
+
+
+def record_deletion(sender, instance, **kwargs):
+    """post_delete on LossOfProduction: write the tombstone."""
+    LossOfProductionDeletion.objects.create(loss_id=instance.pk)
+
+
+def _label_columns(model):
+    # The columns a lookup's label is built from (see LookupTable.label).
+    return ('name', 'department_id') if model is ReportingLimitArea else ('name',)
+
+
+def capture_old_label(sender, instance, raw=False, **kwargs):
+    """pre_save on a lookup model: remember what its label is built from."""
+    instance._sync_old_label = None
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    instance._sync_old_label = sender.objects.filter(pk=instance.pk).values_list(*_label_columns(sender)).first()
+
+
+def lookup_saved(sender, instance, created, raw=False, **kwargs):
+    """
+    post_save on a lookup model. Sync rows carry lookup labels, so after a
+    rename every event showing the label is stamped as updated and synced
+    clients pick up the new name with their next changes call.
+    """
+    old = getattr(instance, '_sync_old_label', None)
+    if raw or created or old is None or old == tuple(getattr(instance, column) for column in _label_columns(sender)):
+        return
+    affected = Q(**{LOOKUP_LABEL_FIELDS[sender]: instance})
+    if sender is Department:
+        # Reporting limit area labels include the department name.
+        affected |= Q(reporting_limit_area__department=instance)
+    if LossOfProduction.objects.filter(affected).update(updated_at=timezone.now()):
+        loss_events_changed()
@@ -1,3 +1,1054 @@
-from django.test import TestCase
+import base64
+import csv
+import datetime
+import json
+import os
+import tempfile
+from collections import Counter
+from io import StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import msgpack
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import Group, Permission, User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import OperationalError, ProgrammingError, connection, connections
+from django.test import AsyncClient, Client, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from . import routing
+from .authentication import get_cached_user
+from .caching import bump_version, get_version
+from .checks import check_shared_cache
+from .conditional import LOSS_EVENTS_VERSION
+from .imports import LossImporter
+from .models import (
+    AffectedArea,
+    Cause,
+    Department,
+    LossOfProduction,
+    LossOfProductionDailyRollup,
+    LossOfProductionDeletion,
+    ReportingLimitArea,
+)
+from .lookups import get_table
+from .rollups import KEY_FIELDS, apply_deltas, rollup_key
+from .routing import replica_alias, replica_available
+from .roles import ROLES_VERSION, get_user_roles, manifest_codenames, sync_roles
+from .search import SQLiteFTS5SearchBackend, get_search_backend
+from .sync import decode_token, encode_token
+from .timeline import sweep
+from .views import LossOfProductionViewSet
+
+
+# Reads stay on the primary unless a test routes them to the replica.
+@override_settings(LOP_READ_REPLICA=None)
+class LossOfProductionTestCase(TestCase):
+    """Lookups, a few loss events and a superuser client."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.department = Department.objects.create(name='Production')
+        cls.other_department = Department.objects.create(name='Maintenance')
+        cls.area = AffectedArea.objects.create(name='Line 1')
+        cls.cause = Cause.objects.create(name='Leak')
+        cls.other_cause = Cause.objects.create(name='Wear')
+        cls.rla = ReportingLimitArea.objects.create(name='RLA', department=cls.department)
+        cls.user = User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+
+    def setUp(self):
+        # Version counters and lookup tables live in the cache, which the
+        # test database rollback does not reset.
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_event(self, **kwargs):
+        values = {
+            'issue_date': datetime.date(2025, 1, 10),
+            'department': self.department,
+            'affected_area': self.area,
+            'equipment_or_process_step': 'Pump P-101',
+            'cause': self.cause,
+            'event_type': LossOfProduction.EventType.UNPLANNED,
+            'status': LossOfProduction.Status.ONGOING,
+            'reporting_limit_area': self.rla,
+        }
+        values.update(kwargs)
+        return LossOfProduction.objects.create(**values)
+
+    def assertRollupMatchesEvents(self):
+        expected = Counter(rollup_key(event) for event in LossOfProduction.objects.all())
+        actual = {
+            tuple(row[field] for _, field in KEY_FIELDS): row['count']
+            for row in LossOfProductionDailyRollup.objects.filter(count__gt=0).values(
+                *(field for _, field in KEY_FIELDS), 'count'
+            )
+        }
+        self.assertEqual(actual, dict(expected))
+        self.assertFalse(LossOfProductionDailyRollup.objects.filter(count__lt=0).exists())
+
+
+class StatsTests(LossOfProductionTestCase):
+    url = '/api/lossofproduction/stats/'
+
+    def test_empty_group_by_is_rejected(self):
+        self.create_event()
+        for value in ('', ',', ' , '):
+            response = self.client.get(self.url, {'group_by': value})
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('group_by', response.json())
+
+    def test_groups_and_totals(self):
+        for _ in range(3):
+            self.create_event()
+        self.create_event(cause=self.other_cause, status=LossOfProduction.Status.FINISHED)
+        response = self.client.get(self.url, {'group_by': 'department'})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(
+            [(group['department_id'], group['count'], group['ongoing']) for group in data['groups']],
+            [(self.department.id, 4, 3)],
+        )
+        self.assertEqual((data['total'], data['ongoing']), (4, 3))
+        self.assertEqual([row['count'] for row in data['pareto']], [3, 1])
+
+
+class RoleCacheTests(LossOfProductionTestCase):
+
+    def test_membership_change_invalidates_after_commit(self):
+        member = User.objects.create_user('member', password='pw')
+        group = Group.objects.create(name='Auditors')
+        self.assertEqual(get_user_roles(User.objects.get(pk=member.pk)), frozenset())
+        version = get_version(ROLES_VERSION)
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            member.groups.add(group)
+            # Not before the transaction commits.
+            self.assertEqual(get_version(ROLES_VERSION), version)
+        self.assertTrue(callbacks)
+        self.assertNotEqual(get_version(ROLES_VERSION), version)
+        self.assertEqual(get_user_roles(User.objects.get(pk=member.pk)), frozenset({'Auditors'}))
+
+    def test_cached_user_is_dropped_after_commit(self):
+        member = User.objects.create_user('member', password='pw')
+        self.assertTrue(get_cached_user(member.pk).is_active)
+        with self.captureOnCommitCallbacks(execute=True):
+            member.is_active = False
+            member.save()
+            self.assertTrue(get_cached_user(member.pk).is_active)
+        self.assertFalse(get_cached_user(member.pk).is_active)
+
+    def test_cached_user_holds_no_password_hash(self):
+        member = User.objects.create_user('member', 'member@example.com', 'pw')
+        get_cached_user(member.pk)
+        cached = cache.get(f'lop:user-fields:{member.pk}')
+        self.assertNotIn(member.password, cached)
+
+        with self.assertNumQueries(0):
+            user = get_cached_user(member.pk)
+            self.assertEqual((user.pk, user.username, user.is_active), (member.pk, 'member', True))
+        # Other fields load on access, and saving writes only loaded fields.
+        self.assertEqual(user.email, 'member@example.com')
+        user.first_name = 'Max'
+        user.save()
+        member.refresh_from_db()
+        self.assertEqual((member.first_name, member.email), ('Max', 'member@example.com'))
+        self.assertTrue(member.check_password('pw'))
+
+
+class SharedCacheCheckTests(SimpleTestCase):
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_warns_on_process_local_cache(self):
+        self.assertEqual([warning.id for warning in check_shared_cache(None)], ['lossofproduction.W001'])
+
+    @override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': 'redis://localhost:6379/1',
+    }})
+    def test_shared_cache_passes(self):
+        self.assertEqual(check_shared_cache(None), [])
+
+
+class LookupLabelTests(LossOfProductionTestCase):
+
+    def test_lookups_missing_from_the_cached_table_load_in_one_query(self):
+        self.create_event()
+        get_table(Cause)
+        # The version bump runs on commit, which never happens inside the
+        # test transaction, so the cached table stays without these rows.
+        causes = [Cause.objects.create(name=f'New cause {i}') for i in range(3)]
+        for cause in causes:
+            self.create_event(cause=cause)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/lossofproduction/', {'page_size': 10})
+        self.assertEqual(response.status_code, 200)
+        self.assertCountEqual(
+            [item['cause'] for item in response.json()['results']],
+            ['Leak', 'New cause 0', 'New cause 1', 'New cause 2'],
+        )
+        cause_queries = [query for query in queries if 'FROM "lossofproduction_cause"' in query['sql']]
+        self.assertEqual(len(cause_queries), 1)
+
+
+@override_settings(LOP_SYNC_SAFETY_LAG_SECONDS=0, LOP_SYNC_TOMBSTONE_RETENTION_DAYS=30)
+class SyncTests(LossOfProductionTestCase):
+    url = '/api/lossofproduction/changes/'
+
+    def sync(self, since=None):
+        response = self.client.get(self.url, {'since': since} if since else {})
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_deletions_and_tokens_older_than_the_retention(self):
+        event = self.create_event()
+        event_id = event.id
+        token = self.sync()['next_token']
+        event.delete()
+        data = self.sync(token)
+        self.assertEqual(data['deleted'], [event_id])
+
+        updated_at, pk, deletion_id, _ = decode_token(data['next_token'])
+        old_token = encode_token(updated_at, pk, deletion_id, timezone.now() - datetime.timedelta(days=31))
+        response = self.client.get(self.url, {'since': old_token})
+        self.assertEqual(response.status_code, 410)
+
+        payload = {'u': None, 'i': None, 'd': 0}
+        token = base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+        response = self.client.get(self.url, {'since': token})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('since', response.json())
+
+    def test_partial_save_is_picked_up(self):
+        event = self.create_event()
+        token = self.sync()['next_token']
+        event.description = 'Seal replaced'
+        event.save(update_fields=['description'])
+        changes = self.sync(token)['changes']
+        self.assertEqual([(row['id'], row['description']) for row in changes], [(event.id, 'Seal replaced')])
+
+    def test_prune_removes_only_expired_tombstones(self):
+        LossOfProductionDeletion.objects.create(loss_id=1, deleted_at=timezone.now() - datetime.timedelta(days=31))
+        recent = LossOfProductionDeletion.objects.create(loss_id=2)
+        call_command('prune_sync_tombstones', chunk_size=1, stdout=StringIO())
+        self.assertEqual(list(LossOfProductionDeletion.objects.values_list('id', flat=True)), [recent.id])
+
+    def test_lookup_rename_resyncs_the_events_showing_it(self):
+        event = self.create_event()
+        self.create_event(cause=self.other_cause)
+        token = self.sync()['next_token']
+        self.assertEqual(self.sync(token)['changes'], [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.cause.name = 'Seal leak'
+            self.cause.save()
+        changes = self.sync(token)['changes']
+        self.assertEqual([(row['id'], row['cause']) for row in changes], [(event.id, 'Seal leak')])
+
+
+class RollupTests(LossOfProductionTestCase):
+
+    def test_save_update_and_delete(self):
+        first = self.create_event()
+        second = self.create_event()
+        self.create_event(status=LossOfProduction.Status.FINISHED, date_solved=datetime.date(2025, 1, 12))
+        self.assertRollupMatchesEvents()
+
+        first.cause = self.other_cause
+        first.issue_date = datetime.date(2025, 1, 11)
+        first.save()
+        self.assertRollupMatchesEvents()
+
+        second.status = LossOfProduction.Status.FINISHED
+        second.save(update_fields=['status'])
+        self.assertRollupMatchesEvents()
+
+        first.delete()
+        LossOfProduction.objects.filter(pk=second.pk).delete()
+        self.assertRollupMatchesEvents()
+
+    def test_bulk_update(self):
+        events = [self.create_event() for _ in range(3)]
+        response = self.client.patch(
+            '/api/lossofproduction/bulk/',
+            [{'id': event.id, 'cause': self.other_cause.id} for event in events[:2]],
+            format='json',
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertRollupMatchesEvents()
+
+    def rollup_counts(self):
+        return {
+            row[:-1]: row[-1]
+            for row in LossOfProductionDailyRollup.objects.filter(count__gt=0).values_list(
+                *(field for _, field in KEY_FIELDS), 'count'
+            )
+        }
+
+    def test_bulk_create_and_import_match_a_rebuild(self):
+        self.create_event()
+        self.create_event(issue_date=datetime.date(2025, 1, 3))
+        item = {
+            'issue_date': '2025-01-10', 'department': self.department.id, 'affected_area': self.area.id,
+            'equipment_or_process_step': 'Pump P-101', 'cause': self.cause.id, 'event_type': 'UNPLANNED',
+            'status': 'ONGOING', 'reporting_limit_area': self.rla.id,
+        }
+        response = self.client.post(
+            '/api/lossofproduction/bulk/',
+            [item, item, {**item, 'issue_date': '2025-01-11'}, {**item, 'cause': self.other_cause.id}],
+            format='json',
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+
+        row = {
+            'issue_date': '2025-01-03', 'department': 'Production', 'affected_area': 'Line 1',
+            'equipment_or_process_step': 'Pump P-101', 'cause': 'Leak', 'event_type': 'Unplanned',
+            'status': 'Ongoing', 'reporting_limit_area': 'RLA',
+        }
+        inserted, rejected = LossImporter().import_chunk(
+            [row, row, {**row, 'issue_date': '2025-01-11'}, {**row, 'issue_date': '2025-01-20'}]
+        )
+        self.assertEqual((inserted, rejected), (4, []))
+
+        counts = self.rollup_counts()
+        self.assertEqual(sum(counts.values()), 10)
+        call_command('rebuild_rollups', stdout=StringIO())
+        self.assertEqual(counts, self.rollup_counts())
+
+    def test_partial_save_of_other_fields_skips_the_key_lookup(self):
+        event = self.create_event()
+        event.description = 'Seal replaced'
+        with CaptureQueriesContext(connection) as queries:
+            event.save(update_fields=['description'])
+        self.assertEqual(
+            [query['sql'].split()[0] for query in queries if 'SAVEPOINT' not in query['sql']],
+            ['UPDATE'],
+        )
+        self.assertRollupMatchesEvents()
+
+    def test_negative_delta_never_creates_a_row(self):
+        key = rollup_key(LossOfProduction(
+            issue_date=datetime.date(2025, 2, 1), department=self.department, affected_area=self.area,
+            cause=self.cause, event_type=LossOfProduction.EventType.PLANNED,
+            status=LossOfProduction.Status.ONGOING,
+        ))
+        apply_deltas({key: -1})
+        self.assertFalse(LossOfProductionDailyRollup.objects.exists())
+
+    def test_failed_rollup_update_rolls_back_the_save(self):
+        with mock.patch('lossofproduction.rollups.apply_deltas', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.create_event()
+        self.assertFalse(LossOfProduction.objects.exists())
+
+
+@override_settings(LOP_METRICS_TOKEN='metrics-secret', LOP_METRICS_ALLOWED_IPS=[], LOP_SERVER_TIMING=False)
+class InstrumentationTests(LossOfProductionTestCase):
+
+    def test_metrics_require_token_or_staff(self):
+        # Behind a reverse proxy every request arrives from loopback.
+        anonymous = Client(REMOTE_ADDR='127.0.0.1')
+        self.assertEqual(anonymous.get('/metrics/').status_code, 403)
+        self.assertEqual(anonymous.get('/metrics/', HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+        self.assertEqual(anonymous.get('/metrics/', HTTP_AUTHORIZATION='Bearer metrics-secret').status_code, 200)
+
+        staff = Client()
+        staff.force_login(self.user)
+        self.assertEqual(staff.get('/metrics/').status_code, 200)
+
+    def test_server_timing_only_for_staff(self):
+        reader = User.objects.create_user('reader', password='pw')
+        reader_client = APIClient()
+        reader_client.force_authenticate(reader)
+        self.assertNotIn('Server-Timing', reader_client.get('/api/auth/me/'))
+        self.assertIn('Server-Timing', self.client.get('/api/auth/me/'))
+
+
+class KeysetPaginationTests(LossOfProductionTestCase):
+
+    def walk(self, url, params):
+        ids, response = [], self.client.get(url, params)
+        while True:
+            self.assertEqual(response.status_code, 200, response.content)
+            data = response.json()
+            ids.extend(item['id'] for item in data['results'])
+            if not data['next']:
+                return ids, data
+            response = self.client.get(data['next'])
+
+    def test_cursor_seek_over_null_date_solved(self):
+        events = []
+        for day, solved in ((1, 3), (2, None), (3, 3), (4, None), (5, 1), (6, None), (7, 9)):
+            events.append(self.create_event(
+                issue_date=datetime.date(2025, 1, day),
+                date_solved=datetime.date(2025, 1, solved) if solved else None,
+                status=LossOfProduction.Status.FINISHED if solved else LossOfProduction.Status.ONGOING,
+            ))
+        for ordering in ('date_solved', '-date_solved'):
+            ids, last_page = self.walk('/api/lossofproduction/', {'ordering': ordering, 'page_size': 2})
+            self.assertEqual(sorted(ids), sorted(event.id for event in events))
+            by_id = {event.id: event.date_solved for event in events}
+            dates = [by_id[pk] for pk in ids]
+            solved = [value for value in dates if value is not None]
+            # Nulls come last in both directions, the rest in order.
+            self.assertEqual(dates, solved + [None] * (len(dates) - len(solved)))
+            self.assertEqual(solved, sorted(solved, reverse=ordering.startswith('-')))
+
+            # Walking back from the last page returns the same rows.
+            back, response = [], self.client.get(last_page['previous'])
+            while True:
+                data = response.json()
+                back = [item['id'] for item in data['results']] + back
+                if not data['previous']:
+                    break
+                response = self.client.get(data['previous'])
+            self.assertEqual(back + [item['id'] for item in last_page['results']], ids)
+
+
+class ConditionalGetTests(LossOfProductionTestCase):
+
+    def assertNotModified(self, url, etag):
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_list_and_detail_answer_304_until_a_write(self):
+        event = self.create_event()
+        list_url, detail_url = '/api/lossofproduction/', f'/api/lossofproduction/{event.id}/'
+        list_etag = self.client.get(list_url)['ETag']
+        detail_etag = self.client.get(detail_url)['ETag']
+        self.assertNotModified(list_url, list_etag)
+        self.assertNotModified(detail_url, detail_etag)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(detail_url, {'description': 'Changed'}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        for url, etag in ((list_url, list_etag), (detail_url, detail_etag)):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response['ETag'], etag)
+
+    def test_lookup_rename_changes_the_list_etag(self):
+        self.create_event()
+        url = '/api/lossofproduction/'
+        etag = self.client.get(url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.cause.name = 'Seal leak'
+            self.cause.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['cause'], 'Seal leak')
+
+
+class SparseFieldsTests(LossOfProductionTestCase):
+
+    def test_fields_and_omit(self):
+        event = self.create_event()
+        response = self.client.get('/api/lossofproduction/', {'fields': 'id,cause'})
+        self.assertEqual(response.json()['results'], [{'id': event.id, 'cause': 'Leak'}])
+
+        response = self.client.get(f'/api/lossofproduction/{event.id}/', {'omit': 'description'})
+        self.assertNotIn('description', response.json())
+        self.assertIn('equipment_or_process_step', response.json())
+
+        response = self.client.get('/api/lossofproduction/', {'fields': 'id,bogus'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('fields', response.json())
+
+
+class BulkTests(LossOfProductionTestCase):
+
+    def item(self, **kwargs):
+        item = {
+            'issue_date': '2025-01-10',
+            'department': self.department.id,
+            'affected_area': self.area.id,
+            'equipment_or_process_step': 'Pump P-101',
+            'cause': self.cause.id,
+            'event_type': 'UNPLANNED',
+            'status': 'ONGOING',
+            'reporting_limit_area': self.rla.id,
+        }
+        item.update(kwargs)
+        return item
+
+    def test_invalid_item_rejects_the_whole_batch(self):
+        response = self.client.post(
+            '/api/lossofproduction/bulk/',
+            [self.item(), self.item(cause=999999), self.item(status='BOGUS')],
+            format='json',
+        )
+        self.assertEqual(response.status_code, 400)
+        errors = response.json()
+        self.assertEqual(len(errors), 3)
+        self.assertEqual(errors[0], {})
+        self.assertIn('cause', errors[1])
+        self.assertIn('status', errors[2])
+        self.assertFalse(LossOfProduction.objects.exists())
+
+    def test_lookup_created_after_the_table_was_cached(self):
+        get_table(Cause)
+        # The version bump runs on commit, so the cached table is still stale.
+        cause = Cause.objects.create(name='Corrosion')
+        response = self.client.post('/api/lossofproduction/bulk/', [self.item(cause=cause.id)], format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(LossOfProduction.objects.get().cause, cause)
+
+    def test_single_create_with_a_lookup_created_after_the_table_was_cached(self):
+        get_table(Cause)
+        cause = Cause.objects.create(name='Corrosion')
+        response = self.client.post('/api/lossofproduction/', self.item(cause=cause.id), format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        response = self.client.post('/api/lossofproduction/', self.item(cause=999999), format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('cause', response.json())
+
+    def test_create_fills_derived_fields(self):
+        response = self.client.post(
+            '/api/lossofproduction/bulk/',
+            [self.item(status='FINISHED', date_solved='2025-01-13', equipment_or_process_step='PUMP  p-101')],
+            format='json',
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+        event = LossOfProduction.objects.get()
+        self.assertEqual((event.resolution_days, event.equipment_key), (3, 'pump p 101'))
+
+
+class RoleClaimTests(LossOfProductionTestCase):
+
+    def test_access_token_carries_roles_and_authenticates(self):
+        reader = User.objects.create_user('reader', password='pw')
+        reader.groups.add(Group.objects.get(name='Reader'))
+        response = self.client.post('/api/auth/token/', {'username': 'reader', 'password': 'pw'}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        access = response.json()['access']
+        self.assertEqual(AccessToken(access)['roles']['g'], ['Reader'])
+
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        self.assertEqual(client.get('/api/lossofproduction/').status_code, 200)
+        self.assertEqual(client.post('/api/lossofproduction/bulk/', [], format='json').status_code, 403)
+
+
+class TimelineTests(LossOfProductionTestCase):
+
+    def test_sweep(self):
+        day = lambda n: datetime.date(2025, 1, n)
+        segments, merged = sweep([(day(1), day(4)), (day(2), day(3)), (day(3), day(5)), (day(8), day(9))])
+        self.assertEqual(segments, [[day(1), day(2), 1], [day(2), day(4), 2], [day(4), day(5), 1], [day(8), day(9), 1]])
+        self.assertEqual(merged, [[day(1), day(5), 3, 2], [day(8), day(9), 1, 1]])
+
+        # Touching intervals merge, and so do runs with the same count.
+        segments, merged = sweep([(day(1), day(2)), (day(2), day(3))])
+        self.assertEqual(segments, [[day(1), day(3), 1]])
+        self.assertEqual(merged, [[day(1), day(3), 2, 1]])
+
+    def test_endpoint_window(self):
+        self.create_event(issue_date=datetime.date(2025, 1, 1), date_solved=datetime.date(2025, 1, 10),
+                          status=LossOfProduction.Status.FINISHED)
+        self.create_event(issue_date=datetime.date(2025, 1, 5), date_solved=datetime.date(2025, 1, 6),
+                          status=LossOfProduction.Status.FINISHED)
+        response = self.client.get('/api/lossofproduction/timeline/', {'start': '2025-01-06', 'end': '2025-01-08'})
+        self.assertEqual(response.status_code, 200)
+        [area] = response.json()['areas']
+        self.assertEqual(area['peak'], {'count': 2, 'start': '2025-01-06', 'end': '2025-01-06'})
+        self.assertEqual(area['daily'], [
+            {'start': '2025-01-06', 'end': '2025-01-06', 'count': 2},
+            {'start': '2025-01-07', 'end': '2025-01-08', 'count': 1},
+        ])
+        response = self.client.get('/api/lossofproduction/timeline/', {'start': '2025-01-08', 'end': '2025-01-06'})
+        self.assertEqual(response.status_code, 400)
+
+
+class RecurringFailureTests(LossOfProductionTestCase):
+
+    def test_sliding_window_on_the_equipment_key(self):
+        for day, equipment in ((1, 'Pump P-101'), (5, 'pump p 101'), (20, 'PUMP-P-101'), (60, 'Pump P101'),
+                               (2, 'Valve V2')):
+            self.create_event(issue_date=datetime.date(2025, 1, 1) + datetime.timedelta(days=day - 1),
+                              equipment_or_process_step=equipment)
+        response = self.client.get('/api/lossofproduction/recurring/', {'window_days': 30, 'min_events': 3})
+        self.assertEqual(response.status_code, 200)
+        [item] = response.json()
+        self.assertEqual((item['equipment_key'], item['equipment'], item['events']), ('pump p 101', 'PUMP-P-101', 3))
+        self.assertEqual(item['peak'], {'count': 3, 'start': '2025-01-01', 'end': '2025-01-20'})
+        self.assertEqual([(episode['start'], episode['events']) for episode in item['episodes']], [('2025-01-01', 3)])
+
+        response = self.client.get('/api/lossofproduction/recurring/', {'window_days': 5, 'min_events': 2})
+        self.assertEqual([item['equipment_key'] for item in response.json()], ['pump p 101'])
+        self.assertEqual(response.json()[0]['peak']['end'], '2025-01-05')
+
+        response = self.client.get('/api/lossofproduction/', {'equipment': 'pump  P-101'})
+        self.assertEqual(len(response.json()['results']), 3)
+
+
+class FilterTests(LossOfProductionTestCase):
+    url = '/api/lossofproduction/'
+
+    def ids(self, params):
+        response = self.client.get(self.url, {'page_size': 1000, **params})
+        self.assertEqual(response.status_code, 200, response.content)
+        return sorted(item['id'] for item in response.json()['results'])
+
+    def test_comma_separated_and_null_filters(self):
+        other_rla = ReportingLimitArea.objects.create(name='Workshop', department=self.other_department)
+        ongoing = self.create_event()
+        finished = self.create_event(status=LossOfProduction.Status.FINISHED, date_solved=datetime.date(2025, 1, 11))
+        other = self.create_event(department=self.other_department, reporting_limit_area=other_rla,
+                                  cause=self.other_cause, status=LossOfProduction.Status.NO_SELECTION)
+
+        self.assertEqual(self.ids({'department': f'{self.department.id},{self.other_department.id}'}),
+                         sorted([ongoing.id, finished.id, other.id]))
+        self.assertEqual(self.ids({'status': 'ONGOING,NO_SELECTION'}), sorted([ongoing.id, other.id]))
+        self.assertEqual(self.ids({'cause': str(self.other_cause.id), 'status': 'ONGOING'}), [])
+        self.assertEqual(self.ids({'date_solved__isnull': 'true'}), sorted([ongoing.id, other.id]))
+        self.assertEqual(self.ids({'date_solved__isnull': 'false'}), [finished.id])
+        self.assertEqual(self.ids({'issue_date_after': '2025-01-10', 'issue_date_before': '2025-01-10'}),
+                         sorted([ongoing.id, finished.id, other.id]))
+        self.assertEqual(self.ids({'issue_date_after': '2025-01-11'}), [])
+
+    def test_invalid_filters_and_ordering_answer_400(self):
+        for params, field in (
+            ({'department': 'one'}, 'department'),
+            ({'status': 'DONE'}, 'status'),
+            ({'issue_date_after': '10.01.2025'}, 'issue_date_after'),
+            ({'date_solved__isnull': 'maybe'}, 'date_solved__isnull'),
+            ({'ordering': 'description'}, 'ordering'),
+            ({'ordering': 'issue_date,-reporting_limit'}, 'ordering'),
+        ):
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertIn(field, response.json())
+
+    def test_ordering_with_keyset_paging(self):
+        other_rla = ReportingLimitArea.objects.create(name='Workshop', department=self.other_department)
+        events = [self.create_event(issue_date=datetime.date(2025, 1, day)) for day in range(1, 6)]
+        events += [
+            self.create_event(department=self.other_department, reporting_limit_area=other_rla,
+                              issue_date=datetime.date(2025, 1, day))
+            for day in range(1, 4)
+        ]
+        names = {self.department.id: self.department.name, self.other_department.id: self.other_department.name}
+        for ordering in ('department__name,-issue_date', '-department__name,issue_date'):
+            ids, response = [], self.client.get(self.url, {'ordering': ordering, 'page_size': 3})
+            while True:
+                data = response.json()
+                ids.extend(item['id'] for item in data['results'])
+                if not data['next']:
+                    break
+                response = self.client.get(data['next'])
+            name_order, date_order = ordering.split(',')
+            expected = sorted(events, key=lambda event: (event.issue_date, event.id),
+                              reverse=date_order.startswith('-'))
+            expected.sort(key=lambda event: names[event.department_id], reverse=name_order.startswith('-'))
+            self.assertEqual(ids, [event.id for event in expected])
+
+
+class ExportTests(LossOfProductionTestCase):
+    url = '/api/lossofproduction/export/'
+
+    def test_csv_and_ndjson_stream_every_row(self):
+        for day in range(1, 6):
+            self.create_event(issue_date=datetime.date(2025, 1, day), description=f'Leak, day "{day}"')
+        self.create_event(department=self.other_department)
+
+        response = self.client.get(self.url, {'department': self.department.id})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/csv'))
+        rows = list(csv.reader(StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(rows[0][:3], ['id', 'issue_date', 'department'])
+        self.assertEqual(len(rows), 6)
+        self.assertEqual({row[5] for row in rows[1:]}, {f'Leak, day "{day}"' for day in range(1, 6)})
+
+        response = self.client.get(self.url, {'format': 'ndjson'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('application/x-ndjson'))
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 6)
+        self.assertEqual(Counter(json.loads(line)['department'] for line in lines),
+                         {self.department.name: 5, self.other_department.name: 1})
+
+    def test_errors_are_rendered_as_json(self):
+        for fmt in ('csv', 'ndjson'):
+            response = self.client.get(self.url, {'format': fmt, 'department': 'one'})
+            self.assertEqual(response.status_code, 400, fmt)
+            self.assertTrue(response['Content-Type'].startswith('application/json'), fmt)
+            self.assertIn('department', response.json())
+
+        self.client.force_authenticate(User.objects.create_user('nobody', password='pw'))
+        for fmt in ('csv', 'ndjson'):
+            response = self.client.get(self.url, {'format': fmt})
+            self.assertEqual(response.status_code, 403, fmt)
+            self.assertTrue(response['Content-Type'].startswith('application/json'), fmt)
+            self.assertIn('detail', response.json())
+
+
+@override_settings(LOP_SEARCH_BACKEND=None)
+class SearchTests(LossOfProductionTestCase):
+    url = '/api/lossofproduction/'
+
+    def search(self, query):
+        response = self.client.get(self.url, {'q': query})
+        self.assertEqual(response.status_code, 200, response.content)
+        return [item['id'] for item in response.json()['results']]
+
+    def test_index_follows_inserts_edits_and_deletes(self):
+        self.assertIsInstance(get_search_backend(), SQLiteFTS5SearchBackend)
+        pump = self.create_event(description='Bearing failure on the feed pump')
+        valve = self.create_event(equipment_or_process_step='Valve V-7', description='Seal leak')
+
+        self.assertEqual(self.search('bear'), [pump.id])
+        self.assertEqual(self.search('seal valve'), [valve.id])
+        self.assertEqual(self.search('bearing seal'), [])
+
+        valve.description = 'Bearing seized'
+        valve.save()
+        self.assertCountEqual(self.search('bearing'), [pump.id, valve.id])
+        self.assertEqual(self.search('seal'), [])
+
+        LossOfProduction.objects.filter(pk=pump.pk).update(description='Motor overheated')
+        self.assertEqual(self.search('bearing'), [valve.id])
+
+        valve.delete()
+        self.assertEqual(self.search('bearing'), [])
+        self.assertEqual(self.search('motor'), [pump.id])
+
+
+IMPORT_CSV = '''Issue Date,Department,Affected Area,Equipment or Process Step,Description,Cause,Event Type,Status,Date Solved,Reporting Limit Area,Reporting Limit
+2025-01-10,Production,Line 1,PUMP  p-101,Bearing failure,Leak,Unplanned,Finished,2025-01-13,RLA,5 t
+2025-01-11,production,LINE 1,Valve V-7,,Wear,planned,,,RLA,
+10.01.2025,Production,Line 1,Pump P-101,,Leak,Unplanned,Ongoing,,RLA,
+2025-01-12,Production,Line 1,Pump P-101,,Leak,Unplanned,Done,,RLA,
+2025-01-12,Packaging,Line 2,Filler F-1,,Corrosion,Unplanned,Ongoing,,Packaging RLA,
+'''
+
+
+class ImportTests(LossOfProductionTestCase):
+
+    def import_csv(self, *args):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'losses.csv')
+        with open(path, 'w', newline='', encoding='utf-8') as file:
+            file.write(IMPORT_CSV)
+        call_command('import_losses', path, *args, stdout=StringIO())
+        rejects = f'{path}.rejects.csv'
+        if not os.path.exists(rejects):
+            return []
+        with open(rejects, newline='', encoding='utf-8') as file:
+            return list(csv.reader(file))
+
+    def test_valid_rows_are_inserted_and_invalid_rows_rejected(self):
+        rejects = self.import_csv('--chunk-size', '2')
+
+        self.assertEqual(LossOfProduction.objects.count(), 2)
+        solved = LossOfProduction.objects.get(equipment_or_process_step='PUMP  p-101')
+        self.assertEqual((solved.event_type, solved.status), ('UNPLANNED', 'FINISHED'))
+        self.assertEqual((solved.resolution_days, solved.equipment_key), (3, 'pump p 101'))
+        planned = LossOfProduction.objects.get(equipment_or_process_step='Valve V-7')
+        self.assertEqual((planned.department, planned.cause), (self.department, self.other_cause))
+        self.assertEqual((planned.event_type, planned.status), ('PLANNED', 'NO_SELECTION'))
+        self.assertRollupMatchesEvents()
+
+        self.assertEqual(rejects[0][0], 'row')
+        self.assertEqual(rejects[0][-1], 'errors')
+        self.assertEqual([row[0] for row in rejects[1:]], ['4', '5', '6'])
+        self.assertEqual(rejects[1][1], '10.01.2025')
+        self.assertIn('issue_date: Invalid date "10.01.2025".', rejects[1][-1])
+        self.assertIn('status: "Done" is not a valid choice.', rejects[2][-1])
+        self.assertIn('cause: Unknown cause "Corrosion".', rejects[3][-1])
+        self.assertFalse(Cause.objects.filter(name='Corrosion').exists())
+
+    def test_create_missing_lookups(self):
+        rejects = self.import_csv('--create-missing')
+
+        self.assertEqual(LossOfProduction.objects.count(), 3)
+        self.assertEqual(len(rejects), 3)
+        rla = ReportingLimitArea.objects.get(name='Packaging RLA')
+        self.assertEqual(rla.department, Department.objects.get(name='Packaging'))
+        event = LossOfProduction.objects.get(equipment_or_process_step='Filler F-1')
+        self.assertEqual(
+            (event.affected_area.name, event.cause.name, event.reporting_limit_area), ('Line 2', 'Corrosion', rla)
+        )
+        self.assertEqual(Department.objects.filter(name__iexact='production').count(), 1)
+        self.assertRollupMatchesEvents()
+
+
+class AdminChangelistTests(LossOfProductionTestCase):
+    url = '/admin/lossofproduction/lossofproduction/'
+
+    def setUp(self):
+        super().setUp()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def changelist_queries(self, params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return [query['sql'] for query in queries]
+
+    def assertCountsAreBounded(self, queries):
+        for sql in queries:
+            if 'COUNT(' in sql.upper():
+                self.assertIn('LIMIT', sql.upper(), sql)
+
+    def test_query_count_does_not_grow_with_the_table(self):
+        for params in ({}, {'department__id__exact': self.department.id, 'status__exact': 'ONGOING'}):
+            self.create_event()
+            before = self.changelist_queries(params)
+            for day in range(1, 21):
+                self.create_event(issue_date=datetime.date(2025, 1, day), department=self.department)
+            after = self.changelist_queries(params)
+            self.assertEqual(len(after), len(before), params)
+            self.assertLessEqual(len(after), 8, params)
+            self.assertCountsAreBounded(after)
+
+    def test_unfiltered_list_of_a_large_table_is_not_counted(self):
+        self.create_event()
+        with mock.patch('lossofproduction.pagination.estimated_row_count', return_value=5_000_000):
+            queries = self.changelist_queries({})
+        event_counts = [sql for sql in queries if 'COUNT(' in sql.upper() and 'lossofproduction_lossofproduction' in sql]
+        self.assertEqual(event_counts, [])
+
+
+class SyncRolesTests(LossOfProductionTestCase):
+
+    def granted(self, role):
+        return set(Group.objects.get(name=role).permissions.values_list('codename', flat=True))
+
+    def writes(self, queries):
+        return [
+            query['sql'] for query in queries
+            if query['sql'].split()[0].upper() in ('INSERT', 'UPDATE', 'DELETE')
+        ]
+
+    def test_second_run_is_a_no_op(self):
+        sync_roles()
+        with CaptureQueriesContext(connection) as queries:
+            changes, missing = sync_roles()
+        self.assertEqual(missing, [])
+        for role, change in changes.items():
+            self.assertEqual(change, {'created': False, 'added': [], 'removed': []}, role)
+        self.assertEqual(self.writes(queries), [])
+        self.assertEqual(self.granted('Reader'), manifest_codenames()['Reader'])
+
+    def test_undeclared_grants_are_removed_and_members_kept(self):
+        reader_group = Group.objects.get(name='Reader')
+        reader = User.objects.create_user('reader', password='pw')
+        reader.groups.add(reader_group)
+        reader_group.permissions.add(Permission.objects.get(codename='delete_lossofproduction'))
+        reader_group.permissions.remove(Permission.objects.get(codename='view_cause'))
+
+        out = StringIO()
+        call_command('create_groups', stdout=out)
+        self.assertIn('  - Reader: lossofproduction.delete_lossofproduction', out.getvalue())
+        self.assertIn('  + Reader: lossofproduction.view_cause', out.getvalue())
+
+        self.assertEqual(Group.objects.get(name='Reader').pk, reader_group.pk)
+        self.assertEqual(self.granted('Reader'), manifest_codenames()['Reader'])
+        self.assertEqual(list(reader.groups.values_list('name', flat=True)), ['Reader'])
+
+    def test_dry_run_writes_nothing(self):
+        editor_group = Group.objects.get(name='Editor')
+        editor_group.permissions.remove(Permission.objects.get(codename='delete_lossofproduction'))
+        editor_group.permissions.add(Permission.objects.get(codename='delete_cause'))
+        Group.objects.filter(name='Admin').delete()
+        before = self.granted('Editor')
+
+        out = StringIO()
+        with CaptureQueriesContext(connection) as queries:
+            call_command('create_groups', '--dry-run', stdout=out)
+        self.assertEqual(self.writes(queries), [])
+        self.assertIn('Created Admin group', out.getvalue())
+        self.assertIn('  + Editor: lossofproduction.delete_lossofproduction', out.getvalue())
+        self.assertIn('  - Editor: lossofproduction.delete_cause', out.getvalue())
+        self.assertIn('Dry run; nothing was changed', out.getvalue())
+        self.assertFalse(Group.objects.filter(name='Admin').exists())
+        self.assertEqual(self.granted('Editor'), before)
+
+
+class AsyncViewTests(LossOfProductionTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.async_client = AsyncClient()
+
+    def bearer(self, user):
+        return {'authorization': f'Bearer {AccessToken.for_user(user)}'}
+
+    async def get_both(self, path, params=None):
+        sync_response = await sync_to_async(self.client.get)(f'/api/{path}', params)
+        # The version stamps are prefetched; the blocking getters must not run on the event loop.
+        with mock.patch('lossofproduction.conditional.get_version', side_effect=AssertionError), \
+                mock.patch('lossofproduction.conditional.get_modified', side_effect=AssertionError):
+            async_response = await self.async_client.get(f'/api/async/{path}', params, headers=self.bearer(self.user))
+        self.assertEqual(async_response.status_code, 200, async_response.content)
+        self.assertEqual(async_response.json(), sync_response.json())
+        self.assertEqual(async_response['ETag'], sync_response['ETag'])
+        return async_response
+
+    async def test_routes_match_the_sync_routes_and_answer_304(self):
+        event = await sync_to_async(self.create_event)(description='Seal leak')
+        for path in ('lossofproduction/', f'lossofproduction/{event.id}/', 'departments/', 'causes/'):
+            response = await self.get_both(path)
+            not_modified = await self.async_client.get(
+                f'/api/async/{path}', headers={**self.bearer(self.user), 'if-none-match': response['ETag']}
+            )
+            self.assertEqual(not_modified.status_code, 304, path)
+            self.assertEqual(not_modified['ETag'], response['ETag'])
+
+        response = await self.get_both(f'lossofproduction/{event.id}/', {'fields': 'id,description,cause'})
+        self.assertEqual(response.json(), {'id': event.id, 'description': 'Seal leak', 'cause': 'Leak'})
+        response = await self.get_both('lossofproduction/', {'fields': 'id,status'})
+        self.assertEqual(response.json()['results'], [{'id': event.id, 'status': 'Ongoing'}])
+
+        response = await self.async_client.get(
+            '/api/async/lossofproduction/', {'fields': 'nope'}, headers=self.bearer(self.user)
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('fields', response.json())
+
+    async def test_permission_denied(self):
+        nobody = await User.objects.acreate_user('nobody', password='pw')
+        for path in ('lossofproduction/', 'lossofproduction/1/', 'departments/'):
+            response = await self.async_client.get(f'/api/async/{path}', headers=self.bearer(nobody))
+            self.assertEqual(response.status_code, 403, path)
+            self.assertNotIn('ETag', response)
+        response = await self.async_client.get('/api/async/lossofproduction/')
+        self.assertEqual(response.status_code, 401)
+
+
+@skipUnless(replica_alias(), 'Set LOP_SQLITE_REPLICA_PATH to test the read replica routing.')
+@override_settings(LOP_READ_REPLICA='replica', LOP_REPLICA_STICKY_SECONDS=60)
+class ReplicaRoutingTests(LossOfProductionTestCase):
+    """Runs against a second SQLite test database that stands in for the replica."""
+    # Declared only when configured: the runner checks every alias, even of skipped classes.
+    databases = {'default', 'replica'} if replica_alias() else {'default'}
+
+    def setUp(self):
+        super().setUp()
+        routing._unavailable_until.clear()
+        routing._verified_at.clear()
+        self.event = self.create_event(description='Replicated')
+        for model in (Department, AffectedArea, Cause, ReportingLimitArea, LossOfProduction):
+            # bulk_create() sends no signals, so nothing is written back to the primary.
+            model.objects.using('replica').bulk_create(model.objects.using('default').order_by('pk'))
+        # Not replicated yet.
+        LossOfProduction.objects.using('default').filter(pk=self.event.pk).update(description='Primary only')
+
+    def description(self):
+        response = self.client.get(f'/api/lossofproduction/{self.event.pk}/')
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()['description']
+
+    def test_reads_go_to_the_replica_and_writes_to_the_primary(self):
+        with CaptureQueriesContext(connections['replica']) as replica_queries:
+            self.assertEqual(self.description(), 'Replicated')
+        self.assertTrue(replica_queries)
+
+        response = self.client.patch(
+            f'/api/lossofproduction/{self.event.pk}/', {'equipment_or_process_step': 'Pump P-102'}, format='json'
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(LossOfProduction.objects.using('default').get(pk=self.event.pk).equipment_or_process_step,
+                         'Pump P-102')
+        self.assertEqual(LossOfProduction.objects.using('replica').get(pk=self.event.pk).equipment_or_process_step,
+                         'Pump P-101')
+
+    def test_reads_stick_to_the_primary_after_a_write(self):
+        writer = self.client
+        other = APIClient()
+        other.force_authenticate(User.objects.create_superuser('other', 'other@example.com', 'pw'))
+        with self.captureOnCommitCallbacks() as callbacks:
+            writer.patch(f'/api/lossofproduction/{self.event.pk}/', {'reporting_limit': '2 t'}, format='json')
+
+        # The writer is pinned to the primary at once ...
+        self.assertEqual(self.description(), 'Primary only')
+        self.client = other
+        self.assertEqual(self.description(), 'Replicated')
+        # ... everyone else once the version bump has committed.
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.description(), 'Primary only')
+
+    def test_reads_stick_to_the_primary_after_a_version_bump(self):
+        self.assertEqual(self.description(), 'Replicated')
+        bump_version(LOSS_EVENTS_VERSION)
+        self.assertEqual(self.description(), 'Primary only')
+
+    def test_unavailable_replica_falls_back_to_the_primary(self):
+        with mock.patch.object(connections['replica'], 'ensure_connection', side_effect=OperationalError('down')), \
+                self.assertLogs('lossofproduction.routing', 'WARNING'):
+            self.assertEqual(self.description(), 'Primary only')
+        # Remembered for the retry interval without checking again.
+        self.assertEqual(self.description(), 'Primary only')
+
+    def test_failed_replica_read_is_repeated_on_the_primary_only(self):
+        def fail(execute, sql, params, many, context):
+            raise OperationalError('connection lost')
+
+        self.assertTrue(replica_available('replica'))
+        initial = LossOfProductionViewSet.initial
+        with connections['replica'].execute_wrapper(fail), \
+                mock.patch.object(LossOfProductionViewSet, 'initial', autospec=True, side_effect=initial) as spy, \
+                self.assertLogs('lossofproduction.routing', 'WARNING'):
+            self.assertEqual(self.description(), 'Primary only')
+        self.assertEqual(spy.call_count, 1)
+
+    def test_other_database_errors_are_not_retried(self):
+        def fail(execute, sql, params, many, context):
+            raise ProgrammingError('no such column')
+
+        self.assertTrue(replica_available('replica'))
+        with connections['replica'].execute_wrapper(fail), self.assertRaises(ProgrammingError):
+            self.client.get(f'/api/lossofproduction/{self.event.pk}/')
+        self.assertTrue(replica_available('replica'))
+
+
+
+class ColumnarTests(LossOfProductionTestCase):
+    url = '/api/lossofproduction/'
+
+    def rows_from_columns(self, payload):
+        """Decode a columnar payload back to the row format."""
+        columns, dictionaries = payload['columns'], payload['dictionaries']
+        return [
+            {
+                name: dictionaries[name][str(values[index])]
+                if name in dictionaries and values[index] is not None else values[index]
+                for name, values in columns.items()
+            }
+            for index in range(payload['length'])
+        ]
+
+    def test_columnar_formats_decode_to_the_row_format(self):
+        self.create_event(description='Seal leak')
+        self.create_event(cause=self.other_cause, status=LossOfProduction.Status.FINISHED,
+                          date_solved=datetime.date(2025, 1, 12))
+        self.create_event(event_type=LossOfProduction.EventType.PLANNED, issue_date=datetime.date(2025, 1, 2))
+
+        for params in ({}, {'fields': 'id,cause,status,date_solved'}, {'page_size': 2}):
+            expected = self.client.get(self.url, params).json()
+            response = self.client.get(self.url, {**params, 'format': 'columnar'})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['Content-Type'], 'application/vnd.lop.columnar+json')
+            payload = response.json()
+            self.assertEqual(self.rows_from_columns(payload['results']), expected['results'], params)
+            self.assertEqual(payload['next'] is None, expected['next'] is None)
+
+            response = self.client.get(self.url, params, HTTP_ACCEPT='application/vnd.lop.columnar+msgpack')
+            self.assertEqual(response.status_code, 200)
+            payload = msgpack.unpackb(response.content)
+            self.assertEqual(self.rows_from_columns(payload['results']), expected['results'], params)
+
+    def test_other_actions_answer_406(self):
+        event = self.create_event()
+        for url in (f'{self.url}{event.id}/', f'{self.url}stats/', f'{self.url}changes/'):
+            for media_type in ('application/vnd.lop.columnar+json', 'application/vnd.lop.columnar+msgpack'):
+                response = self.client.get(url, HTTP_ACCEPT=media_type)
+                self.assertEqual(response.status_code, 406, (url, media_type))
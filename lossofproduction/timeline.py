@@ -0,0 +1,167 @@
+import datetime
+import hashlib
+import heapq
+from itertools import groupby
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+
+from .caching import get_version
+from .conditional import LOSS_EVENTS_VERSION
+from .lookups import get_table, version_name
+from .models import AffectedArea, LossOfProduction
+
+
+TIMELINE_CHUNK_SIZE = 2000
+
+ONE_DAY = datetime.timedelta(days=1)
+
+
+def _timeout():
+    return getattr(settings, 'LOP_TIMELINE_CACHE_TIMEOUT', 3600)
+
+
+def _intervals(rows, today, start=None, end=None):
+    """
+    (first day, day after the last) of each event, in issue_date order and
+    clipped to the ``start``..``end`` window. Events run until date_solved,
+    until today while ongoing, and otherwise last their issue day only.
+    """
+    for _, issue_date, date_solved, status in rows:
+        if date_solved is not None:
+            last = max(date_solved, issue_date)
+        elif status == LossOfProduction.Status.ONGOING:
+            last = max(today, issue_date)
+        else:
+            last = issue_date
+        first, after = issue_date, last + ONE_DAY
+        if start is not None:
+            first = max(first, start)
+        if end is not None:
+            after = min(after, end + ONE_DAY)
+        if first < after:
+            yield first, after
+
+
+def sweep(intervals):
+    """
+    Concurrency over half-open date ``intervals`` sorted by start, in one
+    pass with a heap of end dates: O(n log n). Returns ``(segments,
+    merged)``: maximal runs of days with the same non-zero number of open
+    events as [first, after, count], and maximal runs of days with at least
+    one open event as [first, after, events, peak].
+    """
+    segments, merged = [], []
+    ends = []
+    count, since = 0, None
+
+    def close(day):
+        # Days since..day had ``count`` open events.
+        if day == since:
+            return
+        if segments and segments[-1][1] == since and segments[-1][2] == count:
+            segments[-1][1] = day
+        else:
+            segments.append([since, day, count])
+        merged[-1][1] = day
+        merged[-1][3] = max(merged[-1][3], count)
+
+    for first, after in intervals:
+        while ends and ends[0] <= first:
+            day = heapq.heappop(ends)
+            close(day)
+            since, count = day, count - 1
+        if count:
+            close(first)
+        if count or (merged and merged[-1][1] == first):
+            merged[-1][2] += 1
+        else:
+            merged.append([first, first, 1, 0])
+        since, count = first, count + 1
+        heapq.heappush(ends, after)
+
+    while ends:
+        day = heapq.heappop(ends)
+        close(day)
+        since, count = day, count - 1
+    return segments, merged
+
+
+def _last(after):
+    return (after - ONE_DAY).isoformat()
+
+
+def concurrency_timeline(queryset, start=None, end=None):
+    """
+    Per affected area: merged outage intervals, the number of concurrently
+    open events for every day (as runs of equal days) and the peak. Events
+    are streamed ordered by area and issue date, so memory holds one
+    area's open events at a time.
+    """
+    today = timezone.localdate()
+    # Only events that can overlap the window; _intervals() clips them.
+    if start is not None:
+        queryset = queryset.filter(
+            Q(date_solved__gte=start)
+            | Q(date_solved__isnull=True, status=LossOfProduction.Status.ONGOING)
+            | Q(issue_date__gte=start)
+        )
+    if end is not None:
+        queryset = queryset.filter(issue_date__lte=end)
+    rows = (
+        queryset
+        .order_by('affected_area_id', 'issue_date')
+        .values_list('affected_area_id', 'issue_date', 'date_solved', 'status')
+        .iterator(chunk_size=TIMELINE_CHUNK_SIZE)
+    )
+    areas = get_table(AffectedArea)
+
+    result = []
+    for area_id, area_rows in groupby(rows, key=lambda row: row[0]):
+        segments, merged = sweep(_intervals(area_rows, today, start, end))
+        if not segments:
+            continue
+        peak = max(segments, key=lambda segment: segment[2])
+        result.append({
+            'affected_area_id': area_id,
+            'affected_area': areas.label(area_id),
+            'events': sum(interval[2] for interval in merged),
+            'peak': {'count': peak[2], 'start': peak[0].isoformat(), 'end': _last(peak[1])},
+            'intervals': [
+                {'start': first.isoformat(), 'end': _last(after), 'events': events, 'peak': top}
+                for first, after, events, top in merged
+            ],
+            'daily': [
+                {'start': first.isoformat(), 'end': _last(after), 'count': count}
+                for first, after, count in segments
+            ],
+        })
+    result.sort(key=lambda area: (-area['peak']['count'], area['affected_area'] or ''))
+    return {
+        'start': start.isoformat() if start else None,
+        'end': end.isoformat() if end else None,
+        'areas': result,
+    }
+
+
+def cached_timeline(queryset, start=None, end=None):
+    """
+    concurrency_timeline() cached per filter set, i.e. per SQL of the
+    filtered ``queryset`` and window, until loss events or affected areas
+    change or the day rolls over, since ongoing events run until today.
+    """
+    sql, params = queryset.order_by().query.sql_with_params()
+    filters = f'{sql}|{params!r}|{start}|{end}'
+    key = 'lop:timeline:{}:{}:{}:{}'.format(
+        get_version(LOSS_EVENTS_VERSION),
+        get_version(version_name(AffectedArea)),
+        timezone.localdate().isoformat(),
+        hashlib.md5(filters.encode('utf-8')).hexdigest(),
+    )
+    timeline = cache.get(key)
+    if timeline is None:
+        timeline = concurrency_timeline(queryset, start, end)
+        cache.set(key, timeline, _timeout())
+    return timeline
@@ -1,6 +1,10 @@
-from rest_framework import mixins, viewsets
+from django.utils.dateparse import parse_date
+from django.utils.functional import cached_property
+from rest_framework import mixins, status, viewsets
 from rest_framework.permissions import IsAuthenticated
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.renderers import JSONRenderer
+from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from .models import (
     Department,
@@ -15,8 +19,40 @@ from .serializers import (
     CauseSerializer,
     ReportingLimitAreaSerializer,
     LossOfProductionSerializer,
+    LOSS_FIELDS,
+    loss_values,
+    serialize_loss_columns,
+    serialize_loss_rows,
 )
 from .permissions import LookupModelPermissions, LossOfProductionPermissions
+from .conditional import LOSS_EVENTS_VERSION, ConditionalGetMixin
+from .instrumentation import TimedAPIViewMixin
+from .routing import ReplicaReadMixin
+from .lookups import LOOKUP_MODELS, get_table, version_name
+from .rollups import rollup_queryset
+from .sync import SYNC_DEFAULT_LIMIT, SYNC_MAX_LIMIT, changes_since
+from .timeline import cached_timeline
+from .roles import get_user_groups, get_user_permissions
+from .analytics import DIMENSIONS, PERIODS, loss_statistics, rollup_dimensions_supported
+from .bulk import bulk_create, bulk_update
+from .exports import EXPORT_RENDERERS, streaming_export
+from .renderers import COLUMNAR_RENDERERS
+from .incidents import (
+    RECURRENCE_DEFAULT_MIN_EVENTS,
+    RECURRENCE_DEFAULT_WINDOW_DAYS,
+    RESOLUTION_DIMENSIONS,
+    OpenIncidentPagination,
+    add_age,
+    open_incidents,
+    recurring_failures,
+    resolution_statistics,
+)
+from .filters import (
+    LossOfProductionFilterBackend,
+    LossOfProductionOrderingFilter,
+    LossOfProductionSearchFilter,
+)
+from .pagination import KeysetCursorPagination, OptInPageNumberPagination
 
 
 class BaseCRViewSet(mixins.CreateModelMixin, viewsets.ReadOnlyModelViewSet):
@@ -24,9 +60,21 @@ class BaseCRViewSet(mixins.CreateModelMixin, viewsets.ReadOnlyModelViewSet):
     pass
 
 
-class LookupCRUDViewSet(viewsets.ModelViewSet):
+class LookupCRUDViewSet(TimedAPIViewMixin, ConditionalGetMixin, ReplicaReadMixin, viewsets.ModelViewSet):
     """Full CRUD viewset for lookup models with permission control"""
     permission_classes = [IsAuthenticated, LookupModelPermissions]
+    pagination_class = OptInPageNumberPagination
+
+    @property
+    def version_names(self):
+        return [version_name(self.queryset.model)]
+
+    def list(self, request, *args, **kwargs):
+        # Unpaginated lists are served from the in-memory lookup table.
+        if self.paginator is not None and self.paginator.get_page_size(request):
+            return super().list(request, *args, **kwargs)
+        serializer = self.get_serializer(get_table(self.queryset.model).instances(), many=True)
+        return Response(serializer.data)
 
 
 class DepartmentViewSet(LookupCRUDViewSet):
@@ -49,15 +97,277 @@ class ReportingLimitAreaViewSet(LookupCRUDViewSet):
     serializer_class = ReportingLimitAreaSerializer
 
 
-class LossOfProductionViewSet(viewsets.ModelViewSet):
+class LossOfProductionViewSet(TimedAPIViewMixin, ConditionalGetMixin, ReplicaReadMixin, viewsets.ModelViewSet):
     """Full CRUD viewset for LossOfProduction with permission control"""
     permission_classes = [IsAuthenticated, LossOfProductionPermissions]
-    queryset = (
-        LossOfProduction.objects
-        .select_related("department", "affected_area", "cause", "reporting_limit_area__department")
-        .order_by("-issue_date", "-id")
-    )
+    # Lookup names are resolved from the in-memory lookup tables, so the
+    # list query does not need to join them.
+    queryset = LossOfProduction.objects.order_by("-issue_date", "-id")
     serializer_class = LossOfProductionSerializer
+    pagination_class = KeysetCursorPagination
+    filter_backends = [LossOfProductionFilterBackend, LossOfProductionSearchFilter, LossOfProductionOrderingFilter]
+    ordering_fields = ["issue_date", "date_solved", "department__name"]
+    # Rendered events carry lookup names, so lookup changes alter them too.
+    version_names = [LOSS_EVENTS_VERSION, *(version_name(model) for model in LOOKUP_MODELS)]
+
+    def get_object_modified(self):
+        pk = self.kwargs.get(self.lookup_url_kwarg or self.lookup_field)
+        try:
+            return LossOfProduction.objects.filter(pk=pk).values_list("updated_at", flat=True).first()
+        except (TypeError, ValueError):
+            return None
+
+    async def aget_object_modified(self):
+        pk = self.kwargs.get(self.lookup_url_kwarg or self.lookup_field)
+        try:
+            return await LossOfProduction.objects.filter(pk=pk).values_list("updated_at", flat=True).afirst()
+        except (TypeError, ValueError):
+            return None
+
+    @cached_property
+    def sparse_fields(self):
+        """
+        Output fields chosen with ``?fields=`` and/or ``?omit=`` (comma
+        separated), in serializer order; None for all of them. Only the
+        columns behind the chosen fields are read from the database.
+        """
+        params = self.request.query_params
+        if "fields" not in params and "omit" not in params:
+            return None
+
+        selected = {}
+        errors = {}
+        for param in ("fields", "omit"):
+            selected[param] = [name.strip() for name in params.get(param, "").split(",") if name.strip()]
+            invalid = [name for name in selected[param] if name not in LOSS_FIELDS]
+            if invalid:
+                errors[param] = f"Invalid field(s): {', '.join(invalid)}."
+        if errors:
+            raise ValidationError(errors)
+
+        fields = tuple(
+            name for name in LOSS_FIELDS
+            if (not selected["fields"] or name in selected["fields"]) and name not in selected["omit"]
+        )
+        if not fields:
+            raise ValidationError({"fields": "At least one field must be selected."})
+        return fields
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == "retrieve" and self.sparse_fields is not None:
+            queryset = queryset.only(*self.sparse_fields)
+        return queryset
+
+    def get_serializer(self, *args, **kwargs):
+        if self.action == "retrieve":
+            kwargs.setdefault("fields", self.sparse_fields)
+        return super().get_serializer(*args, **kwargs)
+
+    def get_list_rows(self, queryset):
+        # Read straight from .values(); ordering columns are included so the
+        # keyset paginator can build its cursor from the rows.
+        ordering = LossOfProductionOrderingFilter().get_ordering(self.request, queryset, self) or []
+        columns = list(loss_values(self.sparse_fields))
+        columns += [name.lstrip("-") for name in ordering if name.lstrip("-") not in columns]
+        return queryset.values(*columns)
+
+    def get_renderers(self):
+        renderers = super().get_renderers()
+        if self.action == "list":
+            renderers += [renderer() for renderer in COLUMNAR_RENDERERS]
+        return renderers
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        # Export errors (bad filters, denied permissions, unacceptable
+        # formats) are rendered as JSON, not in the requested export format.
+        if self.action == "export" and isinstance(response, Response) and response.status_code >= 400:
+            request.accepted_renderer = JSONRenderer()
+            request.accepted_media_type = JSONRenderer.media_type
+        return super().finalize_response(request, response, *args, **kwargs)
+
+    def serialize_rows(self, rows):
+        if getattr(self.request.accepted_renderer, "columnar", False):
+            return serialize_loss_columns(rows, self.sparse_fields)
+        return serialize_loss_rows(rows, self.sparse_fields)
+
+    def list(self, request, *args, **kwargs):
+        rows = self.get_list_rows(self.filter_queryset(self.get_queryset()))
+
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(self.serialize_rows(page))
+        return Response(self.serialize_rows(rows))
+
+    @action(detail=False, methods=["post", "patch"], pagination_class=None)
+    def bulk(self, request):
+        """
+        POST a list of events to create them, or PATCH a list of partial
+        events (each with its ``id``) to update them. All items are written
+        in one transaction; if any item is invalid nothing is written and the
+        response holds one error object per item.
+        """
+        if request.method == "POST":
+            instances = bulk_create(request.data)
+            response_status = status.HTTP_201_CREATED
+        else:
+            instances = bulk_update(request.data)
+            response_status = status.HTTP_200_OK
+        serializer = self.get_serializer(instances, many=True)
+        return Response(serializer.data, status=response_status)
+
+    @action(detail=False, methods=["get"], pagination_class=None)
+    def changes(self, request):
+        """
+        Incremental sync: events created or updated since the opaque
+        ``since`` token, ids deleted since then, and the token for the next
+        call. Repeat while ``has_more`` is true. Omit ``since`` for a full
+        initial copy.
+        """
+        try:
+            limit = min(int(request.query_params.get("limit", SYNC_DEFAULT_LIMIT)), SYNC_MAX_LIMIT)
+        except ValueError:
+            raise ValidationError({"limit": "A valid integer is required."})
+        if limit < 1:
+            raise ValidationError({"limit": "Ensure this value is greater than or equal to 1."})
+        return Response(changes_since(request.query_params.get("since"), limit))
+
+    @action(detail=False, methods=["get"], pagination_class=None)
+    def stats(self, request):
+        """
+        Aggregated event counts for dashboards. Accepts the list filters plus
+        ``group_by`` (comma separated, any of: department, affected_area,
+        cause, reporting_limit_area, event_type, status) and ``period``
+        (day, week or month).
+        """
+        dimensions = [
+            name.strip()
+            for name in request.query_params.get("group_by", "department").split(",")
+            if name.strip()
+        ]
+        period = request.query_params.get("period") or None
+
+        errors = {}
+        invalid = [name for name in dimensions if name not in DIMENSIONS]
+        if invalid:
+            errors["group_by"] = f"Invalid dimension(s): {', '.join(invalid)}."
+        elif not dimensions:
+            errors["group_by"] = "Expected at least one dimension."
+        if period and period not in PERIODS:
+            errors["period"] = f"Expected one of: {', '.join(PERIODS)}."
+        if errors:
+            raise ValidationError(errors)
+
+        dimensions = list(dict.fromkeys(dimensions))
+        queryset = None
+        # Answer from the daily rollup whenever the filters and dimensions allow it.
+        if rollup_dimensions_supported(dimensions) and not LossOfProductionSearchFilter().get_search_query(request):
+            queryset = rollup_queryset(LossOfProductionFilterBackend().get_filter_kwargs(request.query_params))
+        if queryset is None:
+            queryset = self.filter_queryset(self.get_queryset())
+        return Response(loss_statistics(queryset, dimensions, period))
+
+    @action(detail=False, methods=["get"], pagination_class=OpenIncidentPagination)
+    def open(self, request):
+        """
+        Ongoing events, oldest first, each with ``age_days`` since it was
+        issued. Accepts the list filters.
+        """
+        rows = self.get_list_rows(open_incidents(self.filter_queryset(self.get_queryset())))
+
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(add_age(page, serialize_loss_rows(page, self.sparse_fields)))
+        return Response(add_age(rows, serialize_loss_rows(rows, self.sparse_fields)))
+
+    @action(detail=False, methods=["get"], pagination_class=None)
+    def mttr(self, request):
+        """
+        Time to resolve solved events, in days: count, mean, min, max and
+        percentiles per group. Accepts the list filters plus ``group_by``
+        (comma separated, any of: department, affected_area, cause,
+        event_type).
+        """
+        dimensions = [
+            name.strip()
+            for name in request.query_params.get("group_by", "department").split(",")
+            if name.strip()
+        ]
+        invalid = [name for name in dimensions if name not in RESOLUTION_DIMENSIONS]
+        if invalid:
+            raise ValidationError({"group_by": f"Invalid dimension(s): {', '.join(invalid)}."})
+
+        dimensions = list(dict.fromkeys(dimensions))
+        queryset = self.filter_queryset(self.get_queryset())
+        return Response({
+            "group_by": dimensions,
+            "groups": resolution_statistics(queryset, dimensions),
+        })
+
+    @action(detail=False, methods=["get"], pagination_class=None)
+    def timeline(self, request):
+        """
+        Concurrent outages per affected area: merged intervals, the number
+        of overlapping events for every day (as runs of days with the same
+        count) and the peak. Each event lasts from issue_date to
+        date_solved, or to today while ongoing. Accepts the list filters
+        plus ``start`` and ``end`` (YYYY-MM-DD) to limit the days covered.
+        """
+        window = {}
+        errors = {}
+        for name in ("start", "end"):
+            if not request.query_params.get(name):
+                continue
+            try:
+                window[name] = parse_date(request.query_params[name])
+            except ValueError:
+                window[name] = None
+            if window[name] is None:
+                errors[name] = "Expected a date in YYYY-MM-DD format."
+        if not errors and "start" in window and "end" in window and window["start"] > window["end"]:
+            errors["end"] = "Must not be before start."
+        if errors:
+            raise ValidationError(errors)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        return Response(cached_timeline(queryset, window.get("start"), window.get("end")))
+
+    @action(detail=False, methods=["get"], pagination_class=None)
+    def recurring(self, request):
+        """
+        Repeat failures: equipment with at least ``min_events`` losses
+        (default 3) within ``window_days`` days (default 30), matched on the
+        normalized equipment key. Each entry has the busiest window and the
+        episodes of recurring events with their ids. Accepts the list
+        filters.
+        """
+        values = {}
+        errors = {}
+        for name, default, minimum in (
+            ("window_days", RECURRENCE_DEFAULT_WINDOW_DAYS, 1),
+            ("min_events", RECURRENCE_DEFAULT_MIN_EVENTS, 2),
+        ):
+            try:
+                values[name] = int(request.query_params.get(name) or default)
+            except ValueError:
+                errors[name] = "A valid integer is required."
+                continue
+            if values[name] < minimum:
+                errors[name] = f"Ensure this value is greater than or equal to {minimum}."
+        if errors:
+            raise ValidationError(errors)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        return Response(recurring_failures(queryset, values["window_days"], values["min_events"]))
+
+    @action(detail=False, methods=["get"], pagination_class=None, renderer_classes=EXPORT_RENDERERS)
+    def export(self, request):
+        """
+        Stream the filtered events as CSV (default) or NDJSON, selected with
+        ``?format=csv|ndjson`` or the Accept header.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        return streaming_export(queryset, request.accepted_renderer)
 
 
 @api_view(["GET"])
@@ -67,7 +377,7 @@ def current_user(request):
     return Response(
         {
             "username": user.username,
-            "groups": list(user.groups.values_list("name", flat=True)),
-            "permissions": list(user.get_all_permissions()),
+            "groups": get_user_groups(user),
+            "permissions": sorted(get_user_permissions(user)),
         }
     )
\ No newline at end of file